@@ -116,11 +116,8 @@ class AsyncInterpreter(OpenInterpreter):
 
                 sent_chunks = False
 
-                for chunk_og in self._respond_and_store():
-                    chunk = (
-                        chunk_og.copy()
-                    )  # This fixes weird double token chunks. Probably a deeper problem?
-
+                # Chunks aren't changed after they're yielded, so they can be queued as they are
+                for chunk in self._respond_and_store():
                     if chunk["type"] == "confirmation":
                         if run_code:
                             run_code = False
@@ -762,6 +759,8 @@ def create_router(async_interpreter):
     async def get_setting(setting: str):
         if hasattr(async_interpreter, setting):
             setting_value = getattr(async_interpreter, setting)
+            if setting == "messages":
+                setting_value = async_interpreter.blob_store.expand_all(setting_value)
             try:
                 return json.dumps({setting: setting_value})
             except TypeError:
@@ -48,6 +48,10 @@ class Computer:
         self.asq = ASQ(self)
 
         self.emit_images = True
+        # computer.display.view() can skip screenshots of a screen that hasn't changed since the last one,
+        # and show just the part of the screen that changed instead of all of it. The OS profile turns these on
+        self.skip_unchanged_screenshots = False
+        self.crop_screenshots_to_changes = False
         self.api_base = "https://api.openinterpreter.com/v0"
         self.save_skills = True
 
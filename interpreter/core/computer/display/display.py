@@ -42,6 +42,13 @@ pywinctl = lazy_import("pywinctl")
 
 from ..utils.computer_vision import find_text_in_image, pytesseract_get_text
 
+# How much a pixel's brightness (0-255) has to change to count, so anti-aliasing noise doesn't
+CHANGE_THRESHOLD = 8
+# Only crop to the changes if they cover less than this much of the screenshot
+MAX_CROP_AREA = 0.5
+# Pixels of context kept around a cropped change
+CROP_MARGIN = 16
+
 
 class Display:
     def __init__(self, computer):
@@ -50,6 +57,8 @@ class Display:
         self._width = None
         self._height = None
         self._hashes = {}
+        # (what was captured, grayscale pixels) of the last screenshot that was shown
+        self._last_screenshot = None
 
     # We use properties here so that this code only executes when height/width are accessed for the first time
     @property
@@ -89,6 +98,7 @@ class Display:
         screen=0,
         combine_screens=True,
         active_app_only=True,
+        only_changes=True,
     ):
         """
         Redirects to self.screenshot
@@ -99,6 +109,7 @@ class Display:
             quadrant=quadrant,
             combine_screens=combine_screens,
             active_app_only=active_app_only,
+            only_changes=only_changes,
         )
 
     # def get_active_window(self):
@@ -111,11 +122,13 @@ class Display:
         quadrant=None,
         active_app_only=True,
         combine_screens=True,
+        only_changes=True,
     ):
         """
         Shows you what's on the screen by taking a screenshot of the entire screen or a specified quadrant. Returns a `pil_image` `in case you need it (rarely). **You almost always want to do this first!**
         :param screen: specify which display; 0 for primary and 1 and above for secondary.
         :param combine_screens: If True, a collage of all display screens will be returned. Otherwise, a list of display screens will be returned.
+        :param only_changes: If False, always show the whole screenshot, even if the screen hasn't changed since the last one.
         """
 
         # Since Local II, all images sent to local models will be rendered to text with moondream and pytesseract.
@@ -143,18 +156,20 @@ class Display:
         #         )
         #     return screenshot  # Still return a PIL image
 
+        # What this is a screenshot of. Only screenshots of the same thing are compared
+        region = (screen, combine_screens, quadrant)
+
         if quadrant == None:
             if active_app_only:
                 active_window = pywinctl.getActiveWindow()
                 if active_window:
-                    screenshot = pyautogui.screenshot(
-                        region=(
-                            active_window.left,
-                            active_window.top,
-                            active_window.width,
-                            active_window.height,
-                        )
+                    region = (
+                        active_window.left,
+                        active_window.top,
+                        active_window.width,
+                        active_window.height,
                     )
+                    screenshot = pyautogui.screenshot(region=region)
                     message = format_to_recipient(
                         "Taking a screenshot of the active app. To take a screenshot of the entire screen (uncommon), use computer.view(active_app_only=False).",
                         "assistant",
@@ -209,10 +224,80 @@ class Display:
                 for img in screenshot:
                     display(img)
             else:
-                display(screenshot)
+                self._show_changes(screenshot, region, only_changes)
 
         return screenshot  # this will be a list of combine_screens == False
 
+    def forget_last_screenshot(self):
+        """
+        Makes the next screenshot show in full, for when the last one shown is no longer in the conversation.
+        """
+        self._last_screenshot = None
+
+    def _show_changes(self, screenshot, region, only_changes=True):
+        """
+        Displays a screenshot, or a note instead if the screen hasn't changed since the last one,
+        or (with computer.crop_screenshots_to_changes) just the part of it that changed.
+        """
+        changes = self._find_changes(screenshot, region)
+
+        if not only_changes:
+            display(screenshot)
+        elif changes is None and self.computer.skip_unchanged_screenshots:
+            print(
+                format_to_recipient(
+                    "The screen hasn't changed since the last screenshot. To see it again anyway, use computer.display.view(only_changes=False).",
+                    "assistant",
+                )
+            )
+        elif (
+            changes is not None
+            and self.computer.crop_screenshots_to_changes
+            and (changes[2] - changes[0]) * (changes[3] - changes[1])
+            < MAX_CROP_AREA * screenshot.width * screenshot.height
+        ):
+            left, top, right, bottom = changes
+            box = (
+                max(0, left - CROP_MARGIN),
+                max(0, top - CROP_MARGIN),
+                min(screenshot.width, right + CROP_MARGIN),
+                min(screenshot.height, bottom + CROP_MARGIN),
+            )
+            print(
+                format_to_recipient(
+                    f"Only part of the screen changed since the last screenshot, so this is just that part: the box from ({box[0]}, {box[1]}) to ({box[2]}, {box[3]}), in pixels of the {screenshot.width}x{screenshot.height} screenshot. To see all of it, use computer.display.view(only_changes=False).",
+                    "assistant",
+                )
+            )
+            display(screenshot.crop(box))
+        else:
+            display(screenshot)
+
+    def _find_changes(self, screenshot, region):
+        """
+        Compares a screenshot to the last one shown, and remembers it for next time.
+        Returns the (left, top, right, bottom) box around the pixels that changed, the whole screenshot
+        if it can't be compared, or None if nothing changed.
+        """
+        pixels = np.asarray(screenshot.convert("L"), dtype=np.int16)
+        last = self._last_screenshot
+        self._last_screenshot = (region, pixels)
+
+        if last is None or last[0] != region or last[1].shape != pixels.shape:
+            return (0, 0, screenshot.width, screenshot.height)
+
+        changed = np.abs(pixels - last[1]) > CHANGE_THRESHOLD
+        rows = np.flatnonzero(changed.any(axis=1))
+        if not rows.size:
+            return None
+        columns = np.flatnonzero(changed.any(axis=0))
+        return (
+            int(columns[0]),
+            int(rows[0]),
+            int(columns[-1]) + 1,
+            int(rows[-1]) + 1,
+        )
+
     def find(self, description, screenshot=None):
         if description.startswith('"') and description.endswith('"'):
             return self.find_text(description.strip('"'), screenshot)
@@ -274,9 +359,10 @@ class Display:
                         + "\n\nIcon locating API not available, or we were unable to find the icon. Please try another method to find this icon."
                     )
 
-    def find_text(self, text, screenshot=None):
+    def find_text(self, text, screenshot=None, region=None):
         """
         Searches for specified text within a screenshot or the current screen if no screenshot is provided.
+        :param region: Only search this (left, top, width, height) part of the screenshot, in its pixels, such as the active window.
         """
         if screenshot == None:
             screenshot = self.screenshot(show=False)
@@ -284,7 +370,7 @@ class Display:
         if not self.computer.offline:
             # Convert the screenshot to base64
             buffered = BytesIO()
-            screenshot.save(buffered, format="PNG")
+            _crop(screenshot, region).save(buffered, format="PNG")
             screenshot_base64 = base64.b64encode(buffered.getvalue()).decode()
 
             try:
@@ -293,6 +379,15 @@ class Display:
                     json={"query": text, "base64": screenshot_base64},
                 )
                 response = response.json()
+                if region is not None:
+                    # Relative to the region, so make them relative to the screenshot
+                    left, top, width, height = region
+                    for item in response:
+                        x, y = item["coordinates"]
+                        item["coordinates"] = (
+                            (left + x * width) / screenshot.width,
+                            (top + y * height) / screenshot.height,
+                        )
                 return response
             except:
                 print("Attempting to find the text locally.")
@@ -300,15 +395,18 @@ class Display:
         # We'll only get here if 1) self.computer.offline = True, or the API failed
 
         # Find the text in the screenshot
-        centers = find_text_in_image(screenshot, text, self.computer.debug)
+        centers = find_text_in_image(
+            screenshot, text, self.computer.debug, region=region
+        )
 
         return [
             {"coordinates": center, "text": "", "similarity": 1} for center in centers
         ]  # Have it deliver the text properly soon.
 
-    def get_text_as_list_of_lists(self, screenshot=None):
+    def get_text_as_list_of_lists(self, screenshot=None, region=None):
         """
         Extracts and returns text from a screenshot or the current screen as a list of lists, each representing a line of text.
+        :param region: Only read this (left, top, width, height) part of the screenshot, in its pixels, such as the active window.
         """
         if screenshot == None:
             screenshot = self.screenshot(show=False, force_image=True)
@@ -316,7 +414,7 @@ class Display:
         if not self.computer.offline:
             # Convert the screenshot to base64
             buffered = BytesIO()
-            screenshot.save(buffered, format="PNG")
+            _crop(screenshot, region).save(buffered, format="PNG")
             screenshot_base64 = base64.b64encode(buffered.getvalue()).decode()
 
             try:
@@ -332,13 +430,20 @@ class Display:
         # We'll only get here if 1) self.computer.offline = True, or the API failed
 
         try:
-            return pytesseract_get_text(screenshot)
+            return pytesseract_get_text(screenshot, region=region)
         except:
             raise Exception(
                 "Failed to find text locally.\n\nTo find text in order to use the mouse, please make sure you've installed `pytesseract` along with the Tesseract executable (see this Stack Overflow answer for help installing Tesseract: https://stackoverflow.com/questions/50951955/pytesseract-tesseractnotfound-error-tesseract-is-not-installed-or-its-not-i)."
             )
 
 
+def _crop(screenshot, region):
+    if region is None:
+        return screenshot
+    left, top, width, height = region
+    return screenshot.crop((left, top, left + width, top + height))
+
+
 def take_screenshot_to_pil(screen=0, combine_screens=True):
     # Get information about all screens
     monitors = screeninfo.get_monitors()
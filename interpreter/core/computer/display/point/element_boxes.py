@@ -0,0 +1,195 @@
+"""
+Finds boxes around the GUI elements in a screenshot, for find_icon to search through.
+
+The screenshot is converted to grayscale once, and every threshold variant reads that same array.
+Variants (and regions, see OI_POINT_FIRST_PASS_SCALE) run on threads, since OpenCV releases the GIL.
+"""
+
+import os
+import random
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+DEFAULT_VARIANT = {
+    "contrast_level": 1.8,
+    "adaptive_method": cv2.ADAPTIVE_THRESH_MEAN_C,
+    "threshold_type": cv2.THRESH_BINARY_INV,
+    "block_size": 11,
+    "C": 3,
+}
+# Pixels around each candidate from the first pass that are read again at full resolution
+FIRST_PASS_MARGIN = 16
+
+
+def get_element_boxes(image_data, debug):
+    desktop_path = os.path.join(os.path.expanduser("~"), "Desktop")
+    debug_path = os.path.join(desktop_path, "oi-debug")
+
+    if debug:
+        if not os.path.exists(debug_path):
+            os.makedirs(debug_path)
+
+    # Convert to grayscale, once
+    gray = np.asarray(image_data.convert("L"))
+
+    if os.getenv("OI_POINT_PERMUTATE", "False") == "True":
+        # Only the last variant's boxes are used. The others are tried for their debug images,
+        # so without debug there's no need for them
+        variants = [random_variant() for _ in range(10 if debug else 1)]
+        for variant in variants:
+            print("Random variant:", variant)
+    else:
+        variants = [DEFAULT_VARIANT]
+
+    # Each variant's contrast depends on the whole image, so its lookup table is made up front
+    tables = [contrast_table(gray, variant["contrast_level"]) for variant in variants]
+
+    # Optionally find candidates on a smaller copy, then only look closer around those
+    scale = float(os.getenv("OI_POINT_FIRST_PASS_SCALE", "1"))
+    if scale < 1:
+        regions = candidate_regions(gray, variants, tables, scale)
+    else:
+        regions = [(0, 0, gray.shape[1], gray.shape[0])]
+
+    jobs = [
+        (gray, region, variant, table)
+        for variant, table in zip(variants, tables)
+        for region in regions
+    ]
+
+    def run(job):
+        gray, region, variant, table = job
+        return find_boxes(
+            gray, region, variant, table, debug and len(regions) == 1, debug_path
+        )
+
+    if len(jobs) == 1:
+        results = [run(jobs[0])]
+    else:
+        with ThreadPoolExecutor(
+            max_workers=min(len(jobs), os.cpu_count() or 1)
+        ) as pool:
+            results = list(pool.map(run, jobs))
+
+    # Boxes from the last variant only. The same box can come from overlapping regions
+    results = results[-len(regions) :]
+    boxes = dict.fromkeys(box for result in results for box in result)
+    return [{"x": x, "y": y, "width": w, "height": h} for x, y, w, h in boxes]
+
+
+def random_variant():
+    return {
+        "contrast_level": random.uniform(1, 40),
+        "adaptive_method": random.choice(
+            [cv2.ADAPTIVE_THRESH_MEAN_C, cv2.ADAPTIVE_THRESH_GAUSSIAN_C]
+        ),
+        "threshold_type": random.choice([cv2.THRESH_BINARY, cv2.THRESH_BINARY_INV]),
+        "block_size": 11,
+        "C": random.randint(-10, 10),
+    }
+
+
+def contrast_table(gray, contrast_level):
+    """
+    A lookup table that does what PIL's ImageEnhance.Contrast does to a grayscale image:
+    moves every pixel contrast_level times further from the image's mean.
+    """
+    histogram = cv2.calcHist([gray], [0], None, [256], [0, 256]).ravel()
+    mean = int(histogram.astype(np.int64) @ np.arange(256) / gray.size + 0.5)
+    levels = mean + contrast_level * (np.arange(256) - mean)
+    return np.clip(levels.astype(int), 0, 255).astype(np.uint8)
+
+
+def find_boxes(gray, region, variant, table, debug=False, debug_path=None):
+    """
+    Returns the (x, y, width, height) bounding box of each contour in a region (left, top, width, height)
+    of the image, once it's had its contrast raised and been thresholded as the variant says.
+    """
+    left, top, width, height = region
+    # Apply an extreme contrast filter, making the one copy of the region this needs
+    contrasted = cv2.LUT(gray[top : top + height, left : left + width], table)
+
+    # Create a string with all parameters
+    parameters_string = "-".join(f"{key}_{value}" for key, value in variant.items())
+
+    if debug:
+        print("TRYING:", parameters_string)
+        contrasted_image_path = os.path.join(
+            debug_path, f"contrasted_image_{parameters_string}.jpg"
+        )
+        cv2.imwrite(contrasted_image_path, contrasted)
+        print(f"DEBUG: Contrasted image saved to {contrasted_image_path}")
+
+    # Apply adaptive thresholding to create a binary image where the GUI elements are isolated
+    binary = cv2.adaptiveThreshold(
+        src=contrasted,
+        maxValue=255,
+        adaptiveMethod=variant["adaptive_method"],
+        thresholdType=variant["threshold_type"],
+        blockSize=variant["block_size"],
+        C=variant["C"],
+    )
+
+    if debug:
+        binary_image_path = os.path.join(
+            debug_path, f"binary_contrasted_image_{parameters_string}.jpg"
+        )
+        cv2.imwrite(binary_image_path, binary)
+        print(f"DEBUG: Binary contrasted image saved to {binary_image_path}")
+
+    # Find contours from the binary image. Only their bounding boxes are used,
+    # which keeping just the corners of each contour doesn't change
+    contours, _ = cv2.findContours(binary, cv2.RETR_LIST, cv2.CHAIN_APPROX_SIMPLE)
+
+    if debug:
+        # Draw contours on the image for visualization
+        contour_image = np.zeros_like(binary)
+        cv2.drawContours(contour_image, contours, -1, (255, 255, 255), 1)
+        contoured_image_path = os.path.join(
+            debug_path, f"contoured_contrasted_image_{parameters_string}.jpg"
+        )
+        cv2.imwrite(contoured_image_path, contour_image)
+        print(f"DEBUG: Contoured contrasted image saved at: {contoured_image_path}")
+
+    boxes = []
+    for contour in contours:
+        x, y, w, h = cv2.boundingRect(contour)
+        boxes.append((x + left, y + top, w, h))
+    return boxes
+
+
+def candidate_regions(gray, variants, tables, scale):
+    """
+    Finds elements on a copy of the image scaled down by `scale`, and returns the
+    (left, top, width, height) regions around them, at full resolution, to look at again.
+    """
+    small = cv2.resize(gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    small_height, small_width = small.shape
+    max_width = int(os.getenv("OI_POINT_MAX_ICON_WIDTH", "500")) * scale
+    max_height = int(os.getenv("OI_POINT_MAX_ICON_HEIGHT", "500")) * scale
+    margin = max(1, int(FIRST_PASS_MARGIN * scale))
+
+    # Mark every element that could be an icon, then join the marks that touch into regions
+    mask = np.zeros_like(small)
+    for variant, table in zip(variants, tables):
+        for x, y, w, h in find_boxes(
+            small, (0, 0, small_width, small_height), variant, table
+        ):
+            if w <= max_width and h <= max_height:
+                mask[
+                    max(0, y - margin) : y + h + margin,
+                    max(0, x - margin) : x + w + margin,
+                ] = 255
+
+    count, labels, stats, centroids = cv2.connectedComponentsWithStats(mask)
+    height, width = gray.shape
+    regions = []
+    # Label 0 is the background
+    for x, y, w, h, area in stats[1:]:
+        left, top = int(x / scale), int(y / scale)
+        right = min(width, int((x + w) / scale) + 1)
+        bottom = min(height, int((y + h) / scale) + 1)
+        regions.append((left, top, right - left, bottom - top))
+    return regions
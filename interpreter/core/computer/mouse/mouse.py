@@ -66,7 +66,8 @@ class Mouse:
             is_fuzzy = False
 
             if len(coordinates) == 0:
-                return self.move(icon=text)  # Is this a better solution?
+                # Is this a better solution? (Same screenshot, so its OCR is reused)
+                return self.move(icon=text, screenshot=screenshot)
 
                 if self.computer.emit_images:
                     plt.imshow(np.array(screenshot))
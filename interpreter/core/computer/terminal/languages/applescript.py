@@ -6,6 +6,7 @@ from .subprocess_language import SubprocessLanguage
 class AppleScript(SubprocessLanguage):
     file_extension = "applescript"
     name = "AppleScript"
+    end_of_execution_on_stderr = True
 
     def __init__(self):
         super().__init__()
@@ -28,7 +29,7 @@ class AppleScript(SubprocessLanguage):
         code = "osascript -e " + code
 
         # Append end of execution indicator
-        code += '; echo "##end_of_execution##"'
+        code += '; echo "##end_of_execution##"; echo "##end_of_execution##" >&2'
 
         return code
 
@@ -6,6 +6,7 @@ from .subprocess_language import SubprocessLanguage
 class JavaScript(SubprocessLanguage):
     file_extension = "js"
     name = "JavaScript"
+    end_of_execution_on_stderr = True
 
     def __init__(self):
         super().__init__()
@@ -65,6 +66,7 @@ try {{
     console.log(e);
 }}
 console.log("##end_of_execution##");
+console.error("##end_of_execution##");
 """
 
     return code
@@ -0,0 +1,239 @@
+import atexit
+import os
+import queue
+import tempfile
+import threading
+import traceback
+
+from jupyter_client import KernelManager
+
+# Runs in every kernel before it's handed out
+bootstrap_code = """
+%matplotlib inline
+import matplotlib.pyplot as plt
+""".strip()
+
+# Gives the kernel access to the computer via Python
+import_computer_api_code = """
+import os
+os.environ["INTERPRETER_COMPUTER_API"] = "False" # To prevent infinite recurring import of the computer API
+
+import time
+import datetime
+from interpreter import interpreter
+
+computer = interpreter.computer
+""".strip()
+
+# Reports the line the running cell is on, without touching the cell's code.
+# A thread samples the main thread's stack a few times a second and writes the line into a 4 byte shared file,
+# so a loop costs nothing extra however many times it goes around. 0 means no cell is running.
+active_line_sampler_code = """
+def _start_active_line_sampler(path, interval):
+    import mmap, struct, sys, threading, time
+
+    with open(path, "r+b") as file:
+        slot = mmap.mmap(file.fileno(), 4)
+    main_thread = threading.main_thread().ident
+
+    def sample():
+        frames = []
+        frame = sys._current_frames().get(main_thread)
+        while frame is not None:
+            frames.append(frame)
+            frame = frame.f_back
+        # IPython's run_code execs the cell as a "<module>"
+        for frame in reversed(frames):
+            if frame.f_code.co_name == "<module>" and frame.f_back and frame.f_back.f_code.co_name == "run_code":
+                cell = frame.f_code.co_filename
+                # The innermost line of the cell, even inside a function it defined
+                for frame in frames:
+                    if frame.f_code.co_filename == cell:
+                        return frame.f_lineno or 0
+        return 0
+
+    def run():
+        while True:
+            try:
+                line = sample()
+            except Exception:
+                line = 0
+            slot[:4] = struct.pack("<i", line)
+            time.sleep(interval)
+
+    threading.Thread(target=run, name="active_line_sampler", daemon=True).start()
+
+_start_active_line_sampler({path!r}, {interval!r})
+del _start_active_line_sampler
+""".strip()
+
+# How often the active line is sampled, in seconds. About as often as anyone could see it change
+active_line_interval = 0.05
+
+_start_lock = threading.Lock()
+
+
+class PooledKernel:
+    def __init__(self, km, kc, has_computer_api=False, active_line_path=None):
+        self.km = km
+        self.kc = kc
+        self.has_computer_api = has_computer_api
+        # Where the kernel writes the line it's running, see active_line_sampler_code
+        self.active_line_path = active_line_path
+
+    def shutdown(self):
+        self.kc.stop_channels()
+        self.km.shutdown_kernel(now=True)
+        self.remove_active_line_file()
+
+    def remove_active_line_file(self):
+        if self.active_line_path:
+            try:
+                os.remove(self.active_line_path)
+            except OSError:
+                pass
+
+
+class KernelPool:
+    """
+    Keeps `size` Jupyter kernels started and bootstrapped in the background,
+    so a Python language can take a ready one instead of waiting for a kernel to boot.
+    Nothing starts at construction. chat() and the terminal interface call fill() to boot one early,
+    and every kernel taken is replaced in the background.
+
+    The size defaults to the INTERPRETER_KERNEL_POOL_SIZE environment variable (or 1).
+    Set it to 0 to start kernels only when they're needed.
+
+    `env` holds environment variables the kernels get on top of this process's own.
+    """
+
+    def __init__(self, computer, size=None, env=None):
+        self.computer = computer
+        if size is None:
+            size = int(os.environ.get("INTERPRETER_KERNEL_POOL_SIZE", 1))
+        self.size = size
+        self.env = env or {}
+
+        self._ready = queue.Queue()
+        self._starting = 0
+        self._lock = threading.Lock()
+        self._closed = False
+        # Whether a kernel has been taken, so the pool is worth keeping full
+        self.used = False
+
+        atexit.register(self.shutdown)
+
+    def fill(self):
+        """
+        Starts kernels in the background until `size` of them are ready or on their way.
+        """
+        # The computer API imports interpreter inside the kernel. That one shouldn't start kernels too
+        if os.getenv("INTERPRETER_COMPUTER_API", "True") == "False":
+            return
+
+        with self._lock:
+            if self._closed:
+                return
+            missing = self.size - self._ready.qsize() - self._starting
+            if missing <= 0:
+                return
+            self._starting += missing
+
+        for _ in range(missing):
+            threading.Thread(target=self._start_in_background, daemon=True).start()
+
+    def get(self):
+        """
+        Hands out a ready kernel. Waits for one that's already starting, or starts one if none are.
+        """
+        kernel = None
+        while kernel is None:
+            try:
+                kernel = self._ready.get_nowait()
+            except queue.Empty:
+                with self._lock:
+                    starting = self._starting
+                if starting == 0:
+                    kernel = self._start_kernel()
+                else:
+                    # None means that start failed, so we'll go around again
+                    kernel = self._ready.get()
+
+        self.used = True
+        self.fill()
+        return kernel
+
+    def shutdown(self):
+        """
+        Shuts down the kernels nobody has taken.
+        """
+        with self._lock:
+            self._closed = True
+        while True:
+            try:
+                kernel = self._ready.get_nowait()
+            except queue.Empty:
+                break
+            if kernel is not None:
+                try:
+                    kernel.shutdown()
+                except Exception:
+                    pass
+
+    def _start_in_background(self):
+        try:
+            kernel = self._start_kernel()
+        except Exception:
+            if self.computer.debug:
+                traceback.print_exc()
+            # get() will try again in the foreground, where the error can surface
+            kernel = None
+
+        with self._lock:
+            self._starting -= 1
+            closed = self._closed
+        if closed and kernel is not None:
+            kernel.shutdown()
+        else:
+            self._ready.put(kernel)
+
+    def _start_kernel(self):
+        # Each kernel's ports are picked free, then bound by the kernel once it's up.
+        # Two starting at once can pick the same ones, so they start one at a time
+        with _start_lock:
+            km = KernelManager(kernel_name="python3")
+            km.start_kernel(env={**os.environ, **self.env})
+            kc = km.client()
+            kc.start_channels()
+            kc.wait_for_ready(timeout=60)
+
+        file, active_line_path = tempfile.mkstemp(
+            prefix="open-interpreter-active-line-"
+        )
+        os.write(file, b"\0" * 4)
+        os.close(file)
+
+        code = (
+            bootstrap_code
+            + "\n"
+            + active_line_sampler_code.format(
+                path=active_line_path, interval=active_line_interval
+            )
+        )
+
+        # Checked now rather than at construction, so profiles have had a chance to turn it on
+        has_computer_api = (
+            self.computer.import_computer_api
+            and os.getenv("INTERPRETER_COMPUTER_API", "True") != "False"
+        )
+        if has_computer_api:
+            code += "\n" + import_computer_api_code
+
+        kc.execute_interactive(code, timeout=60, output_hook=lambda msg: None)
+
+        return PooledKernel(
+            km,
+            kc,
+            has_computer_api=has_computer_api,
+            active_line_path=active_line_path,
+        )
@@ -5,9 +5,11 @@ Gotta split this out, generalize it, and move all the python additions to python
 
 import ast
 import logging
+import mmap
 import os
 import queue
 import re
+import struct
 import sys
 import threading
 import time
@@ -15,9 +17,9 @@ import traceback
 
 os.environ["LITELLM_LOCAL_MODEL_COST_MAP"] = "True"
 import litellm
-from jupyter_client import KernelManager
 
 from ..base_language import BaseLanguage
+from .jupyter_kernel_pool import active_line_interval
 
 DEBUG_MODE = False
 
@@ -41,50 +43,30 @@ class JupyterLanguage(BaseLanguage):
     def __init__(self, computer):
         self.computer = computer
 
-        self.km = KernelManager(kernel_name="python3")
-        self.km.start_kernel()
-        self.kc = self.km.client()
-        self.kc.start_channels()
-        while not self.kc.is_alive():
-            time.sleep(0.1)
-        time.sleep(0.5)
+        # The pool has already booted it and set up matplotlib (and maybe the computer API)
+        self.kernel = self.computer.terminal.kernel_pool.get()
+        self.km = self.kernel.km
+        self.kc = self.kernel.kc
+        if self.kernel.has_computer_api:
+            self.computer._has_imported_computer_api = True
+
+        # The kernel writes the line it's running here
+        self.active_line_slot = None
+        if self.kernel.active_line_path:
+            with open(self.kernel.active_line_path, "rb") as file:
+                self.active_line_slot = mmap.mmap(
+                    file.fileno(), 4, access=mmap.ACCESS_READ
+                )
 
         self.listener_thread = None
         self.finish_flag = False
 
-        # DISABLED because sometimes this bypasses sending it up to us for some reason!
-        # Give it our same matplotlib backend
-        # backend = matplotlib.get_backend()
-
-        # Use Agg, which bubbles everything up as an image.
-        # Not perfect (I want interactive!) but it works.
-        backend = "Agg"
-
-        code = f"""
-import matplotlib
-matplotlib.use('{backend}')
-        """.strip()
-
-        # Use Inline actually, it's better I think
-        code = """
-%matplotlib inline
-import matplotlib.pyplot as plt
-""".strip()
-
-        for _ in self.run(code):
-            pass
-
-        # DISABLED because it doesn't work??
-        # Disable color outputs in the terminal, which don't look good in OI and aren't useful
-        # code = """
-        # from IPython.core.getipython import get_ipython
-        # get_ipython().colors = 'NoColor'
-        # """
-        # self.run(code)
-
     def terminate(self):
         self.kc.stop_channels()
         self.km.shutdown_kernel()
+        if self.active_line_slot:
+            self.active_line_slot.close()
+        self.kernel.remove_active_line_file()
 
     def run(self, code):
         while not self.kc.is_alive():
@@ -113,6 +95,9 @@ import matplotlib.pyplot as plt
         #         with open(f"{skill_library_path}/{filename}.py", "w") as file:
         #             file.write(function_code)
 
+        # A stopped run's listener may still be stopping its cell. It has to finish first,
+        # or it would read this run's messages
+        self._finish_listener()
         self.finish_flag = False
         try:
             try:
@@ -132,21 +117,79 @@ import matplotlib.pyplot as plt
 
     def _execute_code(self, code, message_queue):
         def iopub_message_listener():
+            try:
+                listen()
+            finally:
+                if active_line_thread:
+                    finished.set()
+                    active_line_thread.join()
+                # Wakes up _capture_output, which blocks until this arrives
+                message_queue.put(None)
+
+        def active_line_listener():
+            """
+            Passes on the line the kernel is running whenever it changes, at most once per sampling interval.
+            """
+            last_active_line = None
+            while not finished.wait(active_line_interval):
+                active_line = struct.unpack("<i", self.active_line_slot[:4])[0]
+                if active_line and active_line != last_active_line:
+                    last_active_line = active_line
+                    message_queue.put(
+                        {
+                            "type": "console",
+                            "format": "active_line",
+                            "content": active_line,
+                        }
+                    )
+
+        def wait_for_idle(timeout):
+            """
+            Reads this cell's messages until it goes idle, for up to timeout seconds. Returns whether it did.
+            No later cell has been sent yet (run waits for this thread), so nothing read here is theirs.
+            """
+            deadline = time.time() + timeout
+            while True:
+                try:
+                    msg = self.kc.iopub_channel.get_msg(
+                        timeout=max(0, deadline - time.time())
+                    )
+                except queue.Empty:
+                    return False
+                if (
+                    msg["parent_header"].get("msg_id") == msg_id
+                    and msg["header"]["msg_type"] == "status"
+                    and msg["content"]["execution_state"] == "idle"
+                ):
+                    return True
+
+        def stop_cell():
+            """
+            Interrupts the cell, unless it has already finished, and lets it go idle.
+            Otherwise the kernel aborts the next cell we send it.
+            """
+            # Its idle message may be on its way
+            if wait_for_idle(timeout=0.1):
+                return
+            if DEBUG_MODE:
+                print("interrupting kernel!!!!!")
+            self.km.interrupt_kernel()
+            wait_for_idle(timeout=5)
+
+        def listen():
             max_retries = 100
             while True:
                 # If self.finish_flag = True, and we didn't set it (we do below), we need to stop. That's our "stop"
                 if self.finish_flag == True:
-                    if DEBUG_MODE:
-                        print("interrupting kernel!!!!!")
-                    self.km.interrupt_kernel()
+                    stop_cell()
                     return
                 # For async usage
                 if (
                     hasattr(self.computer.interpreter, "stop_event")
                     and self.computer.interpreter.stop_event.is_set()
                 ):
-                    self.km.interrupt_kernel()
                     self.finish_flag = True
+                    stop_cell()
                     return
                 try:
                     input_patience = int(
@@ -196,7 +239,8 @@ import matplotlib.pyplot as plt
                             else:
                                 self.kc.input(user_input)
 
-                    msg = self.kc.iopub_channel.get_msg(timeout=0.05)
+                    # This returns as soon as a message arrives. The timeout is just how often we check for stops
+                    msg = self.kc.iopub_channel.get_msg(timeout=0.2)
                     self.last_output_time = time.time()
                 except queue.Empty:
                     continue
@@ -212,6 +256,10 @@ import matplotlib.pyplot as plt
                     print("Message received:", msg["content"])
                     print("-----------" * 10)
 
+                if msg["parent_header"].get("msg_id") != msg_id:
+                    # Left over from something else, like the pool's bootstrap
+                    continue
+
                 if (
                     msg["header"]["msg_type"] == "status"
                     and msg["content"]["execution_state"] == "idle"
@@ -292,6 +340,21 @@ import matplotlib.pyplot as plt
                             }
                         )
 
+        # Messages wait in the iopub channel, so it's fine to start listening after we execute
+        msg_id = self.kc.execute(code)
+
+        finished = threading.Event()
+        active_line_thread = None
+        if (
+            self.active_line_slot
+            and os.environ.get("INTERPRETER_ACTIVE_LINE_DETECTION", "True").lower()
+            == "true"
+        ):
+            active_line_thread = threading.Thread(
+                target=active_line_listener, daemon=True
+            )
+            active_line_thread.start()
+
         self.listener_thread = threading.Thread(target=iopub_message_listener)
         # self.listener_thread.daemon = True
         self.listener_thread.start()
@@ -301,8 +364,6 @@ import matplotlib.pyplot as plt
                 "thread is on:", self.listener_thread.is_alive(), self.listener_thread
             )
 
-        self.kc.execute(code)
-
     def detect_active_line(self, line):
         if "##active_line" in line:
             # Split the line by "##active_line" and grab the last element
@@ -318,152 +379,48 @@ import matplotlib.pyplot as plt
         return line, None
 
     def _capture_output(self, message_queue):
+        # The listener puts None on the queue when the kernel goes idle, or when it's stopped
         while True:
-            time.sleep(0.1)
-
-            # For async usage
-            if (
-                hasattr(self.computer.interpreter, "stop_event")
-                and self.computer.interpreter.stop_event.is_set()
-            ):
-                self.finish_flag = True
+            output = message_queue.get()
+            if output is None:
+                if DEBUG_MODE:
+                    print("we're done")
                 break
-
-            if self.listener_thread:
-                try:
-                    output = message_queue.get(timeout=0.1)
-                    if DEBUG_MODE:
-                        print(output)
-                    yield output
-
-                except queue.Empty:
-                    if self.finish_flag:
-                        time.sleep(0.1)
-
-                        try:
-                            output = message_queue.get(timeout=0.1)
-                            if DEBUG_MODE:
-                                print(output)
-                            yield output
-                        except queue.Empty:
-                            if DEBUG_MODE:
-                                print("we're done")
-                            break
+            if DEBUG_MODE:
+                print(output)
+            yield output
 
     def stop(self):
         self.finish_flag = True
 
+    def _finish_listener(self):
+        """
+        Stops the last run's listener, if it's still going, and waits for it to stop its cell.
+        """
+        if self.listener_thread is not None and self.listener_thread.is_alive():
+            self.finish_flag = True
+            self.listener_thread.join()
+
     def preprocess_code(self, code):
         return preprocess_python(code)
 
 
 def preprocess_python(code):
     """
-    Add active line markers
-    Wrap in a try except
+    Wrap in a try except (disabled)
+
+    Active lines aren't marked in the code anymore. The kernel samples them, see active_line_sampler_code.
+    Blank lines are kept, so the lines it reports match the code we were given.
     """
 
     code = code.strip()
 
-    # Add print commands that tell us what the active line is
-    # but don't do this if any line starts with ! or %
-    if (
-        not any(line.strip().startswith(("!", "%")) for line in code.split("\n"))
-        and os.environ.get("INTERPRETER_ACTIVE_LINE_DETECTION", "True").lower()
-        == "true"
-    ):
-        code = add_active_line_prints(code)
-
     # Wrap in a try except (DISABLED)
     # code = wrap_in_try_except(code)
 
-    # Remove any whitespace lines, as this will break indented blocks
-    # (are we sure about this? test this)
-    code_lines = code.split("\n")
-    code_lines = [c for c in code_lines if c.strip() != ""]
-    code = "\n".join(code_lines)
-
     return code
 
 
-def add_active_line_prints(code):
-    """
-    Add print statements indicating line numbers to a python string.
-    """
-    # Replace newlines and comments with pass statements, so the line numbers are accurate (ast will remove them otherwise)
-    code_lines = code.split("\n")
-    in_multiline_string = False
-    for i in range(len(code_lines)):
-        line = code_lines[i]
-        if '"""' in line or "'''" in line:
-            in_multiline_string = not in_multiline_string
-        if not in_multiline_string and (line.strip().startswith("#") or line == ""):
-            whitespace = len(line) - len(line.lstrip(" "))
-            code_lines[i] = " " * whitespace + "pass"
-    processed_code = "\n".join(code_lines)
-    try:
-        tree = ast.parse(processed_code)
-    except:
-        # If you can't parse the processed version, try the unprocessed version before giving up
-        tree = ast.parse(code)
-    transformer = AddLinePrints()
-    new_tree = transformer.visit(tree)
-    return ast.unparse(new_tree)
-
-
-class AddLinePrints(ast.NodeTransformer):
-    """
-    Transformer to insert print statements indicating the line number
-    before every executable line in the AST.
-    """
-
-    def insert_print_statement(self, line_number):
-        """Inserts a print statement for a given line number."""
-        return ast.Expr(
-            value=ast.Call(
-                func=ast.Name(id="print", ctx=ast.Load()),
-                args=[ast.Constant(value=f"##active_line{line_number}##")],
-                keywords=[],
-            )
-        )
-
-    def process_body(self, body):
-        """Processes a block of statements, adding print calls."""
-        new_body = []
-
-        # In case it's not iterable:
-        if not isinstance(body, list):
-            body = [body]
-
-        for sub_node in body:
-            if hasattr(sub_node, "lineno"):
-                new_body.append(self.insert_print_statement(sub_node.lineno))
-            new_body.append(sub_node)
-
-        return new_body
-
-    def visit(self, node):
-        """Overridden visit to transform nodes."""
-        new_node = super().visit(node)
-
-        # If node has a body, process it
-        if hasattr(new_node, "body"):
-            new_node.body = self.process_body(new_node.body)
-
-        # If node has an orelse block (like in for, while, if), process it
-        if hasattr(new_node, "orelse") and new_node.orelse:
-            new_node.orelse = self.process_body(new_node.orelse)
-
-        # Special case for Try nodes as they have multiple blocks
-        if isinstance(new_node, ast.Try):
-            for handler in new_node.handlers:
-                handler.body = self.process_body(handler.body)
-            if new_node.finalbody:
-                new_node.finalbody = self.process_body(new_node.finalbody)
-
-        return new_node
-
-
 def wrap_in_try_except(code):
     # Add import traceback
     code = "import traceback\n" + code
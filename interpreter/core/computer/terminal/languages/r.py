@@ -6,6 +6,7 @@ from .subprocess_language import SubprocessLanguage
 class R(SubprocessLanguage):
     file_extension = "r"
     name = "R"
+    end_of_execution_on_stderr = True
 
     def __init__(self):
         super().__init__()
@@ -36,6 +37,7 @@ tryCatch({{
     cat("##execution_error##\\n", conditionMessage(e), "\\n");
 }})
 cat("##end_of_execution##\\n");
+cat("##end_of_execution##\\n", file=stderr());
 """
         # Count the number of lines of processed_code
         # (R echoes all code back for some reason, but we can skip it if we track this!)
@@ -70,4 +72,5 @@ cat("##end_of_execution##\\n");
         return None
 
     def detect_end_of_execution(self, line):
-        return "##end_of_execution##" in line or "##execution_error##" in line
+        # (Not ##execution_error##, the end marker always comes after it)
+        return "##end_of_execution##" in line
@@ -6,6 +6,7 @@ from .subprocess_language import SubprocessLanguage
 class Ruby(SubprocessLanguage):
     file_extension = "rb"
     name = "Ruby"
+    end_of_execution_on_stderr = True
 
     def __init__(self):
         super().__init__()
@@ -36,6 +37,7 @@ rescue => e
   puts "##execution_error##\\n" + e.message
 ensure
   puts "##end_of_execution##\\n"
+  $stderr.puts "##end_of_execution##\\n"
 end
 """
         self.code_line_count = len(processed_code.split("\n"))
@@ -57,4 +59,5 @@ end
         return None
 
     def detect_end_of_execution(self, line):
-        return "##end_of_execution##" in line or "##execution_error##" in line
\ No newline at end of file
+        # (Not ##execution_error##, the end marker always comes after it)
+        return "##end_of_execution##" in line
\ No newline at end of file
@@ -1,14 +1,54 @@
+import codecs
 import os
 import platform
+import queue
 import re
+import select
+import shutil
+import signal
+import subprocess
+import tempfile
+import threading
+import time
+import traceback
 
-from .subprocess_language import SubprocessLanguage
+from .subprocess_language import (
+    END_OF_EXECUTION,
+    OUTPUT_BATCH_SIZE,
+    SubprocessLanguage,
+    batched_output,
+)
+
+# Loads the user's ~/.bashrc, then runs each file whose path arrives on the commands fd and writes "end" to the events fd.
+# Output from the file goes to the pty untouched, so stdout and stderr arrive in the order they were written.
+# Nobody is there to type into it, so commands read stdin from /dev/null, like they always have.
+pty_runner = """
+shopt -s expand_aliases
+[[ -f ~/.bashrc ]] && . ~/.bashrc >/dev/null 2>&1 </dev/null
+set -T
+while IFS= read -r -u {commands} __oi_file; do
+    __oi_line=0 __oi_second=$SECONDS __oi_seen=()
+    {active_line_trap}
+    . "$__oi_file" </dev/null
+    trap - DEBUG
+    printf 'end\\n' >&{events}
+done
+"""
+
+# Writes the line the file is on to the events fd, so nothing is added to the output and nothing needs parsing out.
+# A line is written the first time it's reached, and after that at most once a second, so a loop
+# costs a cheap check per command instead of a write. set -T carries it into the sourced file and its functions.
+active_line_trap = """trap '((LINENO != __oi_line && (SECONDS != __oi_second || !__oi_seen[LINENO]))) && [[ ${{BASH_SOURCE[0]}} == "$__oi_file" ]] && {{ __oi_seen[LINENO]=1 __oi_line=$LINENO __oi_second=$SECONDS; printf "%s\\n" $LINENO >&{events}; }}' DEBUG"""
+
+# How often an active line is passed on, in seconds. About as often as anyone could see it change
+active_line_interval = 0.05
 
 
 class Shell(SubprocessLanguage):
     file_extension = "sh"
     name = "Shell"
     aliases = ["bash", "sh", "zsh", "batch", "bat"]
+    end_of_execution_on_stderr = True
 
     def __init__(
         self,
@@ -21,6 +61,239 @@ class Shell(SubprocessLanguage):
         else:
             self.start_cmd = [os.environ.get("SHELL", "bash")]
 
+        # When the user's shell is bash it runs behind a pseudo-terminal, see pty_runner.
+        # Other shells (zsh, fish...) would lose their own syntax and rc files in bash,
+        # so code is piped to start_cmd instead, with echoed markers
+        self.bash = None
+        if platform.system() != "Windows":
+            shell = os.environ.get("SHELL", "bash")
+            if os.path.basename(shell) == "bash":
+                self.bash = shutil.which(shell)
+        self.commands = None
+        self.code_path = None
+        # Set once the running shell has gone, which can be noticed before it can be reaped
+        self.exited = None
+
+    def start_process(self):
+        if not self.bash:
+            return super().start_process()
+
+        import pty
+        import termios
+
+        if self.process:
+            self.terminate()
+
+        master, slave = pty.openpty()
+        # No echo, and no \r added before each \n
+        attributes = termios.tcgetattr(slave)
+        attributes[1] &= ~termios.OPOST
+        attributes[3] &= ~termios.ECHO
+        termios.tcsetattr(slave, termios.TCSANOW, attributes)
+
+        commands_read, commands_write = os.pipe()
+        events_read, events_write = os.pipe()
+
+        runner = pty_runner.format(
+            commands=commands_read,
+            events=events_write,
+            active_line_trap=(
+                active_line_trap.format(events=events_write)
+                if os.environ.get("INTERPRETER_ACTIVE_LINE_DETECTION", "True").lower()
+                == "true"
+                else ""
+            ),
+        )
+
+        my_env = os.environ.copy()
+        my_env["PYTHONIOENCODING"] = "utf-8"
+        # It's a terminal, but nobody is there to see colors or scroll a pager
+        my_env["TERM"] = "dumb"
+        my_env["PAGER"] = "cat"
+        my_env["GIT_PAGER"] = "cat"
+        self.process = subprocess.Popen(
+            [self.bash, "--noprofile", "--norc", "-c", runner],
+            stdin=slave,
+            stdout=slave,
+            stderr=slave,
+            pass_fds=(commands_read, events_write),
+            start_new_session=True,
+            env=my_env,
+        )
+        os.close(slave)
+        os.close(commands_read)
+        os.close(events_write)
+
+        file, self.code_path = tempfile.mkstemp(
+            prefix="open-interpreter-shell-", suffix=".sh"
+        )
+        os.close(file)
+        self.commands = commands_write
+
+        # Each process gets its own queue, so a dying one can't end the next one's runs
+        self.output_queue = queue.Queue()
+        self.exited = threading.Event()
+        threading.Thread(
+            target=self.handle_pty_output,
+            args=(master, events_read, self.output_queue, self.exited),
+            daemon=True,
+        ).start()
+
+    def terminate(self):
+        if not self.bash:
+            return super().terminate()
+
+        if self.process:
+            # The whole session, so nothing it started keeps the pty open
+            try:
+                os.killpg(self.process.pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            self.process.wait()
+            self.process = None
+        if self.commands is not None:
+            os.close(self.commands)
+            self.commands = None
+        if self.code_path:
+            try:
+                os.remove(self.code_path)
+            except OSError:
+                pass
+            self.code_path = None
+
+    def run(self, code):
+        if not self.bash:
+            yield from super().run(code)
+            return
+
+        try:
+            for attempt in range(2):
+                if (
+                    not self.process
+                    or self.process.poll() is not None
+                    or self.exited.is_set()
+                ):
+                    self.start_process()
+
+                # Drop anything left over from a run that ended early
+                while not self.output_queue.empty():
+                    self.output_queue.get_nowait()
+
+                # bash reads a sourced file whole, so it's free to be overwritten by the next run
+                with open(self.code_path, "w", encoding="utf-8") as file:
+                    file.write(code + "\n")
+                self.done.clear()
+                try:
+                    os.write(self.commands, (self.code_path + "\n").encode())
+                    break
+                except BrokenPipeError:
+                    if attempt:
+                        raise
+                    # The shell exited (the last run probably called exit) but hadn't been reaped yet
+                    self.process.wait()
+        except:
+            yield {
+                "type": "console",
+                "format": "output",
+                "content": traceback.format_exc(),
+            }
+            return
+
+        for output in batched_output(self.output_queue):
+            if output == END_OF_EXECUTION:
+                break
+            yield output
+
+        self.done.set()
+
+    def handle_pty_output(self, master, events, output_queue, exited):
+        """
+        Passes on output from the pty as it arrives, and active lines and ends of runs from the events pipe.
+        """
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        events_buffer = b""
+
+        def read_output():
+            try:
+                data = os.read(master, OUTPUT_BATCH_SIZE)
+            except OSError:
+                data = b""  # Linux raises EIO once nothing has the pty open
+            if data:
+                output_queue.put(
+                    {
+                        "type": "console",
+                        "format": "output",
+                        "content": decoder.decode(data),
+                    }
+                )
+            return data
+
+        last_active_line = None
+
+        def send_active_line(active_line):
+            # Subshells don't share the trap's memory of the last line, so they can repeat it
+            nonlocal last_active_line
+            if active_line and active_line != last_active_line:
+                last_active_line = active_line
+                output_queue.put(
+                    {
+                        "type": "console",
+                        "format": "active_line",
+                        "content": active_line,
+                    }
+                )
+
+        def drain_output():
+            # Everything written before the event is already waiting in the pty
+            while select.select([master], [], [], 0)[0] and read_output():
+                pass
+
+        # The latest line that hasn't been passed on yet, and when the next one can be
+        pending_line = None
+        next_send = 0
+
+        fds = [master, events]
+        try:
+            while True:
+                timeout = None
+                if pending_line:
+                    timeout = next_send - time.monotonic()
+                    if timeout <= 0:
+                        send_active_line(pending_line)
+                        pending_line = None
+                        next_send = time.monotonic() + active_line_interval
+                        timeout = None
+
+                readable = select.select(fds, [], [], timeout)[0]
+                if master in readable and not read_output():
+                    # Nothing has the pty open anymore, but the events pipe may still have something to say
+                    fds.remove(master)
+                if events in readable:
+                    data = os.read(events, 65536)
+                    if not data:
+                        # The shell exited
+                        drain_output()
+                        break
+                    events_buffer += data
+                    *events_lines, events_buffer = events_buffer.split(b"\n")
+                    for event in events_lines:
+                        if event.isdigit():
+                            pending_line = int(event)
+                        elif event == b"end":
+                            send_active_line(pending_line)
+                            pending_line = None
+                            # The next run starts over, even on the line this one ended on
+                            last_active_line = None
+                            drain_output()
+                            output_queue.put(END_OF_EXECUTION)
+        finally:
+            os.close(master)
+            os.close(events)
+            # The shell may still have the commands pipe open for a moment, so don't let a run write to it
+            exited.set()
+            # Whatever was running won't finish now
+            output_queue.put(END_OF_EXECUTION)
+
     def preprocess_code(self, code):
         return preprocess_shell(code)
 
@@ -54,6 +327,7 @@ def preprocess_shell(code):
 
     # Add end command (we'll be listening for this so we know when it ends)
     code += '\necho "##end_of_execution##"'
+    code += '\necho "##end_of_execution##" >&2'
 
     return code
 
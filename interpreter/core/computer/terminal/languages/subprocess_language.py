@@ -1,3 +1,4 @@
+import codecs
 import os
 import queue
 import re
@@ -8,8 +9,81 @@ import traceback
 
 from ..base_language import BaseLanguage
 
+# The stream readers put these on the output queue once they've read past the end_of_execution marker
+END_OF_STDOUT = "##end_of_stdout##"
+END_OF_STDERR = "##end_of_stderr##"
+# ...or this, if execution ended some other way (like a KeyboardInterrupt)
+END_OF_EXECUTION = "##end_of_execution##"
+
+# Output is passed on in batches of at most this many characters, at most this many seconds apart
+OUTPUT_BATCH_SIZE = 65536
+OUTPUT_BATCH_INTERVAL = 0.05
+
+# A line, ending the way universal newlines would end it, so a progress bar's \r updates are lines too
+line_pattern = re.compile(r"[^\r\n]*(?:\r\n|\r|\n)")
+# The part of a line before its last redraw (a \r with more of the line after it)
+redrawn_pattern = re.compile(r"[^\n]*(?=\r[^\n])")
+
+
+def collapse_carriage_returns(text):
+    """
+    Keeps only the final state of each line that was redrawn with \r, like a progress bar.
+    The \r stays, so a state that continues one from an earlier batch still reads as a redraw.
+    """
+    if "\r" not in text:
+        return text
+    return redrawn_pattern.sub("", text.replace("\r\n", "\n"))
+
+
+def batched_output(output_queue):
+    """
+    Yields everything put on output_queue, merging output that arrives within OUTPUT_BATCH_INTERVAL of the first
+    into one chunk (up to OUTPUT_BATCH_SIZE), with redrawn lines collapsed. Anything else is yielded as soon as
+    the output before it has been.
+    """
+    batch = None
+    deadline = 0
+
+    def flush():
+        batch["content"] = collapse_carriage_returns(batch["content"])
+        return batch
+
+    while True:
+        if batch is None:
+            item = output_queue.get()
+        else:
+            try:
+                item = output_queue.get(timeout=max(deadline - time.monotonic(), 0))
+            except queue.Empty:
+                yield flush()
+                batch = None
+                continue
+
+        if (
+            isinstance(item, dict)
+            and item["type"] == "console"
+            and item["format"] == "output"
+        ):
+            if batch is None:
+                batch = dict(item)
+                deadline = time.monotonic() + OUTPUT_BATCH_INTERVAL
+            else:
+                batch["content"] += item["content"]
+            if len(batch["content"]) >= OUTPUT_BATCH_SIZE:
+                yield flush()
+                batch = None
+        else:
+            if batch is not None:
+                yield flush()
+                batch = None
+            yield item
+
 
 class SubprocessLanguage(BaseLanguage):
+    # Set this if preprocess_code also writes the end_of_execution marker to stderr.
+    # Then run() waits for both streams to pass it, so no stderr is cut off.
+    end_of_execution_on_stderr = False
+
     def __init__(self):
         self.start_cmd = []
         self.process = None
@@ -87,6 +161,10 @@ class SubprocessLanguage(BaseLanguage):
             }
             return
 
+        # Drop anything left over from a run that ended early
+        while not self.output_queue.empty():
+            self.output_queue.get_nowait()
+
         while retry_count <= max_retries:
             if self.verbose:
                 print(f"(after processing) Running processed code:\n{code}\n---")
@@ -119,75 +197,113 @@ class SubprocessLanguage(BaseLanguage):
                     }
                     return
 
-        while True:
-            if not self.output_queue.empty():
-                yield self.output_queue.get()
-            else:
-                time.sleep(0.1)
-            try:
-                output = self.output_queue.get(timeout=0.3)  # Waits for 0.3 seconds
-                yield output
-            except queue.Empty:
-                if self.done.is_set():
-                    # Try to yank 3 more times from it... maybe there's something in there...
-                    # (I don't know if this actually helps. Maybe we just need to yank 1 more time)
-                    for _ in range(3):
-                        if not self.output_queue.empty():
-                            yield self.output_queue.get()
-                        time.sleep(0.2)
+        # Block until every stream has read past the end_of_execution marker
+        waiting_for = {END_OF_STDOUT}
+        if self.end_of_execution_on_stderr:
+            waiting_for.add(END_OF_STDERR)
+
+        for output in batched_output(self.output_queue):
+            if output == END_OF_EXECUTION:
+                break
+            if output in (END_OF_STDOUT, END_OF_STDERR):
+                waiting_for.discard(output)
+                if not waiting_for:
                     break
+                continue
+            yield output
+
+        self.done.set()
+
+    def read_lines(self, stream):
+        """
+        Reads the stream in large chunks, yielding the complete lines from each chunk as a list.
+        """
+        fd = stream.fileno()
+        decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+        partial = ""
+        while True:
+            data = os.read(fd, OUTPUT_BATCH_SIZE)
+            text = partial + decoder.decode(data, final=not data)
+            if not data:
+                if text:
+                    yield [text]
+                return
+
+            lines = line_pattern.findall(text)
+            partial = text[sum(len(line) for line in lines) :]
+            if text.endswith("\r"):
+                # It might be half of a \r\n, so wait for the next chunk
+                partial = lines.pop()
+            if lines:
+                yield [
+                    line[:-2] + "\n" if line.endswith("\r\n") else line
+                    for line in lines
+                ]
 
     def handle_stream_output(self, stream, is_error_stream):
+        end_of_stream = END_OF_STDERR if is_error_stream else END_OF_STDOUT
+        # Plain output from a whole chunk goes out as one piece
+        output = []
+
+        def flush_output():
+            if output:
+                self.output_queue.put(
+                    {"type": "console", "format": "output", "content": "".join(output)}
+                )
+                output.clear()
+
+        def put(item):
+            # Keeps the order things were printed in
+            flush_output()
+            self.output_queue.put(item)
+
         try:
-            for line in iter(stream.readline, ""):
-                if self.verbose:
-                    print(f"Received output line:\n{line}\n---")
-
-                line = self.line_postprocessor(line)
-
-                if line is None:
-                    continue  # `line = None` is the postprocessor's signal to discard completely
-
-                if self.detect_active_line(line):
-                    active_line = self.detect_active_line(line)
-                    self.output_queue.put(
-                        {
-                            "type": "console",
-                            "format": "active_line",
-                            "content": active_line,
-                        }
-                    )
-                    # Sometimes there's a little extra on the same line, so be sure to send that out
-                    line = re.sub(r"##active_line\d+##", "", line)
-                    if line:
-                        self.output_queue.put(
-                            {"type": "console", "format": "output", "content": line}
-                        )
-                elif self.detect_end_of_execution(line):
-                    # Sometimes there's a little extra on the same line, so be sure to send that out
-                    line = line.replace("##end_of_execution##", "").strip()
-                    if line:
-                        self.output_queue.put(
-                            {"type": "console", "format": "output", "content": line}
+            for lines in self.read_lines(stream):
+                for line in lines:
+                    if self.verbose:
+                        print(f"Received output line:\n{line}\n---")
+
+                    line = self.line_postprocessor(line)
+
+                    if line is None:
+                        continue  # `line = None` is the postprocessor's signal to discard completely
+
+                    if self.detect_active_line(line):
+                        active_line = self.detect_active_line(line)
+                        put(
+                            {
+                                "type": "console",
+                                "format": "active_line",
+                                "content": active_line,
+                            }
                         )
-                    self.done.set()
-                elif is_error_stream and "KeyboardInterrupt" in line:
-                    self.output_queue.put(
-                        {
-                            "type": "console",
-                            "format": "output",
-                            "content": "KeyboardInterrupt",
-                        }
-                    )
-                    time.sleep(0.1)
-                    self.done.set()
-                else:
-                    self.output_queue.put(
-                        {"type": "console", "format": "output", "content": line}
-                    )
+                        # Sometimes there's a little extra on the same line, so be sure to send that out
+                        line = re.sub(r"##active_line\d+##", "", line)
+                        if line:
+                            output.append(line)
+                    elif self.detect_end_of_execution(line):
+                        # Sometimes there's a little extra on the same line, so be sure to send that out
+                        line = line.replace("##end_of_execution##", "").strip()
+                        if line:
+                            output.append(line)
+                        put(end_of_stream)
+                    elif is_error_stream and "KeyboardInterrupt" in line:
+                        output.append("KeyboardInterrupt")
+                        put(END_OF_EXECUTION)
+                    else:
+                        output.append(line)
+
+                flush_output()
         except ValueError as e:
             if "operation on closed file" in str(e):
                 if self.verbose:
                     print("Stream closed while reading.")
             else:
                 raise e
+        except OSError:
+            # terminate() closed the stream while we were reading it
+            if self.verbose:
+                print("Stream closed while reading.")
+
+        # The stream closed (the process probably exited), so nothing more is coming from it
+        self.output_queue.put(end_of_stream)
@@ -0,0 +1,217 @@
+import atexit
+import mmap
+import os
+import re
+import shutil
+import tempfile
+import uuid
+from array import array
+
+# Finished outputs kept on disk. Older ones are deleted as new ones finish
+MAX_OUTPUTS = 200
+
+
+class OutputStore:
+    """
+    Keeps the full console output of every code run on disk, so messages only need to hold a truncated view of it.
+
+    Each output is an append-only file in a per-session directory, named by its output ID.
+    Reads go through mmap, so paging through or grepping a huge output doesn't load it into memory.
+
+    Each store gets its own directory. The terminal hands it to its Jupyter kernels in their
+    INTERPRETER_OUTPUT_DIR environment variable, so the computer API inside a kernel reads
+    the same outputs the host wrote. Only the last `max_outputs` finished outputs are kept.
+    """
+
+    def __init__(self, directory=None, max_outputs=MAX_OUTPUTS):
+        directory = directory or os.environ.get("INTERPRETER_OUTPUT_DIR")
+        if directory:
+            # Someone else (probably the process that started us) owns this directory
+            os.makedirs(directory, exist_ok=True)
+            self._owns_directory = False
+        else:
+            directory = tempfile.mkdtemp(prefix="open-interpreter-output-")
+            self._owns_directory = True
+            atexit.register(self.cleanup)
+        self.directory = directory
+        self.max_outputs = max_outputs
+
+        self._files = {}  # Open, unfinished outputs
+        self._line_offsets = {}  # output_id: (file size, line offsets)
+
+    def create(self):
+        """
+        Starts a new, empty output and returns its ID.
+        """
+        output_id = uuid.uuid4().hex[:8]
+        self._files[output_id] = open(self._path(output_id), "ab")
+        return output_id
+
+    def append(self, output_id, text):
+        if not text:
+            return
+        file = self._files.get(output_id)
+        if file is None:
+            file = self._files[output_id] = open(self._path(output_id), "ab")
+        file.write(text.encode("utf-8", errors="replace"))
+
+    def flush(self):
+        """
+        Makes everything appended so far readable by other processes.
+        """
+        for file in self._files.values():
+            file.flush()
+
+    def finish(self):
+        """
+        Closes the open outputs and records them, in order, as the latest finished outputs.
+        """
+        if not self._files:
+            return
+        for file in self._files.values():
+            file.close()
+        with open(os.path.join(self.directory, "index"), "a") as index:
+            index.write("".join(output_id + "\n" for output_id in self._files))
+        self._files = {}
+
+        output_ids = self.output_ids()
+        if len(output_ids) > self.max_outputs:
+            kept = output_ids[-self.max_outputs :]
+            self._write_index(kept)
+            for output_id in output_ids[: -self.max_outputs]:
+                self._remove(output_id)
+
+    def clear(self):
+        """
+        Deletes every output, for a new conversation.
+        """
+        for file in self._files.values():
+            file.close()
+        self._files = {}
+        for output_id in self.output_ids():
+            self._remove(output_id)
+        self._write_index([])
+
+    def last_output_id(self):
+        """
+        The ID of the most recently finished output, or None.
+        """
+        try:
+            with open(os.path.join(self.directory, "index")) as index:
+                output_ids = index.read().split()
+        except FileNotFoundError:
+            return None
+        return output_ids[-1] if output_ids else None
+
+    def output_ids(self):
+        """
+        Every output in this session, finished ones first, oldest first.
+        """
+        try:
+            with open(os.path.join(self.directory, "index")) as index:
+                output_ids = index.read().split()
+        except FileNotFoundError:
+            output_ids = []
+        return output_ids + [i for i in self._files if i not in output_ids]
+
+    def read(self, output_id, start=0, end=None):
+        """
+        Returns lines [start:end] of an output (slice semantics, so negative numbers count from the end).
+        """
+        path = self._path(output_id)
+        if not os.path.exists(path):
+            raise ValueError(f"There is no output with ID {output_id!r}.")
+        if output_id in self._files:
+            self._files[output_id].flush()
+
+        offsets = self._get_line_offsets(output_id)
+        lines = range(len(offsets) - 1)[start:end]
+        if not lines:
+            return ""
+
+        with open(path, "rb") as file:
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                return data[offsets[lines.start] : offsets[lines.stop]].decode(
+                    "utf-8", errors="replace"
+                )
+
+    def line_count(self, output_id):
+        return len(self._get_line_offsets(output_id)) - 1
+
+    def grep(self, pattern, output_id=None, max_matches=100):
+        """
+        Finds lines matching a regular expression, in one output or (by default) in all of them.
+        Returns (output_id, line_number, line) tuples. Line numbers start at 0, like read().
+        """
+        regex = re.compile(pattern)
+        output_ids = [output_id] if output_id else self.output_ids()
+        self.flush()
+
+        matches = []
+        for output_id in output_ids:
+            path = self._path(output_id)
+            if not os.path.exists(path):
+                if len(output_ids) == 1:
+                    raise ValueError(f"There is no output with ID {output_id!r}.")
+                continue
+            if os.path.getsize(path) == 0:
+                continue
+            with open(path, "rb") as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    for line_number, line in enumerate(iter(data.readline, b"")):
+                        line = line.decode("utf-8", errors="replace").rstrip("\r\n")
+                        if regex.search(line):
+                            matches.append((output_id, line_number, line))
+                            if len(matches) >= max_matches:
+                                return matches
+        return matches
+
+    def cleanup(self):
+        for file in self._files.values():
+            file.close()
+        self._files = {}
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+
+    def _write_index(self, output_ids):
+        # Replaced in one go, so a kernel reading it never sees half of it
+        path = os.path.join(self.directory, "index")
+        with open(path + ".tmp", "w") as index:
+            index.write("".join(output_id + "\n" for output_id in output_ids))
+        os.replace(path + ".tmp", path)
+
+    def _remove(self, output_id):
+        self._line_offsets.pop(output_id, None)
+        try:
+            os.remove(self._path(output_id))
+        except OSError:
+            pass
+
+    def _path(self, output_id):
+        # IDs come from the LLM too, so don't let them point outside the directory
+        return os.path.join(self.directory, os.path.basename(str(output_id)) + ".txt")
+
+    def _get_line_offsets(self, output_id):
+        """
+        Byte offsets where each line starts, plus the file size. Cached until the file grows.
+        """
+        path = self._path(output_id)
+        size = os.path.getsize(path)
+        cached = self._line_offsets.get(output_id)
+        if cached and cached[0] == size:
+            return cached[1]
+
+        offsets = array("Q", [0])
+        if size:
+            with open(path, "rb") as file:
+                with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                    position = data.find(b"\n")
+                    while position != -1:
+                        offsets.append(position + 1)
+                        position = data.find(b"\n", position + 1)
+            if offsets[-1] != size:
+                # The last line has no newline
+                offsets.append(size)
+
+        self._line_offsets[output_id] = (size, offsets)
+        return offsets
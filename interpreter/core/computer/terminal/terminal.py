@@ -1,35 +1,28 @@
 import json
 import os
+import queue
+import threading
 import time
 import subprocess
 import getpass
+import traceback
 
 from ..utils.recipient_utils import parse_for_recipient
 from .languages.applescript import AppleScript
 from .languages.html import HTML
 from .languages.java import Java
 from .languages.javascript import JavaScript
+from .languages.jupyter_kernel_pool import KernelPool, import_computer_api_code
 from .languages.powershell import PowerShell
 from .languages.python import Python
 from .languages.r import R
 from .languages.react import React
 from .languages.ruby import Ruby
 from .languages.shell import Shell
+from .output_store import OutputStore
 
 # Should this be renamed to OS or System?
 
-import_computer_api_code = """
-import os
-os.environ["INTERPRETER_COMPUTER_API"] = "False" # To prevent infinite recurring import of the computer API
-
-import time
-import datetime
-from interpreter import interpreter
-
-computer = interpreter.computer
-""".strip()
-
-
 class Terminal:
     def __init__(self, computer):
         self.computer = computer
@@ -47,6 +40,15 @@ class Terminal:
         ]
         self._active_languages = {}
 
+        # Full console output lives on disk
+        self.output_store = OutputStore()
+
+        # Python kernels take a while to boot. Once Python has run, the next one is started ahead of time.
+        # They're told where the output store is, so the computer API inside them can read it
+        self.kernel_pool = KernelPool(
+            computer, env={"INTERPRETER_OUTPUT_DIR": self.output_store.directory}
+        )
+
     def sudo_install(self, package):
         try:
             # First, try to install without sudo
@@ -70,6 +72,31 @@ class Terminal:
 
         return True
 
+    def output(self, output_id, start=0, end=None):
+        """
+        Returns lines [start:end] of the full output with this ID, even if it was truncated.
+        """
+        return self.output_store.read(output_id, start, end)
+
+    def grep(self, pattern, output_id=None, max_matches=100):
+        """
+        Searches the full output with this ID (or every output so far) for lines matching a regular expression. Returns them as "output_id:line_number: line".
+        """
+        matches = self.output_store.grep(pattern, output_id, max_matches=max_matches)
+        return "\n".join(
+            f"{output_id}:{line_number}: {line}"
+            for output_id, line_number, line in matches
+        )
+
+    def get_last_output(self, start=0, end=None):
+        """
+        Returns lines [start:end] of the full output of the last code that finished running.
+        """
+        output_id = self.output_store.last_output_id()
+        if output_id is None:
+            return ""
+        return self.output_store.read(output_id, start, end)
+
     def get_language(self, language):
         for lang in self.languages:
             if language.lower() == lang.name.lower() or (
@@ -89,6 +116,9 @@ class Terminal:
                 return [{"type": "console", "format": "output", "content": f"Failed to install package {package}."}]
 
         if language == "python":
+            # A kernel from the pool may have imported the computer API already
+            self._get_active_language(language)
+
             if (
                 self.computer.import_computer_api
                 and not self.computer._has_imported_computer_api
@@ -108,31 +138,6 @@ class Terminal:
                 self.computer._has_imported_skills = True
                 self.computer.skills.import_skills()
 
-            # This won't work because truncated code is stored in interpreter.messages :/
-            # If the full code was stored, we could do this:
-            if False and "get_last_output()" in code:
-                if "# We wouldn't want to have maximum recursion depth!" in code:
-                    # We just tried to run this, in a moment.
-                    pass
-                else:
-                    code_outputs = [
-                        m
-                        for m in self.computer.interpreter.messages
-                        if m["role"] == "computer"
-                        and "content" in m
-                        and m["content"] != ""
-                    ]
-                    if len(code_outputs) > 0:
-                        last_output = code_outputs[-1]["content"]
-                    else:
-                        last_output = ""
-                    last_output = json.dumps(last_output)
-
-                    self.computer.run(
-                        "python",
-                        f"# We wouldn't want to have maximum recursion depth!\nimport json\ndef get_last_output():\n    return '''{last_output}'''",
-                    )
-
         if stream == False:
             # If stream == False, *pull* from _streaming_run.
             output_messages = []
@@ -153,7 +158,56 @@ class Terminal:
             # If stream == True, replace this with _streaming_run.
             return self._streaming_run(language, code, display=display)
 
-    def _streaming_run(self, language, code, display=False):
+    def run_concurrently(self, calls, display=False):
+        """
+        Runs several (tool_call_id, language, code) calls at once, streaming their output as it arrives.
+        Each language runs on its own thread, on its own instance in self._active_languages.
+        Calls in the same language share that instance's state, so they run one after another.
+        Every chunk is tagged with the tool_call_id of the call that produced it.
+        """
+        calls_by_language = {}
+        for call in calls:
+            calls_by_language.setdefault(call[1], []).append(call)
+
+        output_queue = queue.Queue()
+
+        def run_calls(language_calls):
+            for tool_call_id, language, code in language_calls:
+                try:
+                    for chunk in self.run(language, code, stream=True, display=display):
+                        output_queue.put({**chunk, "tool_call_id": tool_call_id})
+                except Exception:
+                    output_queue.put(
+                        {
+                            "type": "console",
+                            "format": "output",
+                            "content": traceback.format_exc(),
+                            "tool_call_id": tool_call_id,
+                        }
+                    )
+            output_queue.put(None)  # This language is done
+
+        threads = [
+            threading.Thread(target=run_calls, args=(language_calls,), daemon=True)
+            for language_calls in calls_by_language.values()
+        ]
+        for thread in threads:
+            thread.start()
+
+        running = len(threads)
+        try:
+            while running:
+                chunk = output_queue.get()
+                if chunk is None:
+                    running -= 1
+                else:
+                    yield chunk
+        except BaseException:
+            # Closed early, interrupted, or failed. Either way, don't leave the calls running
+            self.stop()
+            raise
+
+    def _get_active_language(self, language):
         if language not in self._active_languages:
             # Get the language. Pass in self.computer *if it takes a single argument*
             # but pass in nothing if not. This makes custom languages easier to add / understand.
@@ -162,8 +216,12 @@ class Terminal:
                 self._active_languages[language] = lang_class(self.computer)
             else:
                 self._active_languages[language] = lang_class()
+        return self._active_languages[language]
+
+    def _streaming_run(self, language, code, display=False):
+        active_language = self._get_active_language(language)
         try:
-            for chunk in self._active_languages[language].run(code):
+            for chunk in active_language.run(code):
                 # self.format_to_recipient can format some messages as having a certain recipient.
                 # Here we add that to the LMC messages:
                 if chunk["type"] == "console" and chunk.get("format") == "output":
@@ -1,6 +1,10 @@
+import hashlib
 import io
+import threading
+from collections import OrderedDict
 
 from ...utils.lazy_import import lazy_import
+from . import ocr_engine
 
 # Lazy import of optional packages
 np = lazy_import("numpy")
@@ -11,177 +15,131 @@ except:
 PIL = lazy_import("PIL")
 pytesseract = lazy_import("pytesseract")
 
-
-def pytesseract_get_text(img):
-    # List the attributes of pytesseract, which will trigger lazy loading of it
-    attributes = dir(pytesseract)
-    if pytesseract == None:
-        raise ImportError("The pytesseract module could not be imported.")
-
-    result = pytesseract.image_to_string(img)
-    return result
-
-
-def pytesseract_get_text_bounding_boxes(img):
-    # Convert PIL Image to NumPy array
-    img_array = np.array(img)
-
-    # Convert the image to grayscale
-    gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
-
-    # Use pytesseract to get the data from the image
-    d = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
-
-    # Create an empty list to hold dictionaries for each bounding box
-    boxes = []
-
-    # Iterate through the number of detected boxes based on the length of one of the property lists
-    for i in range(len(d["text"])):
-        # For each box, create a dictionary with the properties you're interested in
-        box = {
-            "text": d["text"][i],
-            "top": d["top"][i],
-            "left": d["left"][i],
-            "width": d["width"][i],
-            "height": d["height"][i],
-        }
-        # Append this box dictionary to the list
-        boxes.append(box)
-
-    return boxes
-
-
-def find_text_in_image(img, text, debug=False):
-    # Convert PIL Image to NumPy array
-    img_array = np.array(img)
-
-    # Convert the image to grayscale
-    gray = cv2.cvtColor(img_array, cv2.COLOR_BGR2GRAY)
-
-    # Use pytesseract to get the data from the image
-    d = pytesseract.image_to_data(gray, output_type=pytesseract.Output.DICT)
-
-    # Initialize an empty list to store the centers of the bounding boxes
-    centers = []
-
-    # Get the number of detected boxes
-    n_boxes = len(d["level"])
-
-    # Create a copy of the grayscale image to draw on
-    img_draw = np.array(gray.copy())
-
-    # Convert the img_draw grayscale image to RGB
-    img_draw = cv2.cvtColor(img_draw, cv2.COLOR_GRAY2RGB)
-
-    id = 0
-
-    # Loop through each box
-    for i in range(n_boxes):
-        if debug:
-            # (DEBUGGING) Draw each box on the grayscale image
-            cv2.rectangle(
-                img_draw,
-                (d["left"][i], d["top"][i]),
-                (d["left"][i] + d["width"][i], d["top"][i] + d["height"][i]),
-                (0, 255, 0),
-                2,
-            )
-            # Draw the detected text in the rectangle in small font
-            font = cv2.FONT_HERSHEY_SIMPLEX
-            font_scale = 0.5
-            font_color = (0, 0, 255)
-            line_type = 2
-
-            cv2.putText(
-                img_draw,
-                d["text"][i],
-                (d["left"][i], d["top"][i] - 10),
-                font,
-                font_scale,
-                font_color,
-                line_type,
-            )
-
-        # Print the text of the box
-        # If the text in the box matches the given text
-        if text.lower() in d["text"][i].lower():
-            # Find the start index of the matching text in the box
-            start_index = d["text"][i].lower().find(text.lower())
-            # Calculate the percentage of the box width that the start of the matching text represents
-            start_percentage = start_index / len(d["text"][i])
-            # Move the left edge of the box to the right by this percentage of the box width
-            d["left"][i] = d["left"][i] + int(d["width"][i] * start_percentage)
-
-            # Calculate the width of the matching text relative to the entire text in the box
-            text_width_percentage = len(text) / len(d["text"][i])
-            # Adjust the width of the box to match the width of the matching text
-            d["width"][i] = int(d["width"][i] * text_width_percentage)
-
-            # Calculate the center of the bounding box
-            center = (
-                d["left"][i] + d["width"][i] / 2,
-                d["top"][i] + d["height"][i] / 2,
-            )
-
-            # Add the center to the list
-            centers.append(center)
-
-            # Draw the bounding box on the image in red and make it slightly larger
-            larger = 10
-            cv2.rectangle(
-                img_draw,
-                (d["left"][i] - larger, d["top"][i] - larger),
-                (
-                    d["left"][i] + d["width"][i] + larger,
-                    d["top"][i] + d["height"][i] + larger,
-                ),
-                (255, 0, 0),
-                7,
-            )
-
-            # Create a small black square background for the ID
-            cv2.rectangle(
-                img_draw,
-                (
-                    d["left"][i] + d["width"][i] // 2 - larger * 2,
-                    d["top"][i] + d["height"][i] // 2 - larger * 2,
-                ),
-                (
-                    d["left"][i] + d["width"][i] // 2 + larger * 2,
-                    d["top"][i] + d["height"][i] // 2 + larger * 2,
-                ),
-                (0, 0, 0),
-                -1,
-            )
-
-            # Put the ID in the center of the bounding box in red
-            cv2.putText(
-                img_draw,
-                str(id),
-                (
-                    d["left"][i] + d["width"][i] // 2 - larger,
-                    d["top"][i] + d["height"][i] // 2 + larger,
-                ),
-                cv2.FONT_HERSHEY_DUPLEX,
-                1,
-                (255, 155, 155),
-                4,
-            )
-
-            # Increment id
-            id += 1
+# Screenshots whose word boxes are kept, so finding text, finding icons and reading
+# the screen all share one Tesseract pass per frame
+OCR_CACHE_SIZE = 8
+OCR_COLUMNS = (
+    "level",
+    "block_num",
+    "par_num",
+    "line_num",
+    "word_num",
+    "left",
+    "top",
+    "width",
+    "height",
+)
+
+# (image hash, mode, size, region): word boxes, least recently used first
+_ocr_tables = OrderedDict()
+_ocr_lock = threading.Lock()
+
+
+def pytesseract_get_text_table(img, region=None):
+    """
+    Returns Tesseract's word boxes for a PIL image as NumPy columns: "text", "conf", and
+    "left", "top", "width", "height" in the image's pixels, plus Tesseract's layout numbers.
+
+    Only the region (left, top, width, height) is read, if one is given, such as the active window.
+    Read once per image content and region, then shared. The columns are read-only.
+    """
+    key = (hashlib.sha256(img.tobytes()).hexdigest(), img.mode, img.size, region)
+    with _ocr_lock:
+        if key in _ocr_tables:
+            _ocr_tables.move_to_end(key)
+            return _ocr_tables[key]
+
+    image = img
+    if region is not None:
+        left, top, width, height = region
+        image = img.crop((left, top, left + width, top + height))
+
+    # Big screenshots are read in tiles, in parallel
+    d = ocr_engine.image_to_data(np.asarray(image.convert("L")))
+
+    table = {column: np.asarray(d[column], dtype=int) for column in OCR_COLUMNS}
+    table["text"] = np.asarray(d["text"], dtype=str)
+    table["conf"] = np.asarray(d["conf"], dtype=float)
+    if region is not None:
+        table["left"] += region[0]
+        table["top"] += region[1]
+    for column in table.values():
+        column.setflags(write=False)
+
+    with _ocr_lock:
+        _ocr_tables[key] = table
+        while len(_ocr_tables) > OCR_CACHE_SIZE:
+            _ocr_tables.popitem(last=False)
+    return table
+
+
+def pytesseract_get_text(img, region=None):
+    table = pytesseract_get_text_table(img, region)
+
+    # Words on a line are separated by spaces, lines by newlines, paragraphs by a blank line
+    paragraphs = OrderedDict()
+    words = np.flatnonzero(np.char.strip(table["text"]) != "")
+    for i in words:
+        paragraph = (table["block_num"][i], table["par_num"][i])
+        lines = paragraphs.setdefault(paragraph, OrderedDict())
+        lines.setdefault(table["line_num"][i], []).append(table["text"][i])
+
+    return "\n\n".join(
+        "\n".join(" ".join(line) for line in lines.values())
+        for lines in paragraphs.values()
+    )
+
+
+def pytesseract_get_text_bounding_boxes(img, region=None):
+    table = pytesseract_get_text_table(img, region)
+
+    # A dictionary for each box, with the properties you're interested in
+    columns = ["text", "top", "left", "width", "height"]
+    return [
+        dict(zip(columns, box))
+        for box in zip(*[table[column].tolist() for column in columns])
+    ]
+
+
+def find_text_in_image(img, text, debug=False, region=None):
+    table = pytesseract_get_text_table(img, region)
+    lefts, tops = table["left"], table["top"]
+    widths, heights = table["width"], table["height"]
+    lengths = np.char.str_len(table["text"])
+    boxes = np.char.lower(table["text"])
+
+    # Boxes that contain the text
+    starts = np.char.find(boxes, text.lower())
+    matches = np.flatnonzero((starts >= 0) & (lengths > 0))
+
+    # Narrow each box to the matching text, assuming characters of equal width
+    match_lefts = lefts[matches] + (
+        widths[matches] * starts[matches] / lengths[matches]
+    ).astype(int)
+    match_widths = (widths[matches] * len(text) / lengths[matches]).astype(int)
+
+    # The centers of the bounding boxes
+    centers = [
+        (float(left + width / 2), float(top + height / 2))
+        for left, width, top, height in zip(
+            match_lefts, match_widths, tops[matches], heights[matches]
+        )
+    ]
+
+    if debug:
+        draw_text_boxes(img, table, matches, match_lefts, match_widths)
 
     if not centers:
+        # Look for the words separately, and take two that are close together
         word_centers = []
         for word in text.split():
-            for i in range(n_boxes):
-                if word.lower() in d["text"][i].lower():
-                    center = (
-                        d["left"][i] + d["width"][i] / 2,
-                        d["top"][i] + d["height"][i] / 2,
-                    )
-                    center = (center[0] / 2, center[1] / 2)
-                    word_centers.append(center)
+            for i in np.flatnonzero(np.char.find(boxes, word.lower()) >= 0):
+                center = (
+                    float(lefts[i] + widths[i] / 2),
+                    float(tops[i] + heights[i] / 2),
+                )
+                center = (center[0] / 2, center[1] / 2)
+                word_centers.append(center)
 
         for center1 in word_centers:
             for center2 in word_centers:
@@ -200,14 +158,84 @@ def find_text_in_image(img, text, debug=False):
             if centers:
                 break
 
-    bounding_box_image = PIL.Image.fromarray(img_draw)
-    bounding_box_image.format = img.format
-
     # Convert centers to relative
     img_width, img_height = img.size
     centers = [(x / img_width, y / img_height) for x, y in centers]
 
+    return centers
+
+
+def draw_text_boxes(img, table, matches, match_lefts, match_widths):
+    """
+    (DEBUGGING) Draws every box Tesseract found on a grayscale copy of the image,
+    and the boxes that matched in red, numbered.
+    """
+    img_draw = cv2.cvtColor(np.asarray(img.convert("L")), cv2.COLOR_GRAY2RGB)
+    d = {column: table[column].tolist() for column in table}
+
+    for i in range(len(d["text"])):
+        # Draw each box on the grayscale image
+        cv2.rectangle(
+            img_draw,
+            (d["left"][i], d["top"][i]),
+            (d["left"][i] + d["width"][i], d["top"][i] + d["height"][i]),
+            (0, 255, 0),
+            2,
+        )
+        # Draw the detected text in the rectangle in small font
+        font = cv2.FONT_HERSHEY_SIMPLEX
+        font_scale = 0.5
+        font_color = (0, 0, 255)
+        line_type = 2
+
+        cv2.putText(
+            img_draw,
+            d["text"][i],
+            (d["left"][i], d["top"][i] - 10),
+            font,
+            font_scale,
+            font_color,
+            line_type,
+        )
+
+    for id, (i, left, width) in enumerate(
+        zip(matches.tolist(), match_lefts.tolist(), match_widths.tolist())
+    ):
+        top, height = d["top"][i], d["height"][i]
+
+        # Draw the bounding box on the image in red and make it slightly larger
+        larger = 10
+        cv2.rectangle(
+            img_draw,
+            (left - larger, top - larger),
+            (left + width + larger, top + height + larger),
+            (255, 0, 0),
+            7,
+        )
+
+        # Create a small black square background for the ID
+        cv2.rectangle(
+            img_draw,
+            (left + width // 2 - larger * 2, top + height // 2 - larger * 2),
+            (left + width // 2 + larger * 2, top + height // 2 + larger * 2),
+            (0, 0, 0),
+            -1,
+        )
+
+        # Put the ID in the center of the bounding box in red
+        cv2.putText(
+            img_draw,
+            str(id),
+            (left + width // 2 - larger, top + height // 2 + larger),
+            cv2.FONT_HERSHEY_DUPLEX,
+            1,
+            (255, 155, 155),
+            4,
+        )
+
+    bounding_box_image = PIL.Image.fromarray(img_draw)
+    bounding_box_image.format = img.format
+
     # Debug by showing bounding boxes:
     # bounding_box_image.show()
-
-    return centers
+    return bounding_box_image
@@ -0,0 +1,237 @@
+"""
+Reads text from large screenshots in tiles, on a pool of processes that stay alive between screenshots.
+
+A 4K screen is split into overlapping tiles that are read at the same time. Each worker keeps
+Tesseract loaded through tesserocr when it's installed. Otherwise it runs pytesseract, which
+starts the tesseract executable for each tile.
+
+Workers are spawned, and only load ocr_worker.py. Importing it as part of this package would run
+interpreter/__init__.py, and start a whole interpreter in each of them.
+"""
+
+import atexit
+import importlib.util
+import multiprocessing
+import os
+import sys
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from ...utils.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+# Images bigger than this are read in tiles of about this size, in pixels
+TILE_SIZE = 1280
+# How far tiles reach into their neighbours. A word is only lost at a seam if it is
+# wider (or taller) than twice this
+TILE_OVERLAP = 160
+# Two boxes from neighbouring tiles are the same word if they overlap by this much
+SAME_WORD_IOU = 0.5
+OCR_WORKERS = min(4, os.cpu_count() or 1)
+
+# ocr_worker.py is loaded under this name, outside the interpreter package
+WORKER_MODULE = "open_interpreter_ocr_worker"
+WORKER_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "ocr_worker.py")
+
+# Runs in each worker as it starts, before it unpickles the function it's asked to run
+bootstrap_code = """
+import importlib.util, sys
+spec = importlib.util.spec_from_file_location({module!r}, {path!r})
+worker = importlib.util.module_from_spec(spec)
+sys.modules[spec.name] = worker
+spec.loader.exec_module(worker)
+worker.start_worker()
+"""
+
+
+def _load_worker_module():
+    module = sys.modules.get(WORKER_MODULE)
+    if module is None:
+        spec = importlib.util.spec_from_file_location(WORKER_MODULE, WORKER_PATH)
+        module = importlib.util.module_from_spec(spec)
+        sys.modules[WORKER_MODULE] = module
+        spec.loader.exec_module(module)
+    return module
+
+
+ocr_worker = _load_worker_module()
+COLUMNS = ocr_worker.COLUMNS
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def image_to_data(pixels):
+    """
+    Tesseract's image_to_data for a grayscale image as a NumPy array, as a dict of lists.
+    Images bigger than TILE_SIZE are read in tiles by the worker pool, and their word boxes
+    merged into lines by position.
+    """
+    height, width = pixels.shape[:2]
+    tiles = make_tiles(width, height)
+
+    if len(tiles) == 1:
+        if ocr_worker.load_tesserocr() is None:
+            # Nothing to gain from a worker
+            return ocr_worker.read(pixels)
+        return _submit([pixels])[0]
+
+    results = _submit(
+        [pixels[top:bottom, left:right] for (left, top, right, bottom), core in tiles]
+    )
+    return merge_tiles(tiles, results, width, height)
+
+
+def make_tiles(width, height):
+    """
+    Splits an image into a grid of (tile, core) rectangles, each (left, top, right, bottom).
+    The cores cover the image without overlapping, and each tile is its core plus TILE_OVERLAP.
+    """
+
+    def edges(length):
+        count = max(1, round(length / TILE_SIZE))
+        return [length * i // count for i in range(count + 1)]
+
+    tiles = []
+    x_edges, y_edges = edges(width), edges(height)
+    for top, bottom in zip(y_edges, y_edges[1:]):
+        for left, right in zip(x_edges, x_edges[1:]):
+            core = (left, top, right, bottom)
+            tile = (
+                max(0, left - TILE_OVERLAP),
+                max(0, top - TILE_OVERLAP),
+                min(width, right + TILE_OVERLAP),
+                min(height, bottom + TILE_OVERLAP),
+            )
+            tiles.append((tile, core))
+    return tiles
+
+
+def merge_tiles(tiles, results, width, height):
+    """
+    Combines the words read from each tile into one image_to_data table.
+
+    Words cut by a tile's edge are dropped, since a neighbouring tile reads them whole.
+    Words read whole by two tiles are kept once, from the tile whose core has their center.
+    """
+    words = {column: [] for column in COLUMNS}
+    tile_of_word = []
+    for index, (((left, top, right, bottom), core), d) in enumerate(
+        zip(tiles, results)
+    ):
+        for i, text in enumerate(d["text"]):
+            if int(d["level"][i]) != 5 or not str(text).strip():
+                continue
+            for column in COLUMNS:
+                words[column].append(d[column][i])
+            words["left"][-1] = int(words["left"][-1]) + left
+            words["top"][-1] = int(words["top"][-1]) + top
+            tile_of_word.append(index)
+
+    if not tile_of_word:
+        return {column: [] for column in COLUMNS}
+
+    tile_of_word = np.asarray(tile_of_word)
+    x0 = np.asarray(words["left"], dtype=int)
+    y0 = np.asarray(words["top"], dtype=int)
+    x1 = x0 + np.asarray(words["width"], dtype=int)
+    y1 = y0 + np.asarray(words["height"], dtype=int)
+    conf = np.asarray(words["conf"], dtype=float)
+
+    rects = np.asarray([tile for tile, core in tiles])
+    cores = np.asarray([core for tile, core in tiles])
+    tl, tt, tr, tb = rects[tile_of_word].T
+
+    # Touching an edge of its tile that isn't the edge of the image
+    cut = (
+        ((x0 <= tl + 1) & (tl > 0))
+        | ((y0 <= tt + 1) & (tt > 0))
+        | ((x1 >= tr - 1) & (tr < width))
+        | ((y1 >= tb - 1) & (tb < height))
+    )
+
+    # Only words in more than one tile can have been read twice
+    inside = (
+        (rects[:, 0] <= x0[:, None])
+        & (rects[:, 1] <= y0[:, None])
+        & (x1[:, None] <= rects[:, 2])
+        & (y1[:, None] <= rects[:, 3])
+    )
+    shared = ~cut & (inside.sum(axis=1) > 1)
+
+    cx, cy = (x0 + x1) / 2, (y0 + y1) / 2
+    cl, ct, cr, cb = cores[tile_of_word].T
+    in_core = (cl <= cx) & (cx < cr) & (ct <= cy) & (cy < cb)
+
+    keep = ~cut & ~shared
+    kept = []
+    for i in sorted(np.flatnonzero(shared), key=lambda i: (not in_core[i], -conf[i])):
+        if kept:
+            k = np.asarray(kept)
+            overlap = np.clip(
+                np.minimum(x1[k], x1[i]) - np.maximum(x0[k], x0[i]), 0, None
+            ) * np.clip(np.minimum(y1[k], y1[i]) - np.maximum(y0[k], y0[i]), 0, None)
+            area = (x1[k] - x0[k]) * (y1[k] - y0[k]) + (x1[i] - x0[i]) * (y1[i] - y0[i])
+            if np.any(overlap / np.maximum(area - overlap, 1) > SAME_WORD_IOU):
+                continue
+        kept.append(i)
+    keep[kept] = True
+
+    # The tiles' own layout doesn't line up across seams, so lines are found again by position:
+    # top to bottom, a word starts a new line if its center is below the line's first word
+    merged = {column: [] for column in COLUMNS}
+    line = None
+    lines = []
+    for i in sorted(np.flatnonzero(keep), key=lambda i: (cy[i], x0[i])):
+        if line is None or cy[i] > y1[line[0]]:
+            line = [i]
+            lines.append(line)
+        else:
+            line.append(i)
+
+    for line_num, line in enumerate(lines, start=1):
+        for word_num, i in enumerate(sorted(line, key=lambda i: x0[i]), start=1):
+            for column in COLUMNS:
+                merged[column].append(words[column][i])
+            merged["level"][-1] = 5
+            merged["page_num"][-1] = merged["block_num"][-1] = 1
+            merged["par_num"][-1] = 1
+            merged["line_num"][-1] = line_num
+            merged["word_num"][-1] = word_num
+    return merged
+
+
+def _submit(images):
+    """
+    Reads images on the worker pool, starting it if it isn't running.
+    """
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(
+                max_workers=OCR_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                # A builtin, so starting a worker doesn't import anything of ours
+                initializer=exec,
+                initargs=(
+                    bootstrap_code.format(module=WORKER_MODULE, path=WORKER_PATH),
+                    {},
+                ),
+            )
+        pool = _pool
+    try:
+        return list(pool.map(ocr_worker.read, images))
+    except BrokenProcessPool:
+        # A worker died, so start over with new ones next time
+        with _pool_lock:
+            if _pool is pool:
+                _pool = None
+        raise
+
+
+@atexit.register
+def _stop_pool():
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
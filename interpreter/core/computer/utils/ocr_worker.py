@@ -0,0 +1,71 @@
+"""
+What an OCR pool worker runs: it reads one tile with Tesseract.
+
+ocr_engine loads this file on its own, under a top level name, in the pool's workers and in the
+interpreter itself. So it imports nothing from this package, and nothing else until a tile is read.
+"""
+
+import os
+
+COLUMNS = (
+    "level",
+    "page_num",
+    "block_num",
+    "par_num",
+    "line_num",
+    "word_num",
+    "left",
+    "top",
+    "width",
+    "height",
+    "conf",
+    "text",
+)
+
+# Imported the first time a tile is read without tesserocr
+pytesseract = None
+# Set in each worker
+_tesseract = None
+
+
+def start_worker():
+    # Tiles are already read in parallel, so each Tesseract sticks to one thread
+    os.environ["OMP_THREAD_LIMIT"] = "1"
+    global _tesseract
+    tesserocr = load_tesserocr()
+    if tesserocr is not None:
+        _tesseract = tesserocr.PyTessBaseAPI()
+
+
+def read(pixels):
+    """
+    Tesseract's image_to_data for a grayscale image as a NumPy array, as a dict of lists.
+    """
+    if _tesseract is None:
+        global pytesseract
+        if pytesseract is None:
+            try:
+                import pytesseract
+            except ImportError:
+                raise ImportError("The pytesseract module could not be imported.")
+        return pytesseract.image_to_data(pixels, output_type=pytesseract.Output.DICT)
+
+    from PIL import Image
+
+    _tesseract.SetImage(Image.fromarray(pixels))
+    d = {column: [] for column in COLUMNS}
+    for row in _tesseract.GetTSVText(0).splitlines():
+        values = row.split("\t", len(COLUMNS) - 1)
+        values += [""] * (len(COLUMNS) - len(values))
+        for column, value in zip(COLUMNS, values):
+            d[column].append(value if column == "text" else float(value))
+    return d
+
+
+def load_tesserocr():
+    try:
+        import tesserocr
+
+        return tesserocr
+    except ImportError:
+        return None
@@ -1,13 +1,21 @@
 import base64
+import concurrent.futures
 import contextlib
+import hashlib
 import io
+import json
 import os
-import tempfile
 
 from PIL import Image
 
+from ....terminal_interface.utils.local_storage_path import get_storage_path
 from ...utils.lazy_import import lazy_import
 from ..utils.computer_vision import pytesseract_get_text
+from . import vision_worker
+
+np = lazy_import("numpy")
+
+DEFAULT_QUERY = "Describe this image. Also tell me what text is in the image, if any."
 
 # transformers = lazy_import("transformers") # Doesn't work for some reason! We import it later.
 
@@ -18,6 +26,10 @@ class Vision:
         self.model = None  # Will load upon first use
         self.tokenizer = None  # Will load upon first use
         self.easyocr = None
+        # Where describe() keeps what it's found, so it lasts between sessions
+        self.descriptions_path = get_storage_path("image_descriptions")
+        # Set to run the models in a worker process shared by every interpreter on this machine, see vision_worker
+        self.use_worker = False
 
     def load(self, load_moondream=True, load_easyocr=True):
         # print("Loading vision models (Moondream, EasyOCR)...\n")
@@ -37,7 +49,7 @@ class Vision:
 
                 os.environ["TOKENIZERS_PARALLELISM"] = "false"
 
-                if self.computer.debug:
+                if self.computer and self.computer.debug:
                     print(
                         "Open Interpreter will use Moondream (tiny vision model) to describe images to the language model. Set `interpreter.llm.vision_renderer = None` to disable this behavior."
                     )
@@ -67,50 +79,15 @@ class Vision:
         Gets OCR of image.
         """
 
-        if lmc:
-            if "base64" in lmc["format"]:
-                # # Extract the extension from the format, default to 'png' if not specified
-                # if "." in lmc["format"]:
-                #     extension = lmc["format"].split(".")[-1]
-                # else:
-                #     extension = "png"
-                # Save the base64 content as a temporary file
-                img_data = base64.b64decode(lmc["content"])
-                with tempfile.NamedTemporaryFile(
-                    delete=False, suffix=".png"
-                ) as temp_file:
-                    temp_file.write(img_data)
-                    temp_file_path = temp_file.name
-
-                # Set path to the path of the temporary file
-                path = temp_file_path
-
-            elif lmc["format"] == "path":
-                # Convert to base64
-                path = lmc["content"]
-        elif base_64:
-            # Save the base64 content as a temporary file
-            img_data = base64.b64decode(base_64)
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-                temp_file.write(img_data)
-                temp_file_path = temp_file.name
-
-            # Set path to the path of the temporary file
-            path = temp_file_path
-        elif path:
-            pass
-        elif pil_image:
-            with tempfile.NamedTemporaryFile(delete=False, suffix=".png") as temp_file:
-                pil_image.save(temp_file, format="PNG")
-                temp_file_path = temp_file.name
-
-            # Set path to the path of the temporary file
-            path = temp_file_path
+        image = self._image(base_64=base_64, path=path, lmc=lmc, pil_image=pil_image)
 
         try:
+            if self.use_worker:
+                return vision_worker.request(vision_worker.image_request("ocr", image))
             if not self.easyocr:
                 self.load(load_moondream=False)
-            result = self.easyocr.readtext(path)
+            # Straight from memory, no file needed
+            result = self.easyocr.readtext(np.asarray(image.convert("RGB")))
             text = " ".join([item[1] for item in result])
             return text.strip()
         except ImportError:
@@ -121,7 +98,7 @@ class Vision:
 
     def query(
         self,
-        query="Describe this image. Also tell me what text is in the image, if any.",
+        query=DEFAULT_QUERY,
         base_64=None,
         path=None,
         lmc=None,
@@ -131,6 +108,18 @@ class Vision:
         Uses Moondream to ask query of the image (which can be a base64, path, or lmc message)
         """
 
+        if self.use_worker:
+            img = self._image(base_64=base_64, path=path, lmc=lmc, pil_image=pil_image)
+            try:
+                return vision_worker.request(
+                    vision_worker.image_request("query", img, question=query)
+                )
+            except ImportError:
+                print(
+                    "\nTo use local vision, run `pip install 'open-interpreter[local]'`.\n"
+                )
+                return ""
+
         if self.model == None and self.tokenizer == None:
             try:
                 success = self.load(load_easyocr=False)
@@ -142,29 +131,7 @@ class Vision:
             if not success:
                 return ""
 
-        if lmc:
-            if "base64" in lmc["format"]:
-                # # Extract the extension from the format, default to 'png' if not specified
-                # if "." in lmc["format"]:
-                #     extension = lmc["format"].split(".")[-1]
-                # else:
-                #     extension = "png"
-
-                # Decode the base64 image
-                img_data = base64.b64decode(lmc["content"])
-                img = Image.open(io.BytesIO(img_data))
-
-            elif lmc["format"] == "path":
-                # Convert to base64
-                image_path = lmc["content"]
-                img = Image.open(image_path)
-        elif base_64:
-            img_data = base64.b64decode(base_64)
-            img = Image.open(io.BytesIO(img_data))
-        elif path:
-            img = Image.open(path)
-        elif pil_image:
-            img = pil_image
+        img = self._image(base_64=base_64, path=path, lmc=lmc, pil_image=pil_image)
 
         with contextlib.redirect_stdout(open(os.devnull, "w")):
             enc_image = self.model.encode_image(img)
@@ -173,3 +140,85 @@ class Vision:
             )
 
         return answer
+
+    def describe(self, lmc, renderer=None):
+        """
+        Describes an image message for a language model that can't see it. Returns (description, OCR text).
+
+        The description comes from `renderer` (self.query by default), and runs at the same time as OCR.
+        Both are saved on disk under a hash of the image, so the same image is only ever described once.
+        """
+        renderer = renderer or self.query
+        is_moondream = renderer == self.query
+
+        if lmc["format"] == "path":
+            with open(lmc["content"], "rb") as file:
+                image_data = file.read()
+        else:
+            image_data = base64.b64decode(lmc["content"])
+        key = hashlib.sha256(image_data)
+        key.update(getattr(renderer, "__qualname__", repr(renderer)).encode())
+        cache_path = os.path.join(self.descriptions_path, key.hexdigest() + ".json")
+
+        try:
+            with open(cache_path) as file:
+                cached = json.load(file)
+            return cached["description"], cached["ocr"]
+        except (OSError, ValueError, KeyError):
+            pass
+
+        image = Image.open(io.BytesIO(image_data))
+        image.load()  # Before two threads read it
+
+        if self.use_worker:
+            # The worker batches the two together. Its errors go to the caller, so nothing incomplete is saved
+            caption = lambda: vision_worker.request(
+                vision_worker.image_request("query", image, question=DEFAULT_QUERY)
+            )
+            read = lambda: vision_worker.request(
+                vision_worker.image_request("ocr", image)
+            )
+            complete = True
+        else:
+            # Loading quiets stdout, which only one thread can do at a time, so load here first.
+            # If a model isn't installed, query() or ocr() says so below
+            with contextlib.suppress(ImportError):
+                self.load(load_moondream=False)
+            if is_moondream:
+                with contextlib.suppress(ImportError):
+                    self.load(load_easyocr=False)
+            caption = lambda: self.query(pil_image=image)
+            read = lambda: self.ocr(pil_image=image)
+            complete = self.easyocr is not None and (self.model or not is_moondream)
+
+        with concurrent.futures.ThreadPoolExecutor(max_workers=1) as executor:
+            ocr = executor.submit(read) if self.easyocr or self.use_worker else None
+            if is_moondream:
+                description = caption()
+            else:
+                description = renderer(lmc=lmc)
+            ocr = ocr.result() if ocr else read()
+
+        if complete:
+            os.makedirs(self.descriptions_path, exist_ok=True)
+            # Written under another name first, so a half-written description is never read
+            with open(cache_path + ".tmp", "w") as file:
+                json.dump({"description": description, "ocr": ocr}, file)
+            os.replace(cache_path + ".tmp", cache_path)
+
+        return description, ocr
+
+    def _image(self, base_64=None, path=None, lmc=None, pil_image=None):
+        """
+        The image, passed in any of these ways, as a PIL image.
+        """
+        if lmc:
+            if "base64" in lmc["format"]:
+                base_64 = lmc["content"]
+            elif lmc["format"] == "path":
+                path = lmc["content"]
+        if base_64:
+            return Image.open(io.BytesIO(base64.b64decode(base_64)))
+        if path:
+            return Image.open(path)
+        return pil_image
@@ -0,0 +1,358 @@
+"""
+A process that holds the vision models for every interpreter on this machine, so none of them has to load
+Moondream and EasyOCR into their own memory. Started by the first one that needs it, see start_worker.
+
+If the worker can't be used (it was started with a key that isn't ours), requests are answered in-process.
+"""
+
+import hashlib
+import os
+import queue
+import secrets
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import traceback
+from collections import OrderedDict
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from ....terminal_interface.utils.local_storage_path import get_storage_path
+from ...utils.lazy_import import lazy_import
+
+np = lazy_import("numpy")
+
+# How long to wait for more requests to encode along with the first, in seconds
+BATCH_INTERVAL = 0.02
+MAX_BATCH_SIZE = 8
+# Encoded images kept for more questions about the same image
+EMBEDDING_CACHE_SIZE = 32
+# The worker exits, freeing the models, after this many seconds without a request
+IDLE_TIMEOUT = 300
+# How long to wait for a new worker to load and start listening, in seconds
+START_TIMEOUT = 30
+
+# Runs a module of this package as __main__ without running interpreter/__init__.py,
+# which would start a whole interpreter in a process that only needs the vision models
+bootstrap_code = """
+import runpy, sys, types
+package = types.ModuleType("interpreter")
+package.__path__ = [{path!r}]
+sys.modules["interpreter"] = package
+runpy.run_module({module!r}, run_name="__main__", alter_sys=True)
+"""
+
+# Models for requests the worker can't answer, loaded the first time there's one
+_local_worker = None
+_local_lock = threading.Lock()
+
+
+def worker_address():
+    if sys.platform == "win32":
+        return r"\\.\pipe\open-interpreter-vision"
+    return os.path.join(get_storage_path(), "vision-worker.sock")
+
+
+def worker_authkey():
+    """
+    A secret only this user can read, so only their interpreters can use the worker.
+    """
+    path = os.path.join(get_storage_path(), "vision-worker.key")
+    try:
+        with open(path, "rb") as file:
+            authkey = file.read()
+        if authkey:
+            return authkey
+    except FileNotFoundError:
+        pass
+
+    # Written under another name, then put in place whole, so nobody can read half a key
+    directory = os.path.dirname(path)
+    os.makedirs(directory, exist_ok=True)
+    file, temporary_path = tempfile.mkstemp(dir=directory, prefix="vision-worker.key.")
+    try:
+        os.write(file, secrets.token_bytes(32))
+        os.close(file)
+        try:
+            # Only if there's still no key, so interpreters starting together agree on one
+            os.link(temporary_path, path)
+        except FileExistsError:
+            if os.path.getsize(path) == 0:
+                # Left empty by a writer that didn't finish
+                os.replace(temporary_path, path)
+        except OSError:
+            # No hard links on this file system
+            os.replace(temporary_path, path)
+    finally:
+        try:
+            os.remove(temporary_path)
+        except OSError:
+            pass
+
+    with open(path, "rb") as file:
+        return file.read()
+
+
+def load_models():
+    from .vision import Vision
+
+    vision = Vision(None)
+    vision.load()
+    return vision.model, vision.tokenizer, vision.easyocr
+
+
+class VisionWorker:
+    """
+    Answers requests from any number of connections, one batch at a time.
+
+    Requests that arrive within BATCH_INTERVAL of each other are handled together,
+    and the images among them that haven't been seen recently are encoded in one pass.
+    """
+
+    def __init__(
+        self,
+        address=None,
+        authkey=None,
+        idle_timeout=IDLE_TIMEOUT,
+        load_models=load_models,
+    ):
+        self.address = address
+        self.authkey = authkey
+        self.idle_timeout = idle_timeout
+        self.load_models = load_models
+        self.model = self.tokenizer = self.easyocr = None
+        self.requests = queue.Queue()
+        # Image hash: encoded image, least recently used first
+        self.embeddings = OrderedDict()
+        self.stopped = False
+
+    def serve(self):
+        """
+        Answers requests until nothing has asked for anything in idle_timeout seconds.
+        """
+        self.address = self.address or worker_address()
+        self.authkey = self.authkey or worker_authkey()
+        if sys.platform != "win32":
+            # Left behind by a worker that didn't get to clean up
+            try:
+                os.remove(self.address)
+            except FileNotFoundError:
+                pass
+        self.listener = Listener(self.address, authkey=self.authkey)
+        threading.Thread(target=self._accept, daemon=True).start()
+
+        try:
+            while True:
+                try:
+                    batch = [self.requests.get(timeout=self.idle_timeout)]
+                except queue.Empty:
+                    break
+                deadline = time.monotonic() + BATCH_INTERVAL
+                while len(batch) < MAX_BATCH_SIZE:
+                    timeout = deadline - time.monotonic()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(self.requests.get(timeout=timeout))
+                    except queue.Empty:
+                        break
+                self._process(batch)
+        finally:
+            self.stopped = True
+            self.listener.close()
+            # Anything that arrived as we stopped is sent back, to ask the next worker
+            while not self.requests.empty():
+                self.requests.get_nowait()[1].put({"stopped": True})
+
+    def _accept(self):
+        while not self.stopped:
+            try:
+                connection = self.listener.accept()
+            except Exception:
+                # Closed, or someone without the key
+                continue
+            threading.Thread(
+                target=self._handle, args=(connection,), daemon=True
+            ).start()
+
+    def _handle(self, connection):
+        with connection:
+            while not self.stopped:
+                try:
+                    request = connection.recv()
+                except (EOFError, OSError):
+                    return
+                reply = queue.Queue(maxsize=1)
+                self.requests.put((request, reply))
+                connection.send(reply.get())
+
+    def _process(self, batch):
+        try:
+            if self.model is None:
+                self.model, self.tokenizer, self.easyocr = self.load_models()
+        except ImportError:
+            for request, reply in batch:
+                reply.put({"error": traceback.format_exc(), "import_error": True})
+            return
+
+        from PIL import Image
+
+        images = {}
+        for request, reply in batch:
+            mode, size, data = request["image"]
+            request["key"] = hashlib.sha256(data).hexdigest() + f"{mode}{size}"
+            if request["key"] not in images:
+                images[request["key"]] = Image.frombytes(mode, size, data)
+
+        # Only questions need the image encoded, OCR reads the pixels
+        query_keys = {r["key"] for r, reply in batch if r["type"] == "query"}
+        for key in query_keys & self.embeddings.keys():
+            self.embeddings.move_to_end(key)
+        try:
+            self._encode(
+                {key: images[key] for key in query_keys if key not in self.embeddings}
+            )
+        except Exception:
+            for request, reply in batch:
+                reply.put({"error": traceback.format_exc()})
+            return
+
+        for request, reply in batch:
+            try:
+                if request["type"] == "query":
+                    result = self.model.answer_question(
+                        self.embeddings[request["key"]],
+                        request["question"],
+                        self.tokenizer,
+                        max_length=400,
+                    )
+                else:
+                    image = images[request["key"]].convert("RGB")
+                    result = self.easyocr.readtext(np.asarray(image))
+                    result = " ".join([item[1] for item in result]).strip()
+                reply.put({"result": result})
+            except Exception:
+                reply.put({"error": traceback.format_exc()})
+
+    def _encode(self, images):
+        """
+        Encodes new images for Moondream, all at once if the model can.
+        """
+        if not images:
+            return
+        try:
+            embeddings = self.model.vision_encoder(list(images.values()))
+            encoded = {key: embeddings[i : i + 1] for i, key in enumerate(images)}
+        except (AttributeError, TypeError):
+            # This version of the model only takes one at a time
+            encoded = {
+                key: self.model.encode_image(image) for key, image in images.items()
+            }
+
+        self.embeddings.update(encoded)
+        while len(self.embeddings) > EMBEDDING_CACHE_SIZE:
+            self.embeddings.popitem(last=False)
+
+
+def start_worker():
+    package_path = os.path.dirname(
+        os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+    )
+    subprocess.Popen(
+        [
+            sys.executable,
+            "-c",
+            bootstrap_code.format(path=package_path, module=__name__),
+        ],
+        stdin=subprocess.DEVNULL,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+        start_new_session=True,
+    )
+
+
+def request(request, address=None, authkey=None):
+    """
+    Sends a request to the worker, starting one if none is running, and returns its result.
+    """
+    address = address or worker_address()
+    authkey = authkey or worker_authkey()
+
+    for attempt in range(2):
+        deadline = time.monotonic() + START_TIMEOUT
+        started = False
+        connection = None
+        while connection is None:
+            try:
+                connection = Client(address, authkey=authkey)
+            except (FileNotFoundError, ConnectionRefusedError):
+                if time.monotonic() > deadline:
+                    raise TimeoutError("The vision worker didn't start.")
+                if not started:
+                    start_worker()
+                    started = True
+                time.sleep(0.1)
+            except AuthenticationError:
+                # The worker running has another key (ours was replaced since it started)
+                break
+
+        if connection is None:
+            reply = answer_locally(request)
+        else:
+            with connection:
+                try:
+                    connection.send(request)
+                    reply = connection.recv()
+                except (EOFError, OSError):
+                    reply = {"stopped": True}
+
+        if reply.get("stopped"):
+            # It exited for being idle just as we asked, so the next one will answer
+            continue
+        if reply.get("import_error"):
+            raise ImportError(reply["error"])
+        if "error" in reply:
+            raise Exception("The vision worker failed:\n" + reply["error"])
+        return reply["result"]
+
+    raise Exception("The vision worker stopped before answering.")
+
+
+def answer_locally(request):
+    """
+    Answers a request with models loaded in this process, the way the worker would.
+    """
+    global _local_worker
+    with _local_lock:
+        if _local_worker is None:
+            _local_worker = VisionWorker(load_models=load_models)
+        reply = queue.Queue(maxsize=1)
+        _local_worker._process([(request, reply)])
+    return reply.get()
+
+
+def image_request(type, image, **kwargs):
+    """
+    A request about a PIL image. Sent as raw pixels, since encoding a PNG costs more than the bytes it saves locally.
+    """
+    if image.mode in ("P", "PA"):
+        # The raw pixels are indexes into a palette they'd be sent without
+        transparent = image.mode == "PA" or "transparency" in image.info
+        image = image.convert("RGBA" if transparent else "RGB")
+    return {"type": type, "image": (image.mode, image.size, image.tobytes()), **kwargs}
+
+
+if __name__ == "__main__":
+    if sys.platform != "win32":
+        import fcntl
+
+        # One worker per machine. If another is starting up, let it
+        os.makedirs(os.path.dirname(worker_address()), exist_ok=True)
+        lock = open(worker_address() + ".lock", "w")
+        try:
+            fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            sys.exit(0)
+    VisionWorker().serve()
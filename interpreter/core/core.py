@@ -19,7 +19,10 @@ from .llm.llm import Llm
 from .respond import respond
 from .render_message import render_message # Import for rendering
 from .utils.telemetry import send_telemetry
-from .utils.truncate_output import truncate_output
+from .utils.blob_store import BlobStore
+from .utils.coalesce_chunks import coalesce_chunks
+from .utils.message_store import MessageStore
+from .utils.output_buffer import OutputBuffer
 
 
 class OpenInterpreter:
@@ -48,6 +51,7 @@ class OpenInterpreter:
         verbose=False,
         debug=False,
         max_output=2800,
+        max_output_head=0,
         safe_mode="off",
         shrink_images=True,
         loop=False,
@@ -81,11 +85,17 @@ class OpenInterpreter:
         multi_line=True,
         contribute_conversation=False,
         plain_text_display=False,
+        chunk_flush_interval=None,
+        max_chunk_size=4096,
+        blob_images=False,
     ):
         # State
-        self.messages = [] if messages is None else messages
+        self.messages = [] if messages is None else messages  # Stored as a MessageStore
         self.responding = False
         self.last_messages_count = 0
+        self._turn = 0  # Counts calls to _respond_and_store, for render cache "turn" invalidation
+        self._render_cache = {}
+        self._output_buffers = {}
 
         # Settings
         self.offline = offline
@@ -93,6 +103,7 @@ class OpenInterpreter:
         self.verbose = verbose
         self.debug = debug
         self.max_output = max_output
+        self.max_output_head = max_output_head
         self.safe_mode = safe_mode
         self.shrink_images = shrink_images
         self.disable_telemetry = disable_telemetry
@@ -101,6 +112,12 @@ class OpenInterpreter:
         self.contribute_conversation = contribute_conversation
         self.plain_text_display = plain_text_display
         self.highlight_active_line = True  # additional setting to toggle active line highlighting. Defaults to True
+        # Set to a number of seconds to merge streamed tokens into larger chunks, see coalesce_chunks
+        self.chunk_flush_interval = chunk_flush_interval
+        self.max_chunk_size = max_chunk_size
+        # Set to keep base64 images in self.messages as "blob:" references into self.blob_store
+        self.blob_images = blob_images
+        self.blob_store = BlobStore()
 
         # Loop messages
         self.loop = loop
@@ -151,6 +168,20 @@ class OpenInterpreter:
         # Return new messages
         return self.messages[self.last_messages_count :]
 
+    @property
+    def messages(self):
+        return self._messages
+
+    @messages.setter
+    def messages(self, messages):
+        previous = getattr(self, "_messages", None)
+        if previous is not None:
+            # Its messages might carry over, so they need their content
+            previous.flush_content()
+        self._messages = (
+            messages if isinstance(messages, MessageStore) else MessageStore(messages)
+        )
+
     @property
     def anonymous_telemetry(self) -> bool:
         return not self.disable_telemetry and not self.offline
@@ -165,6 +196,8 @@ class OpenInterpreter:
     def chat(self, message=None, display=True, stream=False, blocking=True):
         try:
             self.responding = True
+            # Have a Python kernel booting while the LLM writes its first reply
+            self.computer.terminal.kernel_pool.fill()
             if self.anonymous_telemetry:
                 message_type = type(
                     message
@@ -288,7 +321,7 @@ class OpenInterpreter:
                     ),
                     "w",
                 ) as f:
-                    json.dump(self.messages, f)
+                    json.dump(self.blob_store.expand_all(self.messages), f)
             return
 
         raise Exception(
@@ -300,7 +333,18 @@ class OpenInterpreter:
         Pulls from the respond stream, adding delimiters. Some things, like active_line, console, confirmation... these act specially.
         Also assembles new messages and adds them to `self.messages`.
         """
+        chunks = self._store_responses()
+        if self.chunk_flush_interval:
+            # Only what we pass on is merged. Each chunk is stored as it arrives,
+            # so respond() never reads a message that's missing its last chunk
+            chunks = coalesce_chunks(
+                chunks, self.chunk_flush_interval, self.max_chunk_size
+            )
+        yield from chunks
+
+    def _store_responses(self):
         self.verbose = False
+        self._turn += 1
 
         # Utility function
         def is_ephemeral(chunk):
@@ -313,10 +357,79 @@ class OpenInterpreter:
                 return True
             return False
 
+        def find_tool_output(chunk):
+            """
+            Tool calls that run at the same time have interleaved output.
+            Finds the output message this chunk continues, by its tool_call_id.
+            """
+            if "tool_call_id" not in chunk:
+                return None
+            for message in reversed(self.messages):
+                if "tool_call_id" not in message:
+                    return None
+                if message["tool_call_id"] == chunk["tool_call_id"]:
+                    if message["type"] == "code":
+                        # This call's output hasn't started yet
+                        return None
+                    if all(
+                        message.get(property) == chunk.get(property)
+                        for property in ["role", "type", "format"]
+                    ):
+                        return message
+            return None
+
+        def add_content(message, chunk):
+            """
+            Adds the chunk's content to the message. Console output goes into a bounded OutputBuffer,
+            anything else into the message store's parts. Both are rendered into the message by _flush_output_buffers.
+            """
+            if chunk["type"] == "console" and chunk["format"] == "output":
+                if id(message) not in self._output_buffers:
+                    # The full output goes to disk, so it can be paged through later
+                    message["output_id"] = output_store.create()
+                    buffer = OutputBuffer(
+                        self.max_output,
+                        self.max_output_head,
+                        # Paging happens through the computer API
+                        output_id=message["output_id"]
+                        if self.computer.import_computer_api
+                        else None,
+                    )
+                    buffer.append(message["content"])
+                    output_store.append(message["output_id"], message["content"])
+                    self._output_buffers[id(message)] = (message, buffer)
+                self._output_buffers[id(message)][1].append(chunk["content"])
+                output_store.append(message["output_id"], chunk["content"])
+            else:
+                self.messages.add_content(message, chunk["content"])
+
+        def add_message(chunk):
+            if chunk["type"] == "console" and chunk["format"] == "output":
+                # Its content will come from the buffer, so don't share the chunk we yield
+                message = {**chunk, "content": ""}
+                self.messages.append(message)
+                add_content(message, chunk)
+            elif (
+                self.blob_images
+                and chunk["type"] == "image"
+                and "base64" in chunk.get("format", "")
+            ):
+                # The chunk we yield keeps its base64, only the stored message holds the reference
+                self.messages.append(
+                    {**chunk, "content": self.blob_store.put_base64(chunk["content"])}
+                )
+            else:
+                # A copy, so content added to the message later doesn't change a chunk we've already yielded
+                self.messages.append({**chunk})
+
         last_flag_base = None
+        self._output_buffers = {}
+        output_store = self.computer.terminal.output_store
+
+        chunks = respond(self)
 
         try:
-            for chunk in respond(self):
+            for chunk in chunks:
                 # For async usage
                 if hasattr(self, "stop_event") and self.stop_event.is_set():
                     print("Open Interpreter stopping.")
@@ -340,11 +453,14 @@ class OpenInterpreter:
                                 "content": "",
                             }
                         )
+                    # Its output is complete
+                    output_store.finish()
 
                 # Handle the special "confirmation" chunk, which neither triggers a flag or creates a message
                 if chunk["type"] == "confirmation":
                     # Emit a end flag for the last message type, and reset last_flag_base
                     if last_flag_base:
+                        self._flush_output_buffers()
                         yield {**last_flag_base, "end": True}
                         last_flag_base = None
 
@@ -377,26 +493,28 @@ class OpenInterpreter:
                             and chunk["format"] == last_flag_base["format"]
                         )
                     )
+                    and chunk.get("tool_call_id") == last_flag_base.get("tool_call_id")
                 ):
                     # If they match, append the chunk's content to the current message's content
                     # (Except active_line, which shouldn't be stored)
                     if not is_ephemeral(chunk):
-                        if any(
-                            [
-                                (property in self.messages[-1])
-                                and (
-                                    self.messages[-1].get(property)
-                                    != chunk.get(property)
-                                )
-                                for property in ["role", "type", "format"]
-                            ]
+                        tool_output = find_tool_output(chunk)
+                        last_message = self.messages[-1]
+                        if tool_output:
+                            add_content(tool_output, chunk)
+                        # Every image is a whole message of its own
+                        elif chunk["type"] == "image" or any(
+                            property in last_message
+                            and last_message[property] != chunk.get(property)
+                            for property in ("role", "type", "format")
                         ):
-                            self.messages.append(chunk)
+                            add_message(chunk)
                         else:
-                            self.messages[-1]["content"] += chunk["content"]
+                            add_content(last_message, chunk)
                 else:
                     # If they don't match, yield a end message for the last message type and a start message for the new one
                     if last_flag_base:
+                        self._flush_output_buffers()
                         yield {**last_flag_base, "end": True}
 
                     last_flag_base = {"role": chunk["role"], "type": chunk["type"]}
@@ -405,34 +523,55 @@ class OpenInterpreter:
                     if "format" in chunk and chunk["type"] != "console":
                         last_flag_base["format"] = chunk["format"]
 
+                    if "tool_call_id" in chunk:
+                        last_flag_base["tool_call_id"] = chunk["tool_call_id"]
+
                     yield {**last_flag_base, "start": True}
 
                     # Add the chunk as a new message
                     if not is_ephemeral(chunk):
-                        self.messages.append(chunk)
+                        tool_output = find_tool_output(chunk)
+                        if tool_output:
+                            add_content(tool_output, chunk)
+                        else:
+                            add_message(chunk)
 
                 # Yield the chunk itself
                 yield chunk
 
-                # Truncate output if it's console output
-                if chunk["type"] == "console" and chunk["format"] == "output":
-                    self.messages[-1]["content"] = truncate_output(
-                        self.messages[-1]["content"],
-                        self.max_output,
-                        add_scrollbars=self.computer.import_computer_api,  # I consider scrollbars to be a computer API thing
-                    )
-
             # Yield a final end flag
             if last_flag_base:
+                self._flush_output_buffers()
                 yield {**last_flag_base, "end": True}
         except GeneratorExit:
             raise  # gotta pass this up!
+        finally:
+            # If we stopped early, this lets respond() put back what it hadn't sent yet
+            chunks.close()
+            self._flush_output_buffers()
+            self._output_buffers = {}
+            output_store.finish()
+
+    def _flush_output_buffers(self):
+        """
+        Renders buffered console output (truncated, if it's long) and streamed content into their messages.
+        """
+        for message, buffer in self._output_buffers.values():
+            message["content"] = str(buffer)
+        self.messages.flush_content()
+        self.computer.terminal.output_store.flush()
 
     def reset(self):
         self.computer.terminate()  # Terminates all languages
         self.computer._has_imported_computer_api = False  # Flag reset
+        if self.computer.terminal.kernel_pool.used:
+            self.computer.terminal.kernel_pool.fill()  # Have a fresh kernel ready
+        self.computer.terminal.output_store.clear()
+        self.computer.display.forget_last_screenshot()
         self.messages = []
+        self.blob_store.cleanup()
         self.last_messages_count = 0
+        self._render_cache = {}
 
     def display_message(self, markdown):
         # This is just handy for start_script in profiles.
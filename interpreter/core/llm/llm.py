@@ -22,13 +22,13 @@ import time
 import uuid
 
 import requests
-import tokentrim as tt
 
 from .run_text_llm import run_text_llm
 
 # from .run_function_calling_llm import run_function_calling_llm
 from .run_tool_calling_llm import run_tool_calling_llm
 from .utils.convert_to_openai_messages import convert_to_openai_messages
+from .utils.trim_messages import trim_messages
 
 # Create or get the logger
 logger = logging.getLogger("LiteLLM")
@@ -77,6 +77,11 @@ class Llm:
         self.api_version = None
         self._is_loaded = False
 
+        # Converted OpenAI messages from previous runs, so we only convert new or edited messages
+        self._openai_messages_cache = {}
+        # Token counts of those messages, so trimming doesn't re-tokenize the whole history
+        self._token_counts = {}
+
         # Budget manager powered by LiteLLM
         self.max_budget = None
 
@@ -184,8 +189,13 @@ class Llm:
                         postcursor = ""
 
                     try:
-                        image_description = self.vision_renderer(lmc=img_msg)
-                        ocr = self.interpreter.computer.vision.ocr(lmc=img_msg)
+                        (
+                            image_description,
+                            ocr,
+                        ) = self.interpreter.computer.vision.describe(
+                            self.interpreter.blob_store.expand(img_msg),
+                            renderer=self.vision_renderer,
+                        )
 
                         # It would be nice to format this as a message to the user and display it like: "I see: image_description"
 
@@ -213,6 +223,7 @@ class Llm:
             vision=self.supports_vision,
             shrink_images=self.interpreter.shrink_images,
             interpreter=self.interpreter,
+            cache=self._openai_messages_cache,
         )
 
         system_message = messages[0]["content"]
@@ -224,22 +235,27 @@ class Llm:
                 trim_to_be_this_many_tokens = (
                     self.context_window - self.max_tokens - 25
                 )  # arbitrary buffer
-                messages = tt.trim(
+                messages = trim_messages(
                     messages,
                     system_message=system_message,
                     max_tokens=trim_to_be_this_many_tokens,
+                    token_counts=self._token_counts,
                 )
             elif self.context_window and not self.max_tokens:
                 # Just trim to the context window if max_tokens not set
-                messages = tt.trim(
+                messages = trim_messages(
                     messages,
                     system_message=system_message,
                     max_tokens=self.context_window,
+                    token_counts=self._token_counts,
                 )
             else:
                 try:
-                    messages = tt.trim(
-                        messages, system_message=system_message, model=model
+                    messages = trim_messages(
+                        messages,
+                        system_message=system_message,
+                        model=model,
+                        token_counts=self._token_counts,
                     )
                 except:
                     if len(messages) == 1:
@@ -265,8 +281,11 @@ Also please set `self.max_tokens = {max tokens per response}`.
 Continuing...
                             """
                             )
-                    messages = tt.trim(
-                        messages, system_message=system_message, max_tokens=8000
+                    messages = trim_messages(
+                        messages,
+                        system_message=system_message,
+                        max_tokens=8000,
+                        token_counts=self._token_counts,
                     )
         except:
             # If we're trimming messages, this won't work.
@@ -330,7 +349,7 @@ Continuing...
         # If you still need it, you can re-enable it like this:
         # if self.interpreter.debug == True:
         #     print("\nDEBUG: Llm.run - OPENAI COMPATIBLE MESSAGES (final before litellm):\n")
-        #     for i, message in enumerate(messages): # messages here is after tt.trim
+        #     for i, message in enumerate(messages): # messages here is after trim_messages
         #         content_preview = str(message.get("content", ""))
         #         if len(content_preview) > 150: content_preview = content_preview[:150] + "... (truncated)"
         #         print(f"  [{i}] Role: {message.get('role')}, Type: {message.get('type', 'N/A')}, Content Preview: {content_preview}")
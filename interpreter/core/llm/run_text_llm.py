@@ -1,21 +1,23 @@
+from .utils.parse_markdown_fences import StreamingFenceParser
+
+
 def run_text_llm(llm, params):
     ## Setup
 
     if llm.execution_instructions:
         try:
             # Add the system message
-            params["messages"][0][
-                "content"
-            ] += "\n" + llm.execution_instructions
+            params["messages"][0]["content"] += "\n" + llm.execution_instructions
         except:
             print('params["messages"][0]', params["messages"][0])
             raise
 
     ## Convert output to LMC format
 
-    inside_code_block = False
-    accumulated_block = ""
-    language = None
+    # OS mode takes notes in unlabeled code blocks a lot, so don't run those
+    parser = StreamingFenceParser(
+        default_language="text" if llm.interpreter.os else "python"
+    )
 
     for chunk in llm.completions(**params):
         if llm.interpreter.verbose:
@@ -30,46 +32,8 @@ def run_text_llm(llm, params):
         if content == None:
             continue
 
-        accumulated_block += content
-
-        if accumulated_block.endswith("`"):
-            # We might be writing "```" one token at a time.
-            continue
-
-        # Did we just enter a code block?
-        if "```" in accumulated_block and not inside_code_block:
-            inside_code_block = True
-            accumulated_block = accumulated_block.split("```")[1]
-
-        # Did we just exit a code block?
-        if inside_code_block and "```" in accumulated_block:
-            return
-
-        # If we're in a code block,
-        if inside_code_block:
-            # If we don't have a `language`, find it
-            if language is None and "\n" in accumulated_block:
-                language = accumulated_block.split("\n")[0]
-
-                # Default to python if not specified
-                if language == "":
-                    if llm.interpreter.os == False:
-                        language = "python"
-                    elif llm.interpreter.os == False:
-                        # OS mode does this frequently. Takes notes with markdown code blocks
-                        language = "text"
-                else:
-                    # Removes hallucinations containing spaces or non letters.
-                    language = "".join(char for char in language if char.isalpha())
-
-            # If we do have a `language`, send it out
-            if language:
-                yield {
-                    "type": "code",
-                    "format": language,
-                    "content": content.replace(language, ""),
-                }
+        # Every code block in the reply comes out as its own code message.
+        # respond() runs them one after another.
+        yield from parser.feed(content)
 
-        # If we're not in a code block, send the output as a message
-        if not inside_code_block:
-            yield {"type": "message", "content": content}
+    yield from parser.flush()
@@ -1,8 +1,7 @@
 import os
 import re
 
-from .utils.merge_deltas import merge_deltas
-from .utils.parse_partial_json import parse_partial_json
+from .utils.parse_streaming_json import StreamingJsonParser
 
 tool_schema = {
     "type": "function",
@@ -31,6 +30,7 @@ tool_schema = {
 
 
 def process_messages(messages):
+    messages = list(messages)
     processed_messages = []
     last_tool_id = 0
 
@@ -39,28 +39,59 @@ def process_messages(messages):
         message = messages[i]
 
         if message.get("function_call"):
-            last_tool_id += 1
-            tool_id = f"toolu_{last_tool_id}"
+            # Consecutive function calls were made in one reply, so they become one message with several tool calls
+            calls = []
+            while i < len(messages) and messages[i].get("function_call"):
+                last_tool_id += 1
+                tool_id = f"toolu_{last_tool_id}"
+                # The LMC tool_call_id (if any) is only used to match the call to its output
+                lmc_id = messages[i].pop("tool_call_id", None)
+                calls.append((tool_id, lmc_id, messages[i].pop("function_call")))
+                if messages[i] is not message:
+                    message["content"] = (message.get("content") or "") + (
+                        messages[i].get("content") or ""
+                    )
+                i += 1
 
             # Convert function_call to tool_calls
-            function = message.pop("function_call")
             message["tool_calls"] = [
                 {"id": tool_id, "type": "function", "function": function}
+                for tool_id, lmc_id, function in calls
             ]
             processed_messages.append(message)
 
-            # Process the next message if it's a function response
-            if i + 1 < len(messages) and messages[i + 1].get("role") == "function":
-                next_message = messages[i + 1].copy()
-                next_message["role"] = "tool"
-                next_message["tool_call_id"] = tool_id
-                processed_messages.append(next_message)
-                i += 1  # Skip the next message as we've already processed it
-            else:
-                # Add an empty tool response if there isn't one
-                processed_messages.append(
-                    {"role": "tool", "tool_call_id": tool_id, "content": ""}
-                )
+            # Collect the function responses that follow
+            responses = []
+            while i < len(messages) and messages[i].get("role") == "function":
+                responses.append(messages[i])
+                i += 1
+
+            for tool_id, lmc_id, function in calls:
+                # Match by ID, or else take the next response that doesn't have one
+                response = next(
+                    (
+                        r
+                        for r in responses
+                        if lmc_id is not None and r.get("tool_call_id") == lmc_id
+                    ),
+                    None,
+                ) or next((r for r in responses if r.get("tool_call_id") is None), None)
+
+                if response is not None:
+                    responses.remove(response)
+                    next_message = response.copy()
+                    next_message["role"] = "tool"
+                    next_message["tool_call_id"] = tool_id
+                    processed_messages.append(next_message)
+                else:
+                    # Add an empty tool response if there isn't one
+                    processed_messages.append(
+                        {"role": "tool", "tool_call_id": tool_id, "content": ""}
+                    )
+
+            # Anything left over is handled like any other orphaned function response
+            messages[i:i] = responses
+            continue
 
         elif message.get("role") == "function":
             # This handles orphaned function responses
@@ -167,9 +198,7 @@ def run_tool_calling_llm(llm, request_params):
 
     ## Convert output to LMC format
 
-    accumulated_deltas = {}
-    language = None
-    code = ""
+    tool_calls = {}  # The model can call the tool several times in one reply
     function_call_detected = False
     accumulated_review = ""
     review_category = None
@@ -182,22 +211,33 @@ def run_tool_calling_llm(llm, request_params):
 
         delta = chunk["choices"][0]["delta"]
 
-        # Convert tool call into function call, which we have great parsing logic for below
+        arguments_deltas = []
+
         if "tool_calls" in delta and delta["tool_calls"]:
             function_call_detected = True
 
-            # import pdb; pdb.set_trace()
-            if len(delta["tool_calls"]) > 0 and delta["tool_calls"][0].function:
-                delta = {
-                    # "id": delta["tool_calls"][0],
-                    "function_call": {
-                        "name": delta["tool_calls"][0].function.name,
-                        "arguments": delta["tool_calls"][0].function.arguments,
+            for position, tool_call_delta in enumerate(delta["tool_calls"]):
+                index = getattr(tool_call_delta, "index", None)
+                if index is None:
+                    index = position
+
+                if index not in tool_calls:
+                    tool_calls[index] = {
+                        "id": getattr(tool_call_delta, "id", None) or f"call_{index}",
+                        "function_name": "",
+                        "arguments_parser": StreamingJsonParser(),
+                        "language": None,
+                        "language_parts": [],
+                        "pending_code": [],  # Code that streamed in before the language did
                     }
-                }
+                tool_call = tool_calls[index]
 
-        # Accumulate deltas
-        accumulated_deltas = merge_deltas(accumulated_deltas, delta)
+                function = tool_call_delta.function
+                if function:
+                    if function.name:
+                        tool_call["function_name"] += function.name
+                    if function.arguments:
+                        arguments_deltas.append((tool_call, function.arguments))
 
         if "content" in delta and delta["content"]:
             if function_call_detected:
@@ -247,63 +287,8 @@ def run_tool_calling_llm(llm, request_params):
             else:
                 yield {"type": "message", "content": delta["content"]}
 
-        if (
-            accumulated_deltas.get("function_call")
-            and "name" in accumulated_deltas["function_call"]
-            and (
-                accumulated_deltas["function_call"]["name"] == "python"
-                or accumulated_deltas["function_call"]["name"] == "functions"
-            )
-        ):
-            if language is None:
-                language = "python"
-
-            # Pull the code string straight out of the "arguments" string
-            code_delta = accumulated_deltas["function_call"]["arguments"][len(code) :]
-            # Update the code
-            code = accumulated_deltas["function_call"]["arguments"]
-            # Yield the delta
-            if code_delta:
-                yield {
-                    "type": "code",
-                    "format": language,
-                    "content": code_delta,
-                }
-
-        if (
-            accumulated_deltas.get("function_call")
-            and "arguments" in accumulated_deltas["function_call"]
-            and accumulated_deltas["function_call"]["arguments"]
-        ):
-            if "arguments" in accumulated_deltas["function_call"]:
-                arguments = accumulated_deltas["function_call"]["arguments"]
-                arguments = parse_partial_json(arguments)
-
-                if arguments:
-                    if (
-                        language is None
-                        and "language" in arguments
-                        and "code"
-                        in arguments  # <- This ensures we're *finished* typing language, as opposed to partially done
-                        and arguments["language"]
-                    ):
-                        language = arguments["language"]
-
-                    if language is not None and "code" in arguments:
-                        # Calculate the delta (new characters only)
-                        code_delta = arguments["code"][len(code) :]
-                        # Update the code
-                        code = arguments["code"]
-                        # Yield the delta
-                        if code_delta:
-                            yield {
-                                "type": "code",
-                                "format": language,
-                                "content": code_delta,
-                            }
-                else:
-                    if llm.interpreter.verbose:
-                        print("Arguments not a dict.")
+        for tool_call, arguments_delta in arguments_deltas:
+            yield from parse_tool_call_arguments(llm, tool_call, arguments_delta)
 
     if os.getenv("INTERPRETER_REQUIRE_AUTHENTICATION", "False").lower() == "true":
         print("function_call_detected", function_call_detected)
@@ -313,3 +298,48 @@ def run_tool_calling_llm(llm, request_params):
             # import pdb
             # pdb.set_trace()
             raise Exception("Judge layer required but did not run.")
+
+
+def parse_tool_call_arguments(llm, tool_call, arguments_delta):
+    """
+    Turns a piece of one tool call's arguments into LMC code chunks, tagged with that call's ID.
+    """
+    if tool_call["function_name"] in ["python", "functions"]:
+        # The arguments are the code itself
+        tool_call["language"] = "python"
+        yield {
+            "type": "code",
+            "format": "python",
+            "content": arguments_delta,
+            "tool_call_id": tool_call["id"],
+        }
+        return
+
+    # Only parse the new characters. We never re-read the whole arguments string
+    arguments_parser = tool_call["arguments_parser"]
+    parsed = arguments_parser.feed(arguments_delta)
+
+    if arguments_parser.failed:
+        if llm.interpreter.verbose:
+            print("Arguments not a dict.")
+        return
+
+    for key, text in parsed:
+        if key == "language":
+            tool_call["language_parts"].append(text)
+        elif key == "code":
+            tool_call["pending_code"].append(text)
+
+    # Wait until the language has been fully typed out
+    if tool_call["language"] is None and "language" in arguments_parser.finished_keys:
+        tool_call["language"] = "".join(tool_call["language_parts"]) or None
+
+    if tool_call["language"] is not None and tool_call["pending_code"]:
+        code_delta = "".join(tool_call["pending_code"])
+        tool_call["pending_code"] = []
+        yield {
+            "type": "code",
+            "format": tool_call["language"],
+            "content": code_delta,
+            "tool_call_id": tool_call["id"],
+        }
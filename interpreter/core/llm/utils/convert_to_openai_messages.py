@@ -1,10 +1,20 @@
 import base64
 import io
 import json
-import sys
+import os
+from collections import OrderedDict
 
 from PIL import Image
 
+from ...utils.blob_store import is_blob
+
+# Images bigger than this (as data URLs) are shrunk to SHRUNK_IMAGE_SIZE when shrink_images is set
+MAX_IMAGE_SIZE = 5 * 1024 * 1024
+SHRUNK_IMAGE_SIZE = 4.9 * 1024 * 1024
+
+# How many images' data URLs are kept between calls. The LLM is only sent the last few anyway
+IMAGE_CACHE_SIZE = 16
+
 
 def convert_to_openai_messages(
     messages,
@@ -12,9 +22,13 @@ def convert_to_openai_messages(
     vision=False,
     shrink_images=True,
     interpreter=None,
+    cache=None,
 ):
     """
-    Converts LMC messages into OpenAI messages
+    Converts LMC messages into OpenAI messages.
+
+    If a `cache` dict is passed in (and kept between calls), messages that haven't changed
+    since the last call aren't converted again.
     """
     new_messages = []
 
@@ -31,226 +45,63 @@ def convert_to_openai_messages(
 
     #     messages = [message for message in messages if message.get("type") != "code"]
 
-    for message in messages:
-        # Is this for thine eyes?
-        if "recipient" in message and message["recipient"] != "assistant":
-            continue
-
-        new_message = {}
-
-        if message["type"] == "message":
-            new_message["role"] = message[
-                "role"
-            ]  # This should never be `computer`, right?
-
-            if message["role"] == "user" and (
-                message == [m for m in messages if m["role"] == "user"][-1]
-                or interpreter.always_apply_user_message_template
-            ):
-                # Only add the template for the last message?
-                new_message["content"] = interpreter.user_message_template.replace(
-                    "{content}", message["content"]
-                )
-            else:
-                new_message["content"] = message["content"]
-
-        elif message["type"] == "code":
-            new_message["role"] = "assistant"
-            if function_calling:
-                new_message["function_call"] = {
-                    "name": "execute",
-                    "arguments": json.dumps(
-                        {"language": message["format"], "code": message["content"]}
-                    ),
-                    # parsed_arguments isn't actually an OpenAI thing, it's an OI thing.
-                    # but it's soo useful!
-                    # "parsed_arguments": {
-                    #     "language": message["format"],
-                    #     "code": message["content"],
-                    # },
-                }
-                # Add empty content to avoid error "openai.error.InvalidRequestError: 'content' is a required property - 'messages.*'"
-                # especially for the OpenAI service hosted on Azure
-                new_message["content"] = ""
-            else:
-                new_message[
-                    "content"
-                ] = f"""```{message["format"]}\n{message["content"]}\n```"""
-
-        elif message["type"] == "console" and message["format"] == "output":
-            if function_calling:
-                new_message["role"] = "function"
-                new_message["name"] = "execute"
-                if "content" not in message:
-                    print("What is this??", content)
-                if type(message["content"]) != str:
-                    if interpreter.debug:
-                        print("\n\n\nStrange chunk found:", message, "\n\n\n")
-                    message["content"] = str(message["content"])
-                if message["content"].strip() == "":
-                    new_message[
-                        "content"
-                    ] = "No output"  # I think it's best to be explicit, but we should test this.
-                else:
-                    new_message["content"] = message["content"]
-
-            else:
-                # This should be experimented with.
-                if interpreter.code_output_sender == "user":
-                    if message["content"].strip() == "":
-                        content = interpreter.empty_code_output_template
-                    else:
-                        content = interpreter.code_output_template.replace(
-                            "{content}", message["content"]
-                        )
-
-                    new_message["role"] = "user"
-                    new_message["content"] = content
-                elif interpreter.code_output_sender == "assistant":
-                    new_message["role"] = "assistant"
-                    new_message["content"] = (
-                        "\n```output\n" + message["content"] + "\n```"
-                    )
-
-        elif message["type"] == "image":
-            if message.get("format") == "description":
-                new_message["role"] = message["role"]
-                new_message["content"] = message["content"]
-            else:
-                if vision == False:
-                    # If no vision, we only support the format of "description"
-                    continue
-
-                if "base64" in message["format"]:
-                    # Extract the extension from the format, default to 'png' if not specified
-                    if "." in message["format"]:
-                        extension = message["format"].split(".")[-1]
-                    else:
-                        extension = "png"
-
-                    encoded_string = message["content"]
-
-                elif message["format"] == "path":
-                    # Convert to base64
-                    image_path = message["content"]
-                    extension = image_path.split(".")[-1]
-
-                    with open(image_path, "rb") as image_file:
-                        encoded_string = base64.b64encode(image_file.read()).decode(
-                            "utf-8"
-                        )
-
-                else:
-                    # Probably would be better to move this to a validation pass
-                    # Near core, through the whole messages object
-                    if "format" not in message:
-                        raise Exception("Format of the image is not specified.")
-                    else:
-                        raise Exception(
-                            f"Unrecognized image format: {message['format']}"
-                        )
-
-                content = f"data:image/{extension};base64,{encoded_string}"
-
-                if shrink_images:
-                    # Shrink to less than 5mb
-
-                    # Calculate size
-                    content_size_bytes = sys.getsizeof(str(content))
-
-                    # Convert the size to MB
-                    content_size_mb = content_size_bytes / (1024 * 1024)
-
-                    # If the content size is greater than 5 MB, resize the image
-                    if content_size_mb > 5:
-                        # Decode the base64 image
-                        img_data = base64.b64decode(encoded_string)
-                        img = Image.open(io.BytesIO(img_data))
-
-                        # Run in a loop to make SURE it's less than 5mb
-                        for _ in range(10):
-                            # Calculate the scale factor needed to reduce the image size to 4.9 MB
-                            scale_factor = (4.9 / content_size_mb) ** 0.5
-
-                            # Calculate the new dimensions
-                            new_width = int(img.width * scale_factor)
-                            new_height = int(img.height * scale_factor)
-
-                            # Resize the image
-                            img = img.resize((new_width, new_height))
-
-                            # Convert the image back to base64
-                            buffered = io.BytesIO()
-                            img.save(buffered, format=extension)
-                            encoded_string = base64.b64encode(
-                                buffered.getvalue()
-                            ).decode("utf-8")
-
-                            # Set the content
-                            content = f"data:image/{extension};base64,{encoded_string}"
-
-                            # Recalculate the size of the content in bytes
-                            content_size_bytes = sys.getsizeof(str(content))
-
-                            # Convert the size to MB
-                            content_size_mb = content_size_bytes / (1024 * 1024)
-
-                            if content_size_mb < 5:
-                                break
-                        else:
-                            print(
-                                "Attempted to shrink the image but failed. Sending to the LLM anyway."
-                            )
-
-                new_message = {
-                    "role": "user",
-                    "content": [
-                        {
-                            "type": "image_url",
-                            "image_url": {"url": content, "detail": "low"},
-                        }
-                    ],
-                }
-
-                if message["role"] == "computer":
-                    new_message["content"].append(
-                        {
-                            "type": "text",
-                            "text": "This image is the result of the last tool output. What does it mean / are we done?",
-                        }
-                    )
-                if message.get("format") == "path":
-                    if any(
-                        content.get("type") == "text"
-                        for content in new_message["content"]
-                    ):
-                        for content in new_message["content"]:
-                            if content.get("type") == "text":
-                                content["text"] += (
-                                    "\nThis image is at this path: "
-                                    + message["content"]
-                                )
-                    else:
-                        new_message["content"].append(
-                            {
-                                "type": "text",
-                                "text": "This image is at this path: "
-                                + message["content"],
-                            }
-                        )
-
-        elif message["type"] == "file":
-            new_message = {"role": "user", "content": message["content"]}
-        elif message["type"] == "error":
-            print("Ignoring 'type' == 'error' messages.")
-            continue
+    if cache is not None:
+        # If any of these change, every conversion is stale
+        settings = (
+            function_calling,
+            vision,
+            shrink_images,
+            interpreter.user_message_template,
+            interpreter.always_apply_user_message_template,
+            interpreter.code_output_template,
+            interpreter.empty_code_output_template,
+            interpreter.code_output_sender,
+        )
+        if cache.get("settings") != settings:
+            cache.clear()
+            cache["settings"] = settings
+        converted = cache.setdefault("messages", {})
+        # The same image can turn up in more than one message, or in a new copy of one
+        image_cache = cache.setdefault("images", OrderedDict())
+    else:
+        converted = {}
+        image_cache = None
+    still_converted = {}
+
+    # Only the last user message gets the template (unless always_apply_user_message_template)
+    last_user_index = None
+    for i in range(len(messages) - 1, -1, -1):
+        if messages[i]["role"] == "user":
+            last_user_index = i
+            break
+
+    for i, message in enumerate(messages):
+        is_last_user_message = i == last_user_index
+        version = message_version(message, is_last_user_message)
+
+        # Reuse the conversion if this message hasn't changed since we last saw it
+        cached = converted.get(id(message))
+        if cached is not None and cached[0] == version:
+            new_message = cached[1]
         else:
-            raise Exception(f"Unable to convert this message type: {message}")
+            new_message = convert_message(
+                message,
+                function_calling=function_calling,
+                vision=vision,
+                shrink_images=shrink_images,
+                interpreter=interpreter,
+                is_last_user_message=is_last_user_message,
+                image_cache=image_cache,
+            )
+        still_converted[id(message)] = (version, new_message)
 
-        if isinstance(new_message["content"], str):
-            new_message["content"] = new_message["content"].strip()
+        if new_message is not None:
+            # Copy, because the message list we return gets edited downstream
+            new_messages.append(copy_message(new_message))
 
-        new_messages.append(new_message)
+    # Forget messages that are no longer in the conversation
+    converted.clear()
+    converted.update(still_converted)
 
     if function_calling == False:
         combined_messages = []
@@ -287,3 +138,266 @@ def convert_to_openai_messages(
         new_messages = combined_messages
 
     return new_messages
+
+
+def message_version(message, is_last_user_message=False):
+    """
+    A stamp that changes whenever the conversion of this message would change.
+    Content strings are compared by identity first, so this is cheap for unchanged messages.
+    """
+    version = (
+        message.get("role"),
+        message.get("type"),
+        message.get("format"),
+        message.get("recipient"),
+        message.get("tool_call_id"),
+        message.get("content"),
+        is_last_user_message,
+    )
+    if message.get("type") == "image" and message.get("format") == "path":
+        # The file can change underneath the same path
+        try:
+            version += (os.path.getmtime(message["content"]),)
+        except OSError:
+            pass
+    return version
+
+
+def copy_message(message):
+    """
+    Copies an OpenAI message deep enough that editing the copy won't edit the original.
+    """
+    message = message.copy()
+    if isinstance(message.get("content"), list):
+        message["content"] = [part.copy() for part in message["content"]]
+    if "function_call" in message:
+        message["function_call"] = message["function_call"].copy()
+    return message
+
+
+def convert_message(
+    message,
+    function_calling=True,
+    vision=False,
+    shrink_images=True,
+    interpreter=None,
+    is_last_user_message=False,
+    image_cache=None,
+):
+    """
+    Converts a single LMC message into an OpenAI message, or None if it should be skipped
+
+    Data URLs for images are kept in `image_cache` (an OrderedDict, if passed in), so each image is
+    read, encoded and shrunk once.
+    """
+    # Is this for thine eyes?
+    if "recipient" in message and message["recipient"] != "assistant":
+        return None
+
+    new_message = {}
+
+    if message["type"] == "message":
+        new_message["role"] = message["role"]  # This should never be `computer`, right?
+
+        if message["role"] == "user" and (
+            is_last_user_message or interpreter.always_apply_user_message_template
+        ):
+            # Only add the template for the last message?
+            new_message["content"] = interpreter.user_message_template.replace(
+                "{content}", message["content"]
+            )
+        else:
+            new_message["content"] = message["content"]
+
+    elif message["type"] == "code":
+        new_message["role"] = "assistant"
+        if function_calling:
+            new_message["function_call"] = {
+                "name": "execute",
+                "arguments": json.dumps(
+                    {"language": message["format"], "code": message["content"]}
+                ),
+                # parsed_arguments isn't actually an OpenAI thing, it's an OI thing.
+                # but it's soo useful!
+                # "parsed_arguments": {
+                #     "language": message["format"],
+                #     "code": message["content"],
+                # },
+            }
+            # Add empty content to avoid error "openai.error.InvalidRequestError: 'content' is a required property - 'messages.*'"
+            # especially for the OpenAI service hosted on Azure
+            new_message["content"] = ""
+            if "tool_call_id" in message:
+                # Lets process_messages pair this call with its output
+                new_message["tool_call_id"] = message["tool_call_id"]
+        else:
+            new_message[
+                "content"
+            ] = f"""```{message["format"]}\n{message["content"]}\n```"""
+
+    elif message["type"] == "console" and message["format"] == "output":
+        if function_calling:
+            new_message["role"] = "function"
+            new_message["name"] = "execute"
+            if "content" not in message:
+                print("What is this??", content)
+            if type(message["content"]) != str:
+                if interpreter.debug:
+                    print("\n\n\nStrange chunk found:", message, "\n\n\n")
+                message["content"] = str(message["content"])
+            if message["content"].strip() == "":
+                new_message[
+                    "content"
+                ] = "No output"  # I think it's best to be explicit, but we should test this.
+            else:
+                new_message["content"] = message["content"]
+            if "tool_call_id" in message:
+                new_message["tool_call_id"] = message["tool_call_id"]
+
+        else:
+            # This should be experimented with.
+            if interpreter.code_output_sender == "user":
+                if message["content"].strip() == "":
+                    content = interpreter.empty_code_output_template
+                else:
+                    content = interpreter.code_output_template.replace(
+                        "{content}", message["content"]
+                    )
+
+                new_message["role"] = "user"
+                new_message["content"] = content
+            elif interpreter.code_output_sender == "assistant":
+                new_message["role"] = "assistant"
+                new_message["content"] = "\n```output\n" + message["content"] + "\n```"
+
+    elif message["type"] == "image":
+        if message.get("format") == "description":
+            new_message["role"] = message["role"]
+            new_message["content"] = message["content"]
+        else:
+            if vision == False:
+                # If no vision, we only support the format of "description"
+                return None
+
+            if "base64" in message["format"]:
+                # Extract the extension from the format, default to 'png' if not specified
+                if "." in message["format"]:
+                    extension = message["format"].split(".")[-1]
+                else:
+                    extension = "png"
+                # The content itself (or its blob reference) identifies the image
+                key = (message["content"], extension, shrink_images)
+
+            elif message["format"] == "path":
+                extension = message["content"].split(".")[-1]
+                try:
+                    modified = os.path.getmtime(message["content"])
+                except OSError:
+                    modified = None
+                key = ("path", message["content"], modified, shrink_images)
+
+            else:
+                # Probably would be better to move this to a validation pass
+                # Near core, through the whole messages object
+                if "format" not in message:
+                    raise Exception("Format of the image is not specified.")
+                else:
+                    raise Exception(f"Unrecognized image format: {message['format']}")
+
+            if image_cache is None:
+                content = image_data_url(message, extension, shrink_images, interpreter)
+            elif key in image_cache:
+                content = image_cache[key]
+                image_cache.move_to_end(key)
+            else:
+                content = image_data_url(message, extension, shrink_images, interpreter)
+                image_cache[key] = content
+                while len(image_cache) > IMAGE_CACHE_SIZE:
+                    image_cache.popitem(last=False)
+
+            new_message = {
+                "role": "user",
+                "content": [
+                    {
+                        "type": "image_url",
+                        "image_url": {"url": content, "detail": "low"},
+                    }
+                ],
+            }
+
+            if message["role"] == "computer":
+                new_message["content"].append(
+                    {
+                        "type": "text",
+                        "text": "This image is the result of the last tool output. What does it mean / are we done?",
+                    }
+                )
+            if message.get("format") == "path":
+                if any(
+                    content.get("type") == "text" for content in new_message["content"]
+                ):
+                    for content in new_message["content"]:
+                        if content.get("type") == "text":
+                            content["text"] += (
+                                "\nThis image is at this path: " + message["content"]
+                            )
+                else:
+                    new_message["content"].append(
+                        {
+                            "type": "text",
+                            "text": "This image is at this path: " + message["content"],
+                        }
+                    )
+
+    elif message["type"] == "file":
+        new_message = {"role": "user", "content": message["content"]}
+    elif message["type"] == "error":
+        print("Ignoring 'type' == 'error' messages.")
+        return None
+    else:
+        raise Exception(f"Unable to convert this message type: {message}")
+
+    if isinstance(new_message["content"], str):
+        new_message["content"] = new_message["content"].strip()
+
+    return new_message
+
+
+def image_data_url(message, extension, shrink_images=True, interpreter=None):
+    """
+    Reads an image message into a data URL, shrunk to fit under MAX_IMAGE_SIZE if shrink_images is set.
+    """
+    if message["format"] == "path":
+        with open(message["content"], "rb") as image_file:
+            encoded_string = base64.b64encode(image_file.read()).decode("utf-8")
+    else:
+        # Stored messages can hold a reference into interpreter.blob_store instead
+        encoded_string = message["content"]
+        if is_blob(encoded_string):
+            encoded_string = interpreter.blob_store.base64(encoded_string)
+
+    content = f"data:image/{extension};base64,{encoded_string}"
+    if not shrink_images or len(content) <= MAX_IMAGE_SIZE:
+        return content
+
+    img = Image.open(io.BytesIO(base64.b64decode(encoded_string)))
+    size = len(content)
+    for _ in range(3):
+        # Encoded size goes with the pixel count, so scale both sides by the square root
+        scale_factor = (SHRUNK_IMAGE_SIZE / size) ** 0.5
+        new_width = max(1, int(img.width * scale_factor))
+        new_height = max(1, int(img.height * scale_factor))
+        img = img.resize((new_width, new_height))
+
+        buffered = io.BytesIO()
+        img.save(buffered, format=extension)
+        encoded_string = base64.b64encode(buffered.getvalue()).decode("utf-8")
+        content = f"data:image/{extension};base64,{encoded_string}"
+
+        # Compression doesn't scale exactly, so very rarely it takes another pass
+        size = len(content)
+        if size <= MAX_IMAGE_SIZE:
+            break
+    else:
+        print("Attempted to shrink the image but failed. Sending to the LLM anyway.")
+    return content
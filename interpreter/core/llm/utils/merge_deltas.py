@@ -5,7 +5,10 @@ def merge_deltas(original, delta):
     Great for reconstructing OpenAI streaming responses -> complete message objects.
     """
 
-    for key, value in dict(delta).items():
+    if not isinstance(delta, dict):
+        delta = dict(delta)
+
+    for key, value in delta.items():
         if value != None:
             if isinstance(value, str):
                 if key in original:
@@ -13,9 +16,9 @@ def merge_deltas(original, delta):
                 else:
                     original[key] = value
             else:
-                value = dict(value)
                 if key not in original:
-                    original[key] = value
+                    # A copy, since later deltas are merged into it
+                    original[key] = dict(value)
                 else:
                     merge_deltas(original[key], value)
 
@@ -0,0 +1,106 @@
+import re
+
+closing_fence = re.compile(r"\n[ \t]*```")
+# The end of a buffer that might still turn into a closing fence
+possible_closing_fence = re.compile(r"\n[ \t]*`{0,2}\Z")
+
+
+class StreamingFenceParser:
+    """
+    Splits a streamed markdown reply into LMC message and code chunks, in one pass.
+
+    Every ``` fenced block becomes its own code message, with its language taken from the info string.
+    Fences split across tokens are handled by holding back the few characters that might be part of one.
+
+    parser = StreamingFenceParser()
+    parser.feed("Let's see.\\n``")  # [{"type": "message", "content": "Let's see.\\n"}]
+    parser.feed("`python\\nprint(1)\\n```")  # [{"type": "code", "format": "python", "content": "print(1)"}]
+    parser.flush()  # Whatever was being held back
+    """
+
+    def __init__(self, default_language="python"):
+        self.default_language = default_language
+        self.state = "message"
+        self.buffer = ""
+        self.language = None
+        self.first_code_chunk = False
+
+    def feed(self, text):
+        self.buffer += text
+        chunks = []
+
+        while self.buffer:
+            if self.state == "message":
+                start = self.buffer.find("```")
+                if start == -1:
+                    # Hold back trailing backticks, they might become a fence
+                    keep = len(self.buffer) - len(self.buffer.rstrip("`"))
+                    self._emit_message(self.buffer[: len(self.buffer) - keep], chunks)
+                    self.buffer = self.buffer[len(self.buffer) - keep :]
+                    break
+                self._emit_message(self.buffer[:start], chunks)
+                self.buffer = self.buffer[start + 3 :]
+                self.state = "info"
+
+            elif self.state == "info":
+                end = self.buffer.find("\n")
+                if end == -1:
+                    # Wait for the rest of the info string
+                    break
+                self.language = self._parse_language(self.buffer[:end])
+                # Keep the newline, so a fence on the first line is still "at the start of a line"
+                self.buffer = self.buffer[end:]
+                self.state = "code"
+                self.first_code_chunk = True
+
+            elif self.state == "code":
+                match = closing_fence.search(self.buffer)
+                if match:
+                    self._emit_code(self.buffer[: match.start()], chunks)
+                    self.buffer = self.buffer[match.end() :]
+                    self.state = "message"
+                    self.language = None
+                    continue
+                match = possible_closing_fence.search(self.buffer)
+                end = match.start() if match else len(self.buffer)
+                self._emit_code(self.buffer[:end], chunks)
+                self.buffer = self.buffer[end:]
+                break
+
+        return chunks
+
+    def flush(self):
+        """
+        Call this when the stream ends, to get whatever was being held back.
+        """
+        chunks = []
+        if self.state == "message":
+            self._emit_message(self.buffer, chunks)
+        elif self.state == "code":
+            self._emit_code(self.buffer.rstrip("`").rstrip(), chunks)
+        self.buffer = ""
+        self.state = "message"
+        return chunks
+
+    def _parse_language(self, info):
+        words = info.split()
+        if not words:
+            return self.default_language
+        # Removes hallucinations containing spaces or non letters.
+        return "".join(char for char in words[0] if char.isalpha()) or (
+            self.default_language
+        )
+
+    def _emit_message(self, content, chunks):
+        if content:
+            chunks.append({"type": "message", "content": content})
+
+    def _emit_code(self, content, chunks):
+        if self.first_code_chunk:
+            if not content:
+                return
+            # Drop the newline that ended the info string
+            content = content[1:]
+            self.first_code_chunk = False
+        if content:
+            chunks.append({"type": "code", "format": self.language, "content": content})
@@ -0,0 +1,191 @@
+import re
+
+string_special_characters = re.compile(r'["\\]')
+whitespace = " \t\n\r"
+escapes = {
+    '"': '"',
+    "\\": "\\",
+    "/": "/",
+    "b": "\b",
+    "f": "\f",
+    "n": "\n",
+    "r": "\r",
+    "t": "\t",
+}
+
+
+class StreamingJsonParser:
+    """
+    Parses a JSON object as it streams in, like the `arguments` of a tool call.
+
+    Feed it each new piece of the string. It returns the new characters of the object's
+    top level string values as (key, text) pairs, without re-reading what it has already seen.
+    Other values (numbers, nested objects...) are skipped.
+
+    parser = StreamingJsonParser()
+    parser.feed('{"language": "pyth')  # [("language", "pyth")]
+    parser.feed('on", "code": "print(1)\\n')  # [("language", "on"), ("code", "print(1)\n")]
+    parser.finished_keys  # {"language"}
+    """
+
+    def __init__(self):
+        self.state = "start"
+        self.key = None
+        self.key_parts = []
+        self.finished_keys = set()  # Keys whose string values have been closed
+
+        self.escape = ""  # An escape sequence, which can be split across pieces
+        self.high_surrogate = ""  # The first half of a \uXXXX\uXXXX pair
+
+        # For skipping over nested values
+        self.depth = 0
+        self.nested_in_string = False
+        self.nested_escaped = False
+
+    @property
+    def failed(self):
+        """
+        True if the stream isn't a JSON object. (Some models send plain code instead.)
+        """
+        return self.state == "invalid"
+
+    def feed(self, piece):
+        output = []
+        i = 0
+        length = len(piece)
+
+        while i < length:
+            state = self.state
+
+            if state in ("key", "string"):
+                if self.escape:
+                    self.escape += piece[i]
+                    i += 1
+                    if self.escape[1] == "u" and len(self.escape) < 6:
+                        continue
+                    self._emit_escape(output)
+                    continue
+
+                # Grab everything up to the next quote or backslash in one go
+                match = string_special_characters.search(piece, i)
+                end = match.start() if match else length
+                if end > i:
+                    self._emit(piece[i:end], output)
+                if match is None:
+                    break
+                i = end + 1
+                if piece[end] == "\\":
+                    self.escape = "\\"
+                else:
+                    self._end_string(output)
+                continue
+
+            char = piece[i]
+            i += 1
+
+            if state in ("done", "invalid"):
+                break
+
+            if state == "nested":
+                self._skip_nested(char)
+                continue
+
+            if state == "scalar":
+                if char == ",":
+                    self.state = "key_or_end"
+                elif char == "}":
+                    self.state = "done"
+                continue
+
+            if char in whitespace:
+                continue
+
+            if state == "start":
+                self.state = "key_or_end" if char == "{" else "invalid"
+            elif state == "key_or_end":
+                if char == '"':
+                    self.state = "key"
+                elif char == "}":
+                    self.state = "done"
+                elif char != ",":
+                    self.state = "invalid"
+            elif state == "colon":
+                self.state = "value" if char == ":" else "invalid"
+            elif state == "value":
+                if char == '"':
+                    self.state = "string"
+                elif char in "{[":
+                    self.state = "nested"
+                    self.depth = 1
+                else:
+                    self.state = "scalar"
+            elif state == "after_value":
+                if char == ",":
+                    self.state = "key_or_end"
+                elif char == "}":
+                    self.state = "done"
+                else:
+                    self.state = "invalid"
+
+        return output
+
+    def _emit(self, text, output):
+        if self.high_surrogate:
+            # A lone surrogate. Pass it along as json.loads would
+            text = self.high_surrogate + text
+            self.high_surrogate = ""
+        if not text:
+            return
+        if self.state == "key":
+            self.key_parts.append(text)
+        elif output and output[-1][0] == self.key:
+            output[-1] = (self.key, output[-1][1] + text)
+        else:
+            output.append((self.key, text))
+
+    def _emit_escape(self, output):
+        sequence, self.escape = self.escape, ""
+        if sequence[1] == "u":
+            try:
+                char = chr(int(sequence[2:], 16))
+            except ValueError:
+                char = sequence
+        else:
+            char = escapes.get(sequence[1], sequence[1])
+
+        if "\ud800" <= char <= "\udbff":
+            self._emit("", output)
+            self.high_surrogate = char
+            return
+        if "\udc00" <= char <= "\udfff" and self.high_surrogate:
+            char = (self.high_surrogate + char).encode("utf-16", "surrogatepass")
+            char = char.decode("utf-16")
+            self.high_surrogate = ""
+        self._emit(char, output)
+
+    def _end_string(self, output):
+        self._emit("", output)
+        if self.state == "key":
+            self.key = "".join(self.key_parts)
+            self.key_parts = []
+            self.state = "colon"
+        else:
+            self.finished_keys.add(self.key)
+            self.state = "after_value"
+
+    def _skip_nested(self, char):
+        if self.nested_in_string:
+            if self.nested_escaped:
+                self.nested_escaped = False
+            elif char == "\\":
+                self.nested_escaped = True
+            elif char == '"':
+                self.nested_in_string = False
+        elif char == '"':
+            self.nested_in_string = True
+        elif char in "{[":
+            self.depth += 1
+        elif char in "}]":
+            self.depth -= 1
+            if self.depth == 0:
+                self.state = "after_value"
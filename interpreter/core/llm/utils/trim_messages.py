@@ -0,0 +1,144 @@
+import bisect
+import itertools
+
+from tokentrim import tokentrim as tt
+from tokentrim.model_map import MODEL_MAX_TOKENS
+
+from .convert_to_openai_messages import copy_message
+
+
+def freeze(value):
+    """
+    Turns an OpenAI message (or part of one) into something hashable, to find the counts of messages that moved.
+    Strings cache their own hash, so this stays cheap for messages we've seen before.
+    """
+    if isinstance(value, dict):
+        return tuple((key, freeze(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+    return value
+
+
+def count_message_tokens(message, model=None):
+    """
+    Counts the tokens a message adds to a request, the same way tokentrim does.
+    """
+    # tokentrim adds 3 tokens per request, not per message
+    return tt.num_tokens_from_messages([message], model) - 3
+
+
+def prefix_token_counts(messages, model=None, token_counts=None):
+    """
+    Returns prefix sums of the messages' token counts: prefix[i] is the token count of messages[:i].
+
+    If a `token_counts` dict is kept between calls, it holds the messages counted last time and their
+    prefix sums. Those are compared with the new messages in order, which is cheap because unchanged
+    messages share their strings with last time's. Only the prefix sums from the first change on are
+    redone, and messages there that only moved (say, an image before them was dropped) aren't counted again.
+    """
+    if token_counts is None:
+        counts = (count_message_tokens(message, model) for message in messages)
+        return list(itertools.accumulate(counts, initial=0))
+
+    if "prefix" not in token_counts or token_counts["model"] != model:
+        token_counts.clear()
+        token_counts.update(model=model, messages=[], prefix=[0])
+    counted = token_counts["messages"]
+    prefix = token_counts["prefix"]
+
+    unchanged = 0
+    for previous, message in zip(counted, messages):
+        if previous != message:
+            break
+        unchanged += 1
+
+    moved = {
+        freeze(counted[i]): prefix[i + 1] - prefix[i]
+        for i in range(unchanged, len(counted))
+    }
+    del counted[unchanged:]
+    del prefix[unchanged + 1 :]
+
+    for message in messages[unchanged:]:
+        count = moved.get(freeze(message)) if moved else None
+        if count is None:
+            count = count_message_tokens(message, model)
+        # A copy, in case the one we were given is edited after we return
+        counted.append(copy_message(message))
+        prefix.append(prefix[-1] + count)
+
+    return prefix
+
+
+def trim_messages(
+    messages,
+    system_message=None,
+    max_tokens=None,
+    model=None,
+    token_counts=None,
+    trim_ratio=0.75,
+):
+    """
+    Drops the oldest messages until the rest fit into `max_tokens`, alongside the system message.
+    The oldest message that doesn't fit is shortened from the middle if that lets it fit.
+
+    This mirrors `tokentrim.trim`, but each message is only tokenized once if a `token_counts`
+    dict is kept between calls (see prefix_token_counts), and the cut point is found with a binary
+    search over prefix sums.
+    """
+
+    if max_tokens is None:
+        if model not in MODEL_MAX_TOKENS:
+            raise ValueError(f"Invalid model: {model}. Specify max_tokens instead")
+        max_tokens = int(MODEL_MAX_TOKENS[model] * trim_ratio)
+
+    if system_message:
+        system_message_event = {"role": "system", "content": system_message}
+        system_message_tokens = tt.num_tokens_from_messages(
+            [system_message_event], model
+        )
+
+        if system_message_tokens > max_tokens:
+            print(
+                "Warning: the system message exceeds the token limit, which is probably undesired. Trimming..."
+            )
+            tt.shorten_message_to_fit_limit(system_message_event, max_tokens, model)
+            system_message_tokens = tt.num_tokens_from_messages(
+                [system_message_event], model
+            )
+
+        # tokentrim sets the system message aside twice. We keep that margin,
+        # since we count tokens with an OpenAI tokenizer whatever the model is.
+        max_tokens -= 2 * system_message_tokens
+
+    # Keep the shortest suffix that fits, counting the 3 tokens every request has
+    prefix = prefix_token_counts(messages, model, token_counts)
+    total = prefix[-1]
+    start = min(bisect.bisect_left(prefix, total + 3 - max_tokens), len(messages))
+    final_messages = messages[start:]
+
+    if start > 0:
+        # Try to fit part of the message that got cut off
+        message = messages[start - 1]
+        final_messages_tokens = total - prefix[start] + 3
+        tokens_remaining = max_tokens - final_messages_tokens
+
+        # (This only works for plain text messages)
+        if (
+            tokens_remaining > 0
+            and "function_call" not in message
+            and isinstance(message.get("content"), str)
+        ):
+            message = message.copy()
+            tt.shorten_message_to_fit_limit(message, tokens_remaining, model)
+
+            if (
+                tt.num_tokens_from_messages([message], model) + final_messages_tokens
+                <= max_tokens
+            ):
+                final_messages = [message] + final_messages
+
+    if system_message:
+        final_messages = [system_message_event] + final_messages
+
+    return final_messages
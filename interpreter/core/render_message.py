@@ -1,4 +1,73 @@
 import re
+import time
+from functools import lru_cache
+
+# A {{ }} block can say how long its output stays valid with a directive on its first line:
+#
+# {{
+# # cache: turn
+# print(computer.skills.list())
+# }}
+#
+# "session" renders it once, "turn" once per user message, "cwd" whenever the working directory of the
+# Python kernel the blocks run in changes, and "30s" (any number of seconds) once it's older than that.
+# Comma-separate them to require all of them.
+# Blocks without a directive run on every render, like they always have.
+cache_directive = re.compile(r"\A\s*#\s*cache:\s*(.+?)\s*$", flags=re.MULTILINE)
+
+cwd_probe_code = "import os; print(os.getcwd())"
+
+
+@lru_cache(maxsize=16)
+def compile_message(message):
+    """
+    Splits a dynamic message into its static text and its {{ }} blocks, once per message.
+    Blocks are returned as (code, policy) tuples, static text as plain strings.
+    """
+
+    # Split the message into parts by {{ and }}, including multi-line strings
+    parts = re.split(r"({{.*?}})", message, flags=re.DOTALL)
+
+    compiled = []
+    for part in parts:
+        # If the part is enclosed in {{ and }}
+        if part.startswith("{{") and part.endswith("}}"):
+            code = part[2:-2].strip()
+            match = cache_directive.match(code)
+            policy = None
+            if match:
+                policy = tuple(p.strip().lower() for p in match.group(1).split(","))
+            compiled.append((code, policy))
+        else:
+            compiled.append(part)
+
+    return tuple(compiled)
+
+
+def is_fresh(interpreter, entry, policy, get_cwd):
+    """
+    Is a cached block output still valid under its policy?
+    """
+    if not policy:
+        return False
+
+    for rule in policy:
+        if rule == "session":
+            continue
+        elif rule == "turn":
+            if entry["turn"] != interpreter._turn:
+                return False
+        elif rule == "cwd":
+            if entry["cwd"] != get_cwd():
+                return False
+        elif re.fullmatch(r"\d+(\.\d+)?s", rule):
+            if time.time() - entry["time"] > float(rule[:-1]):
+                return False
+        else:
+            # Unknown rule. Safer to just run it.
+            return False
+
+    return True
 
 
 def render_message(interpreter, message):
@@ -6,33 +75,64 @@ def render_message(interpreter, message):
     Renders a dynamic message into a string.
     """
 
+    parts = compile_message(message)
+    cache = interpreter._render_cache
+
     previous_save_skills_setting = interpreter.computer.save_skills
     interpreter.computer.save_skills = False
 
-    # Split the message into parts by {{ and }}, including multi-line strings
-    parts = re.split(r"({{.*?}})", message, flags=re.DOTALL)
+    rendered_parts = []
 
-    for i, part in enumerate(parts):
-        # If the part is enclosed in {{ and }}
-        if part.startswith("{{") and part.endswith("}}"):
-            # Run the code inside the brackets
-            output = interpreter.computer.run(
-                "python", part[2:-2].strip(), display=interpreter.verbose
-            )
+    # Asked of the kernel at most once per render, and only if a block's policy needs it
+    cwd = []
 
-            # Extract the output content
-            outputs = (
-                line["content"]
-                for line in output
-                if line.get("format") == "output"
-                and "IGNORE_ALL_ABOVE_THIS_LINE" not in line["content"]
+    def get_cwd():
+        if not cwd:
+            output = interpreter.computer.run("python", cwd_probe_code, display=False)
+            cwd.append(
+                "".join(
+                    line["content"] for line in output if line.get("format") == "output"
+                ).strip()
             )
+        return cwd[0]
+
+    for part in parts:
+        if isinstance(part, str):
+            rendered_parts.append(part)
+            continue
+
+        code, policy = part
+
+        entry = cache.get(code)
+        if entry is not None and is_fresh(interpreter, entry, policy, get_cwd):
+            rendered_parts.append(entry["output"])
+            continue
+
+        # Run the code inside the brackets
+        output = interpreter.computer.run("python", code, display=interpreter.verbose)
+
+        # Extract the output content
+        outputs = (
+            line["content"]
+            for line in output
+            if line.get("format") == "output"
+            and "IGNORE_ALL_ABOVE_THIS_LINE" not in line["content"]
+        )
+
+        # Replace the part with the output
+        output = "\n".join(outputs)
+        rendered_parts.append(output)
 
-            # Replace the part with the output
-            parts[i] = "\n".join(outputs)
+        if policy:
+            cache[code] = {
+                "output": output,
+                "time": time.time(),
+                "turn": interpreter._turn,
+                "cwd": get_cwd() if "cwd" in policy else None,
+            }
 
     # Join the parts back into the message
-    rendered_message = "".join(parts).strip()
+    rendered_message = "".join(rendered_parts).strip()
 
     if (
         interpreter.debug == True and False  # DISABLED
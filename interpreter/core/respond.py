@@ -17,10 +17,35 @@ def respond(interpreter):
     Responds until it decides not to run any more code or say anything else.
     """
 
+    # If one LLM reply has several code blocks, we run them one at a time.
+    # The messages after the one we're running wait here, so its output lands right after it.
+    queued_messages = []
+    try:
+        yield from _respond(interpreter, queued_messages)
+    finally:
+        # However it stopped (interrupted, closed at a confirmation, an error), they go back in
+        interpreter.messages.extend(queued_messages)
+        queued_messages.clear()
+
+
+def _respond(interpreter, queued_messages):
     last_unsupported_code = ""
     insert_loop_message = False
 
+    # Unless they're tool calls that can all run at once
+    concurrent_code_messages = []
+
     while True:
+        ## QUEUED CODE BLOCKS ##
+
+        if queued_messages:
+            # Put back everything up to (and including) the next code block
+            while queued_messages:
+                message = queued_messages.pop(0)
+                interpreter.messages.append(message)
+                if message["type"] == "code":
+                    break
+
         ## RENDER SYSTEM MESSAGE ##
 
         system_message = interpreter.system_message
@@ -59,6 +84,7 @@ def respond(interpreter):
         }
 
         # Create the version of messages that we'll send to the LLM
+        interpreter._flush_output_buffers()  # Code output is buffered until it's needed
         messages_for_llm = interpreter.messages.copy()
         messages_for_llm = [rendered_system_message] + messages_for_llm
 
@@ -93,8 +119,29 @@ def respond(interpreter):
                     print(f"  [{i}] Role: {msg.get('role')}, Type: {msg.get('type', 'N/A')}, Content Preview: {content_preview}")
                 print("--- End of messages_for_llm ---\n")
             try:
+                reply_start = len(interpreter.messages)
+
                 for chunk in interpreter.llm.run(messages_for_llm):
-                    yield {"role": "assistant", **chunk}
+                    # Each delta is a new dict, so it can be tagged in place
+                    chunk["role"] = "assistant"
+                    yield chunk
+                interpreter._flush_output_buffers()  # The reply's content is read below
+
+                # Several code blocks in this reply?
+                reply_code_messages = [
+                    m for m in interpreter.messages[reply_start:] if m["type"] == "code"
+                ]
+                if len(reply_code_messages) > 1 and can_run_concurrently(
+                    interpreter, reply_code_messages
+                ):
+                    concurrent_code_messages = reply_code_messages
+                else:
+                    # Run the first, queue the rest
+                    for i in range(reply_start, len(interpreter.messages) - 1):
+                        if interpreter.messages[i]["type"] == "code":
+                            queued_messages.extend(interpreter.messages[i + 1 :])
+                            del interpreter.messages[i + 1 :]
+                            break
 
             except litellm.exceptions.BudgetExceededError:
                 interpreter.display_message(
@@ -173,6 +220,15 @@ def respond(interpreter):
 
         ### RUN CODE (if it's there) ###
 
+        if concurrent_code_messages:
+            try:
+                yield from run_code_concurrently(interpreter, concurrent_code_messages)
+            except KeyboardInterrupt:
+                break  # It's fine.
+            concurrent_code_messages = []
+            # Send all of their outputs back in one completion
+            continue
+
         if interpreter.messages[-1]["type"] == "code":
             if interpreter.verbose:
                 print("Running code:", interpreter.messages[-1])
@@ -181,6 +237,12 @@ def respond(interpreter):
                 # What language/code do you want to run?
                 language = interpreter.messages[-1]["format"].lower().strip()
                 code = interpreter.messages[-1]["content"]
+                # Tag its output, so tool calls can be paired with their outputs
+                tool_call_tag = {}
+                if "tool_call_id" in interpreter.messages[-1]:
+                    tool_call_tag["tool_call_id"] = interpreter.messages[-1][
+                        "tool_call_id"
+                    ]
 
                 if code.startswith("`\n"):
                     code = code[2:].strip()
@@ -311,44 +373,13 @@ def respond(interpreter):
                     break
 
                 # They may have edited the code! Grab it again
-                code = [m for m in interpreter.messages if m["type"] == "code"][-1][
-                    "content"
-                ]
+                code = interpreter.messages.last("code")["content"]
 
                 # don't let it import computer — we handle that!
                 if interpreter.computer.import_computer_api and language == "python":
-                    code = code.replace("import computer\n", "pass\n")
-                    code = re.sub(
-                        r"import computer\.(\w+) as (\w+)", r"\2 = computer.\1", code
-                    )
-                    code = re.sub(
-                        r"from computer import (.+)",
-                        lambda m: "\n".join(
-                            f"{x.strip()} = computer.{x.strip()}"
-                            for x in m.group(1).split(", ")
-                        ),
-                        code,
-                    )
-                    code = re.sub(r"import computer\.\w+\n", "pass\n", code)
-                    # If it does this it sees the screenshot twice (which is expected jupyter behavior)
-                    if any(
-                        [
-                            code.strip().split("\n")[-1].startswith(text)
-                            for text in [
-                                "computer.display.view",
-                                "computer.display.screenshot",
-                                "computer.view",
-                                "computer.screenshot",
-                            ]
-                        ]
-                    ):
-                        code = code + "\npass"
+                    code = handle_computer_imports(code)
 
-                # sync up some things (is this how we want to do this?)
-                interpreter.computer.verbose = interpreter.verbose
-                interpreter.computer.debug = interpreter.debug
-                interpreter.computer.emit_images = interpreter.llm.supports_vision
-                interpreter.computer.max_output = interpreter.max_output
+                sync_computer_settings(interpreter)
 
                 # sync up the interpreter's computer with your computer
                 try:
@@ -370,7 +401,7 @@ def respond(interpreter):
                 ## ↓ CODE IS RUN HERE
 
                 for line in interpreter.computer.run(language, code, stream=True):
-                    yield {"role": "computer", **line}
+                    yield {"role": "computer", **line, **tool_call_tag}
 
                 ## ↑ CODE IS RUN HERE
 
@@ -407,6 +438,7 @@ def respond(interpreter):
                     "type": "console",
                     "format": "active_line",
                     "content": None,
+                    **tool_call_tag,
                 }
 
             except KeyboardInterrupt:
@@ -440,15 +472,12 @@ def respond(interpreter):
                     for task_status in loop_breakers
                 )
             ):
-                # Remove past loop_message messages
-                interpreter.messages = [
-                    message
-                    for message in interpreter.messages
-                    if message.get("content", "") != loop_message
-                ]
-                # Combine adjacent assistant messages, so hopefully it learns to just keep going!
+                # Remove past loop_message messages, and combine adjacent assistant messages,
+                # so hopefully it learns to just keep going!
                 combined_messages = []
                 for message in interpreter.messages:
+                    if message.get("content", "") == loop_message:
+                        continue
                     if (
                         combined_messages
                         and message["role"] == "assistant"
@@ -470,3 +499,92 @@ def respond(interpreter):
             break
 
     return
+
+
+def handle_computer_imports(code):
+    """
+    The computer API is already imported for it, so imports of `computer` become assignments.
+    """
+    code = code.replace("import computer\n", "pass\n")
+    code = re.sub(r"import computer\.(\w+) as (\w+)", r"\2 = computer.\1", code)
+    code = re.sub(
+        r"from computer import (.+)",
+        lambda m: "\n".join(
+            f"{x.strip()} = computer.{x.strip()}" for x in m.group(1).split(", ")
+        ),
+        code,
+    )
+    code = re.sub(r"import computer\.\w+\n", "pass\n", code)
+    # If it does this it sees the screenshot twice (which is expected jupyter behavior)
+    if any(
+        [
+            code.strip().split("\n")[-1].startswith(text)
+            for text in [
+                "computer.display.view",
+                "computer.display.screenshot",
+                "computer.view",
+                "computer.screenshot",
+            ]
+        ]
+    ):
+        code = code + "\npass"
+    return code
+
+
+def sync_computer_settings(interpreter):
+    # sync up some things (is this how we want to do this?)
+    interpreter.computer.verbose = interpreter.verbose
+    interpreter.computer.debug = interpreter.debug
+    interpreter.computer.emit_images = interpreter.llm.supports_vision
+    interpreter.computer.max_output = interpreter.max_output
+
+
+def can_run_concurrently(interpreter, code_messages):
+    """
+    Tool calls from one reply can run at the same time if nothing has to happen between them:
+    no confirmations to ask for, no computer to sync, and nothing to fix up first.
+    """
+    return (
+        interpreter.auto_run
+        and not interpreter.sync_computer
+        and all(
+            "tool_call_id" in message
+            and message["content"].strip() != ""
+            and message["format"].lower().strip()
+            not in ["text", "markdown", "plaintext"]
+            and interpreter.computer.terminal.get_language(
+                message["format"].lower().strip()
+            )
+            is not None
+            for message in code_messages
+        )
+    )
+
+
+def run_code_concurrently(interpreter, code_messages):
+    """
+    Runs the tool calls from one reply at the same time. Yields their output tagged by tool_call_id.
+    """
+    calls = []
+    for message in code_messages:
+        language = message["format"].lower().strip()
+        code = message["content"]
+        if interpreter.computer.import_computer_api and language == "python":
+            code = handle_computer_imports(code)
+        calls.append((message["tool_call_id"], language, code))
+
+    sync_computer_settings(interpreter)
+
+    ## ↓ CODE IS RUN HERE
+
+    for line in interpreter.computer.terminal.run_concurrently(calls):
+        yield {"role": "computer", **line}
+
+    ## ↑ CODE IS RUN HERE
+
+    yield {
+        "role": "computer",
+        "type": "console",
+        "format": "active_line",
+        "content": None,
+    }
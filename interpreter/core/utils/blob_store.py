@@ -0,0 +1,126 @@
+import atexit
+import base64
+import binascii
+import hashlib
+import os
+import shutil
+import tempfile
+from collections import OrderedDict
+
+# Message content that starts with this is a reference into a BlobStore, not base64.
+# Base64 never contains a colon, so the two can't be confused
+BLOB_PREFIX = "blob:"
+
+
+def is_blob(content):
+    return isinstance(content, str) and content.startswith(BLOB_PREFIX)
+
+
+class BlobStore:
+    """
+    Keeps the bytes of images out of interpreter.messages, which hold a short "blob:<sha256>" reference instead.
+
+    Blobs are kept in memory, most recently used first, up to `memory_limit` bytes.
+    Past that, the least recently used ones are written to a per-session directory and read back when needed.
+    The same bytes always get the same reference, so a repeated screenshot is only stored once.
+    """
+
+    def __init__(self, memory_limit=64 * 1024 * 1024, directory=None):
+        self.memory_limit = memory_limit
+        self.directory = directory
+        self._owns_directory = False
+        self._blobs = OrderedDict()  # sha256: bytes, least recently used first
+        self._size = 0
+
+    def put(self, data):
+        """
+        Stores bytes and returns their reference.
+        """
+        digest = hashlib.sha256(data).hexdigest()
+        if digest in self._blobs:
+            self._blobs.move_to_end(digest)
+        else:
+            self._remember(digest, data)
+        return BLOB_PREFIX + digest
+
+    def put_base64(self, encoded):
+        """
+        Stores base64 text as bytes. If it isn't valid base64, it's returned as it is.
+        """
+        try:
+            data = base64.b64decode(encoded, validate=True)
+        except (binascii.Error, ValueError):
+            return encoded
+        return self.put(data)
+
+    def get(self, ref):
+        """
+        The bytes behind a reference.
+        """
+        digest = ref[len(BLOB_PREFIX) :]
+        data = self._blobs.get(digest)
+        if data is not None:
+            self._blobs.move_to_end(digest)
+            return data
+
+        try:
+            with open(self._path(digest), "rb") as file:
+                data = file.read()
+        except (OSError, TypeError):
+            raise ValueError(f"There is no blob {ref!r}.")
+        self._remember(digest, data)
+        return data
+
+    def base64(self, content):
+        """
+        Base64 text for message content, whether it's a reference or already base64.
+        """
+        if not is_blob(content):
+            return content
+        return base64.b64encode(self.get(content)).decode("utf-8")
+
+    def expand(self, message):
+        """
+        The message with base64 content in place of a reference, for anything outside the interpreter.
+        Messages without a reference are returned as they are.
+        """
+        if not is_blob(message.get("content")):
+            return message
+        return {**message, "content": self.base64(message["content"])}
+
+    def expand_all(self, messages):
+        return [self.expand(message) for message in messages]
+
+    def cleanup(self):
+        self._blobs.clear()
+        self._size = 0
+        if self._owns_directory:
+            shutil.rmtree(self.directory, ignore_errors=True)
+            self.directory = None
+            self._owns_directory = False
+
+    def _remember(self, digest, data):
+        self._blobs[digest] = data
+        self._size += len(data)
+        # Keep the newest one in memory, however big it is
+        while self._size > self.memory_limit and len(self._blobs) > 1:
+            old_digest, old_data = self._blobs.popitem(last=False)
+            self._size -= len(old_data)
+            self._spill(old_digest, old_data)
+
+    def _spill(self, digest, data):
+        if self.directory is None:
+            self.directory = tempfile.mkdtemp(prefix="open-interpreter-blobs-")
+            self._owns_directory = True
+            atexit.register(self.cleanup)
+        path = self._path(digest)
+        if not os.path.exists(path):
+            # Written under another name first, so a half-written blob is never read
+            temporary_path = path + ".tmp"
+            with open(temporary_path, "wb") as file:
+                file.write(data)
+            os.replace(temporary_path, path)
+
+    def _path(self, digest):
+        # References can come from anywhere messages do, so don't let them point outside the directory
+        return os.path.join(self.directory, os.path.basename(digest))
@@ -0,0 +1,51 @@
+import time
+
+# Streamed token by token, so these are the chunks worth merging.
+# Console output is already batched by the languages, and holding it back could leave it waiting on a silent program
+COALESCED_TYPES = ("message", "code")
+
+
+def coalesce_chunks(chunks, flush_interval, max_chunk_size):
+    """
+    Merges adjacent message and code chunks that only differ in content, so consumers handle fewer, larger chunks.
+
+    A merged chunk is passed on once it's `flush_interval` seconds old or `max_chunk_size` characters long,
+    when a chunk arrives that can't join it, or when the stream ends. Everything else passes straight through,
+    in order, so flags and active lines come out exactly where they would have.
+
+    Nothing runs on a timer, so a merged chunk also waits for the chunk after it. For token streams that's one token.
+    """
+    pending = None
+    pending_key = None
+    deadline = 0
+
+    for chunk in chunks:
+        key = None
+        if (
+            chunk.get("type") in COALESCED_TYPES
+            and isinstance(chunk.get("content"), str)
+            and "start" not in chunk
+            and "end" not in chunk
+        ):
+            key = {k: v for k, v in chunk.items() if k != "content"}
+
+        if pending is not None:
+            if key == pending_key and time.monotonic() < deadline:
+                pending["content"] += chunk["content"]
+                if len(pending["content"]) >= max_chunk_size:
+                    yield pending
+                    pending = None
+                continue
+            yield pending
+            pending = None
+
+        if key is None:
+            yield chunk
+        else:
+            # A copy, so merging doesn't change a chunk someone else holds
+            pending = {**chunk}
+            pending_key = key
+            deadline = time.monotonic() + flush_interval
+
+    if pending is not None:
+        yield pending
@@ -0,0 +1,71 @@
+class MessageStore(list):
+    """
+    The list behind `interpreter.messages`. It's a plain list of plain message dicts, plus two shortcuts for hot paths:
+
+    last(type, role) finds the latest message of a type without scanning the whole conversation.
+    It remembers where the last one was, and only looks at the messages after it.
+
+    add_content(message, text) appends streamed content in O(1). The parts are joined into message["content"]
+    when flush_content() is called, which happens whenever a message is complete or someone needs to read it.
+    """
+
+    def __init__(self, messages=()):
+        super().__init__(messages)
+        # (role, type) -> index of the last message that matched
+        self._last_indexes = {}
+        # id(message) -> (message, content parts that haven't been joined yet)
+        self._content_parts = {}
+
+    def last(self, type=None, role=None):
+        """
+        The latest message with this type (and role, if given), or None.
+        """
+        key = (role, type)
+        index = self._last_indexes.get(key)
+
+        if index is None or index >= len(self) or not self._matches(index, key):
+            # Something was removed, inserted or edited before it, so start over
+            index = None
+            for i in range(len(self) - 1, -1, -1):
+                if self._matches(i, key):
+                    index = i
+                    break
+        else:
+            # Anything newer was added after it
+            for i in range(len(self) - 1, index, -1):
+                if self._matches(i, key):
+                    index = i
+                    break
+
+        if index is None:
+            self._last_indexes.pop(key, None)
+            return None
+        self._last_indexes[key] = index
+        return self[index]
+
+    def _matches(self, index, key):
+        role, type = key
+        message = self[index]
+        return (type is None or message.get("type") == type) and (
+            role is None or message.get("role") == role
+        )
+
+    def add_content(self, message, text):
+        """
+        Adds text to the end of message["content"], once flush_content() is called.
+        """
+        parts = self._content_parts.get(id(message))
+        if parts is None:
+            parts = [message.get("content", "")]
+            self._content_parts[id(message)] = (message, parts)
+        else:
+            parts = parts[1]
+        parts.append(text)
+
+    def flush_content(self):
+        """
+        Joins added content into its messages.
+        """
+        for message, parts in self._content_parts.values():
+            message["content"] = "".join(parts)
+        self._content_parts = {}
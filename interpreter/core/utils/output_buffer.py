@@ -0,0 +1,99 @@
+class OutputBuffer:
+    """
+    Accumulates streamed console output in bounded memory.
+
+    Keeps the first `head_chars` and the last `tail_chars` characters, and counts the rest,
+    so appending is O(1) amortized and memory stays bounded no matter how much a command prints.
+    str(buffer) renders the kept output, with a truncation message if anything was dropped.
+
+    If the full output was saved to the terminal's OutputStore, pass its `output_id`,
+    and the truncation message will say how to page through it.
+    """
+
+    def __init__(self, tail_chars=2800, head_chars=0, output_id=None):
+        self.tail_chars = tail_chars
+        self.head_chars = head_chars
+        self.output_id = output_id
+
+        self._head = []
+        self._head_length = 0
+        self._tail = []
+        self._tail_length = 0
+
+        # Totals, including everything that was dropped
+        self.chars = 0
+        self.bytes = 0
+        self.lines = 0
+
+    def append(self, text):
+        if not text:
+            return
+
+        length = len(text)
+        self.chars += length
+        self.bytes += (
+            length if text.isascii() else len(text.encode("utf-8", errors="replace"))
+        )
+        self.lines += text.count("\n")
+
+        # Fill the head first
+        if self._head_length < self.head_chars:
+            room = self.head_chars - self._head_length
+            self._head.append(text[:room])
+            self._head_length += len(self._head[-1])
+            text = text[room:]
+            length = len(text)
+            if not text:
+                return
+
+        # Then the tail. It's allowed to grow to twice its size before we trim it, so trimming is amortized
+        self._tail.append(text)
+        self._tail_length += length
+        if self._tail_length > 2 * self.tail_chars:
+            self._trim_tail()
+
+    def _trim_tail(self):
+        tail = "".join(self._tail)
+        tail = tail[len(tail) - self.tail_chars :] if self.tail_chars > 0 else ""
+        self._tail = [tail] if tail else []
+        self._tail_length = len(tail)
+
+    @property
+    def dropped_chars(self):
+        return self.chars - self._head_length - self._tail_length
+
+    @property
+    def truncated(self):
+        return self.dropped_chars > 0
+
+    def __str__(self):
+        if self._tail_length > self.tail_chars:
+            self._trim_tail()
+        head = "".join(self._head)
+        tail = "".join(self._tail)
+        # Keep the joined parts, so rendering again doesn't join again
+        self._head = [head] if head else []
+        self._tail = [tail] if tail else []
+
+        if not self.truncated:
+            return head + tail
+
+        if self.head_chars:
+            message = f"Output truncated. Showing the first {self.head_chars} and last {self.tail_chars} characters of {self.chars} ({self.lines} lines, {self.bytes} bytes). You should try again and use computer.ai.summarize(output) over the output, or break it down into smaller steps.\n\n"
+        else:
+            message = f"Output truncated. Showing the last {self.tail_chars} characters of {self.chars} ({self.lines} lines, {self.bytes} bytes). You should try again and use computer.ai.summarize(output) over the output, or break it down into smaller steps.\n\n"
+
+        if self.output_id:
+            message = (
+                message.strip()
+                + f' The full output was saved. Run `computer.terminal.output("{self.output_id}", 0, 100)` to see its first 100 lines, or `computer.terminal.grep(pattern, "{self.output_id}")` to search it.\n\n'
+            )
+
+        if head:
+            return (
+                message
+                + head
+                + f"\n\n[... {self.dropped_chars} characters omitted ...]\n\n"
+                + tail
+            )
+        return message + tail
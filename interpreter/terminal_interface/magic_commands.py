@@ -30,6 +30,11 @@ def handle_undo(self, arguments):
         removed_messages = self.messages[last_user_index:]
         self.messages = self.messages[:last_user_index]
 
+        # The last screenshot shown might be gone, so the next one shouldn't only say what changed
+        self.computer.display.forget_last_screenshot()
+        if self.computer._has_imported_computer_api:
+            self.computer.run("python", "computer.display.forget_last_screenshot()")
+
     print("")  # Aesthetics.
 
     # Print out a preview of what messages were removed.
@@ -154,7 +159,7 @@ def handle_save_message(self, json_path):
     if not json_path.endswith(".json"):
         json_path += ".json"
     with open(json_path, "w") as f:
-        json.dump(self.messages, f, indent=2)
+        json.dump(self.blob_store.expand_all(self.messages), f, indent=2)
 
     self.display_message(f"> messages json export to {os.path.abspath(json_path)}")
 
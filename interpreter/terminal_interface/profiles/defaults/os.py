@@ -15,6 +15,8 @@ interpreter.llm.max_tokens = 4096
 interpreter.auto_run = True
 interpreter.loop = True
 interpreter.sync_computer = True
+interpreter.blob_images = True  # Screenshots pile up, so keep them out of the messages
+interpreter.computer.skip_unchanged_screenshots = True
 
 interpreter.system_message = r"""
 
@@ -59,6 +61,7 @@ computer.clipboard.view() # Returns contents of clipboard
 computer.os.get_selected_text() # Use frequently. If editing text, the user often wants this
 
 {{
+# cache: session
 import platform
 if platform.system() == 'Darwin':
         print('''
@@ -150,6 +150,12 @@ def start_terminal_interface(interpreter):
             "type": int,
             "attribute": {"object": interpreter, "attr_name": "max_output"},
         },
+        {
+            "name": "max_output_head",
+            "help_text": "optional number of characters to keep from the start of long code outputs, as well as the end",
+            "type": int,
+            "attribute": {"object": interpreter, "attr_name": "max_output_head"},
+        },
         {
             "name": "loop",
             "help_text": "runs OI in a loop, requiring it to admit to completing/failing task",
@@ -566,6 +572,9 @@ Use """ to write multi-line messages.
         interpreter.llm.model = "claude-3-5-sonnet-20240620"
 
     if not args.server:
+        # Boot a Python kernel while the user types their first message. Profiles are loaded by now
+        interpreter.computer.terminal.kernel_pool.fill()
+
         # This SHOULD RUN WHEN THE SERVER STARTS. But it can't rn because
         # if you don't have an API key, a prompt shows up, breaking the whole thing.
         validate_llm_settings(
@@ -18,7 +18,7 @@ import time
 
 from ..core.utils.scan_code import scan_code
 from ..core.utils.system_debug_info import system_info
-from ..core.utils.truncate_output import truncate_output
+from ..core.utils.output_buffer import OutputBuffer
 from .components.code_block import CodeBlock
 from .components.message_block import MessageBlock
 from .magic_commands import handle_magic_command
@@ -79,6 +79,9 @@ def terminal_interface(interpreter, message):
 
     active_block = None
     voice_subprocess = None
+    # Bounded accumulator for the active block's output, and the block it belongs to
+    output_buffer = None
+    output_buffer_block = None
 
     while True:
         if interactive:
@@ -368,13 +371,11 @@ def terminal_interface(interpreter, message):
                         # But if verbose is true, we do display it!
                         continue
 
-                    assistant_code_blocks = [
-                        m
-                        for m in interpreter.messages
-                        if m.get("role") == "assistant" and m.get("type") == "code"
-                    ]
-                    if assistant_code_blocks:
-                        code = assistant_code_blocks[-1].get("content")
+                    assistant_code_block = interpreter.messages.last(
+                        "code", role="assistant"
+                    )
+                    if assistant_code_block:
+                        code = assistant_code_block.get("content")
                         if any(
                             text in code
                             for text in [
@@ -413,28 +414,36 @@ def terminal_interface(interpreter, message):
                         )
                     else:
                         # If the last message is a console output, simply append the extra output to it
-                        interpreter.messages[-1]["content"] += (
-                            "\n" + extra_computer_output
-                        )
-                        interpreter.messages[-1]["content"] = interpreter.messages[-1][
-                            "content"
-                        ].strip()
+                        output_message = interpreter.messages[-1]
+                        buffered = interpreter._output_buffers.get(id(output_message))
+                        if buffered:
+                            # Its content is rendered from the buffer, so that's where the output goes
+                            buffered[1].append("\n" + extra_computer_output)
+                            interpreter.computer.terminal.output_store.append(
+                                output_message["output_id"],
+                                "\n" + extra_computer_output,
+                            )
+                        else:
+                            output_message["content"] += "\n" + extra_computer_output
+                            output_message["content"] = output_message[
+                                "content"
+                            ].strip()
 
                 # Console
                 if chunk["type"] == "console":
                     render_cursor = False
                     if "format" in chunk and chunk["format"] == "output":
-                        active_block.output += "\n" + chunk["content"]
-                        active_block.output = (
-                            active_block.output.strip()
-                        )  # ^ Aesthetic choice
-
-                        # Truncate output
-                        active_block.output = truncate_output(
-                            active_block.output,
-                            interpreter.max_output,
-                            add_scrollbars=False,
-                        )  # ^ Notice that this doesn't add the "scrollbars" line, which I think is fine
+                        if output_buffer_block is not active_block:
+                            # Truncates as it goes, so a huge output doesn't get copied over and over
+                            output_buffer = OutputBuffer(
+                                interpreter.max_output, interpreter.max_output_head
+                            )  # ^ Notice that this doesn't add the "scrollbars" line, which I think is fine
+                            output_buffer.append(active_block.output)
+                            output_buffer_block = active_block
+                        output_buffer.append("\n" + chunk["content"])
+                        active_block.output = str(
+                            output_buffer
+                        ).strip()  # ^ Aesthetic choice
                     if "format" in chunk and chunk["format"] == "active_line":
                         active_block.active_line = chunk["content"]
 
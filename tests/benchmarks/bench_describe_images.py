@@ -0,0 +1,106 @@
+"""
+Describes a batch of 20 screenshots the way Llm.run does for models that can't see images.
+
+Moondream and EasyOCR are replaced with stand-ins that take a fixed time (inference mostly runs outside
+the GIL, so sleeping is a fair stand-in), which leaves the scheduling and I/O around them to compare:
+captioning then OCR through a temporary file (how it used to work), describe() with an empty cache,
+and describe() again once everything is cached.
+
+python tests/benchmarks/bench_describe_images.py
+"""
+
+import base64
+import io
+import shutil
+import tempfile
+import time
+
+from PIL import Image
+
+from interpreter.core.computer.vision.vision import Vision
+
+CAPTION_SECONDS = 0.05
+OCR_SECONDS = 0.04
+
+
+def screenshots(count=20, size=(1280, 800)):
+    messages = []
+    for i in range(count):
+        image = Image.new("RGB", size, (i * 12, 255 - i * 12, 128))
+        buffered = io.BytesIO()
+        image.save(buffered, format="png")
+        messages.append(
+            {
+                "role": "computer",
+                "type": "image",
+                "format": "base64.png",
+                "content": base64.b64encode(buffered.getvalue()).decode(),
+            }
+        )
+    return messages
+
+
+class FakeMoondream:
+    def encode_image(self, image):
+        return image
+
+    def answer_question(self, image, query, tokenizer, max_length=None):
+        time.sleep(CAPTION_SECONDS)
+        return "A screenshot."
+
+
+class FakeEasyOcr:
+    def readtext(self, image):
+        if isinstance(image, str):
+            Image.open(image).load()
+        time.sleep(OCR_SECONDS)
+        return [([], "File Edit View", 0.9)]
+
+
+def fake_vision(descriptions_path):
+    vision = Vision(None)
+    vision.descriptions_path = descriptions_path
+    vision.model = FakeMoondream()
+    vision.tokenizer = object()
+    vision.easyocr = FakeEasyOcr()
+    return vision
+
+
+def one_after_the_other(vision, messages):
+    for message in messages:
+        vision.query(lmc=message)
+        # OCR used to read from a temporary file
+        with tempfile.NamedTemporaryFile(suffix=".png") as file:
+            file.write(base64.b64decode(message["content"]))
+            file.flush()
+            vision.easyocr.readtext(file.name)
+
+
+def describe_all(vision, messages):
+    for message in messages:
+        vision.describe(message)
+
+
+def bench(function, vision, messages):
+    start = time.perf_counter()
+    function(vision, messages)
+    return time.perf_counter() - start
+
+
+if __name__ == "__main__":
+    messages = screenshots()
+    descriptions_path = tempfile.mkdtemp()
+    try:
+        vision = fake_vision(descriptions_path)
+        before = bench(one_after_the_other, vision, messages)
+        cold = bench(describe_all, vision, messages)
+        warm = bench(describe_all, fake_vision(descriptions_path), messages)
+    finally:
+        shutil.rmtree(descriptions_path)
+
+    print(
+        f"{len(messages)} screenshots: "
+        f"one after the other {before * 1000:7.1f}ms  "
+        f"describe() {cold * 1000:7.1f}ms  "
+        f"describe() cached {warm * 1000:6.1f}ms"
+    )
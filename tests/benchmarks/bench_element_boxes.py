@@ -0,0 +1,117 @@
+"""
+Times get_element_boxes, which find_icon runs on every screenshot, against how it used to work:
+PIL's contrast filter, then converting to BGR and back to gray, and outlines kept point by point.
+
+Pass stored screenshots to time them, otherwise made-up 1080p and 4K desktops are used:
+
+python tests/benchmarks/bench_element_boxes.py [screenshot.png ...]
+"""
+
+import os
+import random
+import sys
+import time
+from unittest import mock
+
+import cv2
+import numpy as np
+from PIL import Image, ImageDraw, ImageEnhance
+
+from interpreter.core.computer.display.point.element_boxes import get_element_boxes
+
+REPEATS = 5
+
+
+def desktop(width, height, seed=0):
+    """
+    Windows with title bars, buttons, lines of text and small icons, scaled to the screen.
+    """
+    rng = random.Random(seed)
+    scale = width / 1920
+    image = Image.new("RGB", (width, height), (40, 70, 110))
+    draw = ImageDraw.Draw(image)
+    for _ in range(6):
+        w, h = int(rng.randint(500, 900) * scale), int(rng.randint(300, 600) * scale)
+        x, y = rng.randint(0, width - w), rng.randint(0, height - h)
+        draw.rectangle((x, y, x + w, y + h), fill="white", outline="gray")
+        draw.rectangle((x, y, x + w, y + int(28 * scale)), fill=(225, 225, 225))
+        for i in range(3):
+            cx = x + int((14 + 20 * i) * scale)
+            draw.ellipse(
+                (cx - 6 * scale, y + 8 * scale, cx + 6 * scale, y + 20 * scale),
+                fill=(230, 90, 80),
+            )
+        for row in range(int(40 * scale), h - int(20 * scale), int(22 * scale)):
+            words = " ".join(
+                "".join(rng.choice("abcdefghij") for _ in range(rng.randint(2, 9)))
+                for _ in range(rng.randint(3, 10))
+            )
+            draw.text((x + 12 * scale, y + row), words, fill="black")
+        for i in range(4):
+            bx = x + w - int((90 + 80 * i) * scale)
+            by = y + h - int(40 * scale)
+            draw.rounded_rectangle(
+                (bx, by, bx + 70 * scale, by + 26 * scale),
+                radius=6,
+                fill=(0, 120, 215),
+            )
+    return image
+
+
+def before(image_data):
+    pil_image = image_data.convert("L")
+    contrasted_image = ImageEnhance.Contrast(pil_image).enhance(1.8)
+    contrasted_image_cv = cv2.cvtColor(np.array(contrasted_image), cv2.COLOR_RGB2BGR)
+    gray_contrasted = cv2.cvtColor(contrasted_image_cv, cv2.COLOR_BGR2GRAY)
+    binary_contrasted = cv2.adaptiveThreshold(
+        src=gray_contrasted,
+        maxValue=255,
+        adaptiveMethod=cv2.ADAPTIVE_THRESH_MEAN_C,
+        thresholdType=cv2.THRESH_BINARY_INV,
+        blockSize=11,
+        C=3,
+    )
+    contours_contrasted, _ = cv2.findContours(
+        binary_contrasted, cv2.RETR_LIST, cv2.CHAIN_APPROX_NONE
+    )
+    contour_image = np.zeros_like(binary_contrasted)
+    cv2.drawContours(contour_image, contours_contrasted, -1, (255, 255, 255), 1)
+    boxes = []
+    for contour in contours_contrasted:
+        x, y, w, h = cv2.boundingRect(contour)
+        boxes.append({"x": x, "y": y, "width": w, "height": h})
+    return boxes
+
+
+def bench(function, image, environment=None):
+    with mock.patch.dict(os.environ, environment or {}):
+        function(image)
+        start = time.perf_counter()
+        for _ in range(REPEATS):
+            boxes = function(image)
+    return (time.perf_counter() - start) / REPEATS, boxes
+
+
+if __name__ == "__main__":
+    if sys.argv[1:]:
+        screenshots = [(path, Image.open(path)) for path in sys.argv[1:]]
+    else:
+        screenshots = [("1080p", desktop(1920, 1080)), ("4K", desktop(3840, 2160))]
+
+    for name, image in screenshots:
+        old, old_boxes = bench(before, image)
+        new, new_boxes = bench(lambda image: get_element_boxes(image, False), image)
+        first_pass, first_pass_boxes = bench(
+            lambda image: get_element_boxes(image, False),
+            image,
+            {"OI_POINT_FIRST_PASS_SCALE": "0.5"},
+        )
+        assert sorted(map(repr, old_boxes)) == sorted(map(repr, new_boxes))
+
+        print(
+            f"{name:>6} {len(new_boxes):6d} boxes: "
+            f"before {old * 1000:6.1f}ms  "
+            f"now {new * 1000:6.1f}ms  "
+            f"half-size first pass {first_pass * 1000:6.1f}ms "
+            f"({len(first_pass_boxes)} boxes)"
+        )
@@ -0,0 +1,68 @@
+"""
+Streams a long reply through _respond_and_store and times what each token costs on its way
+from the LLM to whoever is reading the chunks.
+
+The LLM is replaced with a recorded list of deltas and no code is run, so this is only our own overhead.
+
+python tests/benchmarks/bench_streaming_chunks.py
+"""
+
+import random
+import time
+
+from interpreter.core.core import OpenInterpreter
+
+
+def recorded_reply(tokens=20000, seed=0):
+    """
+    A reply the way an LLM streams it: a message, then a code block, a few characters per delta.
+    """
+    random.seed(seed)
+    words = ["the", "data", "column", "process(", "result", "=", "\n", "    ", "1"]
+    reply = []
+    for i in range(tokens):
+        type = "message" if i < tokens // 2 else "code"
+        reply.append((type, random.choice(words) + " "))
+    return reply
+
+
+def stream(interpreter, reply):
+    def run(messages):
+        # Fresh dicts for every delta, like the real LLM runners
+        for type, content in reply:
+            if type == "message":
+                yield {"type": "message", "content": content}
+            else:
+                yield {"type": "code", "format": "python", "content": content}
+
+    interpreter.llm.run = run
+    interpreter.messages = [{"role": "user", "type": "message", "content": "Go"}]
+    interpreter.auto_run = False
+
+    chunks = 0
+    for chunk in interpreter._respond_and_store():
+        if chunk["type"] == "confirmation":
+            # Declined, so nothing is run
+            break
+        chunks += 1
+    return chunks
+
+
+def bench(interpreter, reply, repeat=5):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        chunks = stream(interpreter, reply)
+        best = min(best, time.perf_counter() - start)
+    return best, chunks
+
+
+if __name__ == "__main__":
+    interpreter = OpenInterpreter(conversation_history=False)
+    for tokens in [2000, 20000, 200000]:
+        reply = recorded_reply(tokens)
+        seconds, chunks = bench(interpreter, reply)
+        print(
+            f"{tokens:>7} tokens, {chunks:>7} chunks: "
+            f"{seconds * 1000:8.1f}ms  ({seconds / tokens * 1e6:.2f}µs per token)"
+        )
@@ -0,0 +1,84 @@
+"""
+Replays a long streamed tool call and times how we pull code out of its `arguments`.
+
+Compares re-parsing the accumulated arguments after every delta (merge_deltas + parse_partial_json,
+how run_tool_calling_llm used to work) with StreamingJsonParser, which only reads each delta once.
+
+python tests/benchmarks/bench_tool_call_arguments.py
+"""
+
+import json
+import random
+import time
+
+from interpreter.core.llm.utils.merge_deltas import merge_deltas
+from interpreter.core.llm.utils.parse_partial_json import parse_partial_json
+from interpreter.core.llm.utils.parse_streaming_json import StreamingJsonParser
+
+
+def recorded_stream(lines=300, seed=0):
+    """
+    A tool call the way an LLM streams it: a few characters per delta.
+    """
+    random.seed(seed)
+    code = "\n".join(
+        f'    result_{i} = process(data["column_{i % 7}"], threshold={i * 0.5})  # step {i}'
+        for i in range(lines)
+    )
+    arguments = json.dumps({"language": "python", "code": code})
+
+    deltas = []
+    i = 0
+    while i < len(arguments):
+        size = random.randint(1, 6)
+        deltas.append(arguments[i : i + size])
+        i += size
+    return code, deltas
+
+
+def reparse_everything(deltas):
+    accumulated_deltas = {}
+    code = ""
+    for delta in deltas:
+        accumulated_deltas = merge_deltas(
+            accumulated_deltas, {"function_call": {"arguments": delta}}
+        )
+        arguments = parse_partial_json(accumulated_deltas["function_call"]["arguments"])
+        if arguments and "code" in arguments:
+            code = arguments["code"]
+    return code
+
+
+def parse_incrementally(deltas):
+    parser = StreamingJsonParser()
+    code = []
+    for delta in deltas:
+        for key, text in parser.feed(delta):
+            if key == "code":
+                code.append(text)
+    return "".join(code)
+
+
+def bench(function, deltas, repeat=3):
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = function(deltas)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+if __name__ == "__main__":
+    for lines in [30, 100, 300]:
+        code, deltas = recorded_stream(lines)
+
+        before, before_code = bench(reparse_everything, deltas)
+        after, after_code = bench(parse_incrementally, deltas)
+        assert before_code == after_code == code
+
+        print(
+            f"{lines:>4} lines, {len(deltas):>6} deltas: "
+            f"re-parse {before * 1000:9.1f}ms  "
+            f"incremental {after * 1000:7.1f}ms  "
+            f"({before / after:.0f}x)"
+        )
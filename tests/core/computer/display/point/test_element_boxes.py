@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageEnhance
+
+try:
+    import cv2
+
+    from interpreter.core.computer.display.point import element_boxes
+    from interpreter.core.computer.display.point.element_boxes import (
+        contrast_table,
+        get_element_boxes,
+    )
+except ImportError:
+    cv2 = None
+
+
+def screen():
+    image = Image.new("RGB", (640, 400), "white")
+    draw = ImageDraw.Draw(image)
+    # Two buttons, far apart
+    draw.rectangle((40, 40, 99, 69), outline="black", width=2)
+    draw.rectangle((500, 300, 539, 339), outline="black", width=2)
+    return image
+
+
+@unittest.skipIf(cv2 is None, "OpenCV isn't installed")
+class TestElementBoxes(unittest.TestCase):
+    def boxes(self, **environment):
+        with mock.patch.dict(os.environ, environment):
+            return {
+                (box["x"], box["y"], box["width"], box["height"])
+                for box in get_element_boxes(screen(), False)
+            }
+
+    def test_contrast_matches_pil(self):
+        gray = np.random.default_rng(0).integers(0, 256, (50, 80), dtype=np.uint8)
+
+        for level in (1.8, 0.5, 12.5):
+            expected = ImageEnhance.Contrast(Image.fromarray(gray)).enhance(level)
+            self.assertTrue(
+                (contrast_table(gray, level)[gray] == np.asarray(expected)).all()
+            )
+
+    def test_finds_the_buttons(self):
+        boxes = self.boxes()
+
+        self.assertIn((40, 40, 60, 30), boxes)
+        self.assertIn((500, 300, 40, 40), boxes)
+
+    def test_first_pass_only_looks_around_candidates(self):
+        regions = []
+        find_boxes = element_boxes.find_boxes
+
+        def record(gray, region, *args, **kwargs):
+            if gray.shape == (400, 640):
+                regions.append(region)
+            return find_boxes(gray, region, *args, **kwargs)
+
+        with mock.patch.object(element_boxes, "find_boxes", side_effect=record):
+            boxes = self.boxes(OI_POINT_FIRST_PASS_SCALE="0.5")
+
+        self.assertEqual(boxes, self.boxes())
+        # One region around each button, not the whole screen
+        self.assertEqual(len(regions), 2)
+        self.assertLess(sum(w * h for x, y, w, h in regions), 640 * 400 / 10)
+
+    def test_permutation_keeps_one_variants_boxes(self):
+        variant = dict(element_boxes.DEFAULT_VARIANT, threshold_type=cv2.THRESH_BINARY)
+
+        with (
+            mock.patch.object(
+                element_boxes, "random_variant", return_value=variant
+            ) as random_variant,
+            mock.patch("builtins.print"),
+        ):
+            boxes = self.boxes(OI_POINT_PERMUTATE="True")
+
+        self.assertEqual(random_variant.call_count, 1)
+        with mock.patch.object(element_boxes, "DEFAULT_VARIANT", variant):
+            self.assertEqual(boxes, self.boxes())
+        self.assertNotEqual(boxes, self.boxes())
+
+    def test_debug_permutation_keeps_the_last_variants_boxes(self):
+        variants = [dict(element_boxes.DEFAULT_VARIANT, C=c) for c in range(10)]
+
+        with (
+            tempfile.TemporaryDirectory() as home,
+            mock.patch.dict(os.environ, HOME=home, OI_POINT_PERMUTATE="True"),
+            mock.patch.object(element_boxes, "random_variant", side_effect=variants),
+            mock.patch.object(
+                element_boxes,
+                "find_boxes",
+                side_effect=lambda gray, region, variant, *args: [
+                    (variant["C"], 0, 1, 1)
+                ],
+            ) as find_boxes,
+            mock.patch("builtins.print"),
+        ):
+            boxes = get_element_boxes(screen(), True)
+
+        self.assertEqual(find_boxes.call_count, 10)
+        self.assertEqual(boxes, [{"x": 9, "y": 0, "width": 1, "height": 1}])
+
+
+if __name__ == "__main__":
+    unittest.main()
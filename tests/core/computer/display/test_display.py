@@ -0,0 +1,107 @@
+import unittest
+from unittest import mock
+
+from PIL import Image, ImageDraw
+
+from interpreter.core.computer.display import display as module
+from interpreter.core.computer.display.display import Display
+
+
+def screen(dialog=None):
+    image = Image.new("RGB", (400, 300), "white")
+    if dialog:
+        ImageDraw.Draw(image).rectangle(dialog, fill="gray")
+    return image
+
+
+class TestScreenshotChanges(unittest.TestCase):
+    def setUp(self):
+        computer = mock.Mock()
+        computer.skip_unchanged_screenshots = True
+        computer.crop_screenshots_to_changes = False
+        self.display = Display(computer)
+
+        self.screens = []
+        patcher = mock.patch.object(
+            module,
+            "take_screenshot_to_pil",
+            side_effect=lambda **kwargs: self.screens.pop(0),
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def view(self, **kwargs):
+        """
+        Returns the images that were displayed, and what was printed.
+        """
+        with mock.patch.object(module, "display") as display:
+            with mock.patch("builtins.print") as print:
+                self.display.view(active_app_only=False, **kwargs)
+        shown = [call.args[0] for call in display.call_args_list]
+        printed = " ".join(str(call.args[0]) for call in print.call_args_list)
+        return shown, printed
+
+    def test_unchanged_screen_is_skipped(self):
+        self.screens = [screen(), screen(), screen()]
+
+        shown, _ = self.view()
+        self.assertEqual(len(shown), 1)
+
+        shown, note = self.view()
+        self.assertEqual(shown, [])
+        self.assertIn("hasn't changed", note)
+
+        # Unless asked for anyway
+        shown, _ = self.view(only_changes=False)
+        self.assertEqual(shown[0].size, (400, 300))
+
+    def test_forgotten_screenshot_isnt_compared_to(self):
+        self.screens = [screen(), screen()]
+
+        self.view()
+        self.display.forget_last_screenshot()
+        shown, _ = self.view()
+
+        self.assertEqual(shown[0].size, (400, 300))
+
+    def test_nothing_is_skipped_unless_turned_on(self):
+        self.display.computer.skip_unchanged_screenshots = False
+        self.screens = [screen(), screen()]
+
+        self.view()
+        shown, _ = self.view()
+
+        self.assertEqual(len(shown), 1)
+
+    def test_changed_screen_is_shown_whole(self):
+        self.screens = [screen(), screen((100, 100, 150, 130))]
+
+        self.view()
+        shown, _ = self.view()
+
+        self.assertEqual(shown[0].size, (400, 300))
+
+    def test_crops_to_the_changes(self):
+        self.display.computer.crop_screenshots_to_changes = True
+        self.screens = [screen(), screen((100, 100, 149, 129))]
+
+        self.view()
+        shown, note = self.view()
+
+        # The dialog, plus the margin around it
+        margin = module.CROP_MARGIN
+        self.assertEqual(shown[0].size, (50 + 2 * margin, 30 + 2 * margin))
+        self.assertIn(f"({100 - margin}, {100 - margin})", note)
+
+    def test_big_changes_are_shown_whole(self):
+        self.display.computer.crop_screenshots_to_changes = True
+        self.screens = [screen(), screen((0, 0, 399, 250))]
+
+        self.view()
+        shown, _ = self.view()
+
+        self.assertEqual(shown[0].size, (400, 300))
+
+
+if __name__ == "__main__":
+    unittest.main()
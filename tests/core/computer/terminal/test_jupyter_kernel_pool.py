@@ -0,0 +1,142 @@
+import os
+import time
+import unittest
+from unittest import mock
+
+from interpreter.core.computer.terminal.languages import jupyter_kernel_pool
+from interpreter.core.computer.terminal.languages.jupyter_kernel_pool import KernelPool
+from interpreter.core.computer.terminal.terminal import Terminal
+from interpreter.core.core import OpenInterpreter
+
+
+def run_in_kernel(kernel, code):
+    outputs = []
+    kernel.kc.execute_interactive(
+        code,
+        timeout=30,
+        output_hook=lambda msg: outputs.append(msg["content"].get("text", "")),
+    )
+    return "".join(outputs)
+
+
+class TestKernelPool(unittest.TestCase):
+    def setUp(self):
+        self.computer = mock.Mock(import_computer_api=False, debug=False)
+        self.pool = KernelPool(self.computer, size=1)
+        self.kernels = []
+
+    def tearDown(self):
+        self.pool.shutdown()
+        for kernel in self.kernels:
+            kernel.shutdown()
+
+    def test_kernels_are_bootstrapped_and_ready(self):
+        self.pool.fill()
+        # Give the background start time to finish
+        deadline = time.time() + 60
+        while self.pool._ready.qsize() == 0 and time.time() < deadline:
+            time.sleep(0.1)
+
+        start = time.time()
+        kernel = self.pool.get()
+        self.kernels.append(kernel)
+        self.assertLess(time.time() - start, 0.5)
+
+        self.assertEqual(
+            run_in_kernel(kernel, "print(plt.__name__)"), "matplotlib.pyplot\n"
+        )
+        self.assertFalse(kernel.has_computer_api)
+
+    def test_nothing_starts_until_a_kernel_is_taken(self):
+        terminal = Terminal(self.computer)
+        self.addCleanup(terminal.kernel_pool.shutdown)
+
+        self.assertFalse(terminal.kernel_pool.used)
+        self.assertEqual(terminal.kernel_pool._starting, 0)
+        self.assertEqual(terminal.kernel_pool._ready.qsize(), 0)
+
+    def test_kernels_get_the_terminals_output_directory(self):
+        terminal = Terminal(self.computer)
+        self.addCleanup(terminal.kernel_pool.shutdown)
+        self.addCleanup(terminal.output_store.cleanup)
+        kernel = terminal.kernel_pool.get()
+        self.kernels.append(kernel)
+
+        self.assertEqual(
+            run_in_kernel(
+                kernel, "import os; print(os.environ['INTERPRETER_OUTPUT_DIR'])"
+            ),
+            terminal.output_store.directory + "\n",
+        )
+        self.assertNotEqual(
+            os.environ.get("INTERPRETER_OUTPUT_DIR"), terminal.output_store.directory
+        )
+
+    def test_kernels_start_one_at_a_time(self):
+        running = []
+        overlapped = []
+
+        def start_kernel(**kwargs):
+            running.append(1)
+            overlapped.append(len(running) > 1)
+            time.sleep(0.05)
+            running.pop()
+            raise RuntimeError("Not really starting one")
+
+        pool = KernelPool(self.computer, size=4)
+        with mock.patch.object(
+            jupyter_kernel_pool, "KernelManager", side_effect=start_kernel
+        ):
+            pool.fill()
+            deadline = time.time() + 10
+            while pool._starting and time.time() < deadline:
+                time.sleep(0.01)
+
+        self.assertEqual(len(overlapped), 4)
+        self.assertFalse(any(overlapped))
+
+    def test_first_get_takes_the_prewarmed_kernel(self):
+        kernel = jupyter_kernel_pool.PooledKernel(mock.Mock(), mock.Mock())
+        with mock.patch.object(
+            self.pool, "_start_kernel", return_value=kernel
+        ) as start_kernel:
+            self.pool.fill()
+            deadline = time.time() + 10
+            while self.pool._ready.qsize() == 0 and time.time() < deadline:
+                time.sleep(0.01)
+
+            self.assertEqual(start_kernel.call_count, 1)
+            self.assertIs(self.pool.get(), kernel)
+
+            # get() refills the pool behind it
+            deadline = time.time() + 10
+            while self.pool._ready.qsize() == 0 and time.time() < deadline:
+                time.sleep(0.01)
+            self.assertEqual(start_kernel.call_count, 2)
+            self.pool._ready.get_nowait()
+
+    def test_chat_starts_a_kernel_ahead_of_time(self):
+        interpreter = OpenInterpreter()
+        self.addCleanup(interpreter.computer.terminal.kernel_pool.shutdown)
+        self.addCleanup(interpreter.computer.terminal.output_store.cleanup)
+
+        with mock.patch.object(
+            interpreter.computer.terminal.kernel_pool, "fill"
+        ) as fill, mock.patch.object(
+            interpreter, "_streaming_chat", return_value=iter([])
+        ):
+            interpreter.chat("Hi", display=False)
+
+        fill.assert_called_once_with()
+
+    def test_taking_a_kernel_refills_the_pool(self):
+        self.kernels.append(self.pool.get())
+
+        deadline = time.time() + 60
+        while self.pool._ready.qsize() == 0 and time.time() < deadline:
+            time.sleep(0.1)
+        self.assertEqual(self.pool._ready.qsize(), 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,71 @@
+import statistics
+import time
+import unittest
+from types import SimpleNamespace
+
+from interpreter.core.computer.terminal.languages.jupyter_kernel_pool import KernelPool
+from interpreter.core.computer.terminal.languages.python import Python
+
+
+class TestJupyterLanguage(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        computer = SimpleNamespace(
+            import_computer_api=False,
+            debug=False,
+            interpreter=SimpleNamespace(),
+            _has_imported_computer_api=False,
+        )
+        computer.terminal = SimpleNamespace(kernel_pool=KernelPool(computer, size=0))
+        cls.python = Python(computer)
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.python.terminate()
+
+    def run_code(self, code):
+        return [c for c in self.python.run(code) if c["format"] != "active_line"]
+
+    def test_output(self):
+        output = self.run_code("for i in range(3):\n    print(i)")
+
+        self.assertEqual("".join(c["content"] for c in output), "0\n1\n2\n")
+
+    def test_trivial_cell_latency(self):
+        self.run_code("1")  # Warm up
+
+        timings = []
+        for _ in range(10):
+            start = time.perf_counter()
+            self.run_code("print(1)")
+            timings.append(time.perf_counter() - start)
+
+        # Most of this is the kernel itself. It used to be at least 200ms of polling
+        self.assertLess(statistics.median(timings), 0.05)
+
+    def test_active_line_is_sampled(self):
+        code = "import time\n\ndef wait():\n    time.sleep(0.5)\n\nfor i in range(1_000_000):\n    pass\nwait()"
+        chunks = list(self.python.run(code))
+
+        active_lines = [c["content"] for c in chunks if c["format"] == "active_line"]
+        # The line inside the function the cell called, in the cell's own numbering
+        self.assertEqual(active_lines[-1], 4)
+        # Changes are reported, not every time a line runs
+        self.assertLess(len(active_lines), 20)
+        self.assertEqual(len(active_lines), len(set(active_lines)))
+
+    def test_next_run_after_stopping_early(self):
+        for code in ["10+12", "import time; time.sleep(30)"]:
+            run = self.python.run(code)
+            next(run, None)
+            self.python.stop()
+            run.close()
+
+            start = time.perf_counter()
+            output = self.run_code("10+12")
+            self.assertEqual([c["content"] for c in output], ["22"])
+            self.assertLess(time.perf_counter() - start, 5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,110 @@
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from interpreter.core.computer.terminal.output_store import OutputStore
+
+
+class TestOutputStore(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.store = OutputStore(self.directory.name)
+
+    def tearDown(self):
+        self.store.cleanup()
+        self.directory.cleanup()
+
+    def test_pages_through_lines(self):
+        output_id = self.store.create()
+        for i in range(1000):
+            self.store.append(output_id, f"line {i}\n")
+
+        self.assertEqual(self.store.read(output_id, 0, 2), "line 0\nline 1\n")
+        self.assertEqual(self.store.read(output_id, 500, 501), "line 500\n")
+        self.assertEqual(self.store.read(output_id, -1), "line 999\n")
+        self.assertEqual(self.store.line_count(output_id), 1000)
+
+        # It grows as more is appended
+        self.store.append(output_id, "no newline")
+        self.assertEqual(self.store.read(output_id, -2), "line 999\nno newline")
+
+    def test_empty_and_missing_outputs(self):
+        output_id = self.store.create()
+        self.assertEqual(self.store.read(output_id), "")
+        with self.assertRaises(ValueError):
+            self.store.read("nope")
+
+    def test_ids_cant_escape_the_directory(self):
+        with self.assertRaises(ValueError):
+            self.store.read("../" + os.path.basename(self.directory.name))
+
+    def test_grep(self):
+        first = self.store.create()
+        self.store.append(first, "ok\nerror: one\nok\n")
+        self.store.finish()
+        second = self.store.create()
+        self.store.append(second, "héllo\nerror: two\n")
+
+        self.assertEqual(
+            self.store.grep("^error"),
+            [(first, 1, "error: one"), (second, 1, "error: two")],
+        )
+        self.assertEqual(self.store.grep("error", second), [(second, 1, "error: two")])
+        self.assertEqual(len(self.store.grep("ok|error", max_matches=2)), 2)
+
+    def test_last_output_is_shared_through_the_directory(self):
+        self.assertIsNone(self.store.last_output_id())
+        output_id = self.store.create()
+        self.store.append(output_id, "done\n")
+        # Not finished yet
+        self.assertIsNone(self.store.last_output_id())
+        self.store.finish()
+
+        # Like the computer API inside a kernel would see it
+        other = OutputStore(self.directory.name)
+        self.assertEqual(other.last_output_id(), output_id)
+        self.assertEqual(other.read(output_id), "done\n")
+
+    def test_each_store_has_its_own_directory(self):
+        with mock.patch.dict(os.environ):
+            os.environ.pop("INTERPRETER_OUTPUT_DIR", None)
+            first, second = OutputStore(), OutputStore()
+            self.addCleanup(first.cleanup)
+            self.addCleanup(second.cleanup)
+            self.assertNotIn("INTERPRETER_OUTPUT_DIR", os.environ)
+
+        self.assertNotEqual(first.directory, second.directory)
+        output_id = first.create()
+        first.append(output_id, "first\n")
+        first.finish()
+        self.assertIsNone(second.last_output_id())
+
+    def test_only_the_latest_outputs_are_kept(self):
+        self.store.max_outputs = 3
+        output_ids = []
+        for i in range(5):
+            output_id = self.store.create()
+            self.store.append(output_id, f"{i}\n")
+            self.store.finish()
+            output_ids.append(output_id)
+
+        self.assertEqual(self.store.output_ids(), output_ids[-3:])
+        with self.assertRaises(ValueError):
+            self.store.read(output_ids[0])
+        self.assertEqual(self.store.read(output_ids[-1]), "4\n")
+
+    def test_clear(self):
+        output_id = self.store.create()
+        self.store.append(output_id, "old\n")
+        self.store.finish()
+        self.store.create()
+
+        self.store.clear()
+        self.assertEqual(self.store.output_ids(), [])
+        self.assertIsNone(self.store.last_output_id())
+        self.assertEqual(self.store.grep("old"), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
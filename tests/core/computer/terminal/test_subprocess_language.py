@@ -0,0 +1,115 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+from interpreter.core.computer.terminal.languages.shell import Shell
+from interpreter.core.computer.terminal.languages.subprocess_language import (
+    collapse_carriage_returns,
+)
+
+
+class TestSubprocessLanguage(unittest.TestCase):
+    def setUp(self):
+        # The shell loads ~/.bashrc, so give it one we know
+        self.home = tempfile.TemporaryDirectory()
+        self.addCleanup(self.home.cleanup)
+        environment = mock.patch.dict(
+            os.environ, {"HOME": self.home.name, "SHELL": "bash"}
+        )
+        environment.start()
+        self.addCleanup(environment.stop)
+        self.shell = Shell()
+
+    def tearDown(self):
+        self.shell.terminate()
+
+    def run_code(self, code):
+        output = self.shell.run(code)
+        return "".join(c["content"] for c in output if c["format"] == "output")
+
+    def test_waits_for_stdout_and_stderr(self):
+        output = self.run_code("echo out\necho err >&2\necho out2")
+
+        self.assertIn("out\n", output)
+        self.assertIn("err\n", output)
+        self.assertIn("out2\n", output)
+
+    def test_stdout_and_stderr_stay_in_order(self):
+        output = self.run_code("echo 1\necho 2 >&2\necho 3\necho 4 >&2")
+
+        self.assertEqual(output, "1\n2\n3\n4\n")
+
+    def test_active_line_in_multiline_commands(self):
+        code = "for i in 1 2; do\n  echo $i\ndone\nsleep 0.2"
+        chunks = list(self.shell.run(code))
+
+        output = "".join(c["content"] for c in chunks if c["format"] == "output")
+        active_lines = [c["content"] for c in chunks if c["format"] == "active_line"]
+        # Nothing is added to the output to carry the line
+        self.assertEqual(output, "1\n2\n")
+        self.assertEqual(active_lines[-1], 4)
+
+    def test_each_run_reports_its_lines(self):
+        active_lines = lambda code: [
+            c["content"] for c in self.shell.run(code) if c["format"] == "active_line"
+        ]
+
+        self.assertEqual(active_lines("cd /tmp; pwd"), [1])
+        # Ends on the same line the last run did
+        self.assertEqual(active_lines("pwd"), [1])
+
+    def test_restarts_after_exit(self):
+        # The shell can still be exiting when the next run starts, so try that a few times
+        for _ in range(20):
+            self.run_code("exit 3")
+
+            self.assertEqual(self.run_code("echo back"), "back\n")
+
+    def test_loads_the_users_bashrc(self):
+        with open(os.path.join(self.home.name, ".bashrc"), "w") as file:
+            file.write("alias hello='echo hi'\nexport FROM_RC=yes\necho noise\n")
+
+        self.assertEqual(self.run_code("hello\necho $FROM_RC"), "hi\nyes\n")
+
+    def test_commands_dont_wait_for_stdin(self):
+        self.assertEqual(self.run_code("cat\nread line\necho done"), "done\n")
+
+    def test_other_shells_get_the_code_piped_in(self):
+        with mock.patch.dict(os.environ, {"SHELL": "/usr/bin/zsh"}):
+            shell = Shell()
+
+        self.assertIsNone(shell.bash)
+        self.assertEqual(shell.start_cmd, ["/usr/bin/zsh"])
+
+    def test_progress_updates_are_batched(self):
+        code = "for i in $(seq 1 2000); do printf '\\r%d%%' $i; done; echo\necho after"
+        chunks = [c for c in self.shell.run(code) if c["format"] == "output"]
+
+        output = "".join(c["content"] for c in chunks)
+        self.assertTrue(output.endswith("\r2000%\nafter\n"))
+        # Only the last state of each batch is kept
+        self.assertLess(len(chunks), 50)
+        self.assertLess(output.count("\r"), 50)
+
+    def test_collapse_carriage_returns(self):
+        self.assertEqual(
+            collapse_carriage_returns("1%\r2%\r3%\ndone\n"), "\r3%\ndone\n"
+        )
+        self.assertEqual(collapse_carriage_returns("a\r\nb\r\n"), "a\nb\n")
+        self.assertEqual(collapse_carriage_returns("no redraws\n"), "no redraws\n")
+
+    def test_no_fixed_overhead(self):
+        self.run_code("true")  # Warm up
+
+        start = time.perf_counter()
+        for _ in range(5):
+            self.assertIn("hi", self.run_code("echo hi"))
+
+        # This used to cost at least 0.7s per command
+        self.assertLess((time.perf_counter() - start) / 5, 0.1)
+
+
+if __name__ == "__main__":
+    unittest.main()
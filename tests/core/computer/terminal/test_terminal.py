@@ -0,0 +1,46 @@
+import unittest
+from unittest import mock
+
+from interpreter.core.computer.terminal.terminal import Terminal
+
+
+class TestRunConcurrently(unittest.TestCase):
+    def setUp(self):
+        self.terminal = Terminal(mock.Mock(import_computer_api=False, debug=False))
+        self.addCleanup(self.terminal.kernel_pool.shutdown)
+        self.addCleanup(self.terminal.output_store.cleanup)
+        self.terminal.run = mock.Mock(
+            side_effect=lambda language, code, **kwargs: iter(
+                [{"type": "console", "format": "output", "content": f"ran {code}"}]
+            )
+        )
+        self.terminal.stop = mock.Mock()
+        self.calls = [("call_1", "python", "a()"), ("call_2", "shell", "b")]
+
+    def test_tags_output_with_its_call(self):
+        chunks = list(self.terminal.run_concurrently(self.calls))
+
+        self.assertEqual(
+            sorted((c["tool_call_id"], c["content"]) for c in chunks),
+            [("call_1", "ran a()"), ("call_2", "ran b")],
+        )
+        self.terminal.stop.assert_not_called()
+
+    def test_stops_the_calls_when_closed_early(self):
+        chunks = self.terminal.run_concurrently(self.calls)
+        next(chunks)
+        chunks.close()
+
+        self.terminal.stop.assert_called_once_with()
+
+    def test_stops_the_calls_when_interrupted(self):
+        chunks = self.terminal.run_concurrently(self.calls)
+        next(chunks)
+
+        with self.assertRaises(KeyboardInterrupt):
+            chunks.throw(KeyboardInterrupt)
+        self.terminal.stop.assert_called_once_with()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,98 @@
+import unittest
+from collections import OrderedDict
+from unittest import mock
+
+from PIL import Image
+
+from interpreter.core.computer.utils import computer_vision, ocr_engine
+from interpreter.core.computer.utils.computer_vision import (
+    find_text_in_image,
+    pytesseract_get_text,
+    pytesseract_get_text_bounding_boxes,
+    pytesseract_get_text_table,
+)
+
+# What Tesseract finds: a page, then "File Edit" on one line and "Save as" on the next
+BOXES = [
+    # level, block, par, line, word, left, top, width, height, conf, text
+    (1, 0, 0, 0, 0, 0, 0, 400, 300, -1, ""),
+    (5, 1, 1, 1, 1, 10, 10, 40, 20, 95, "File"),
+    (5, 1, 1, 1, 2, 60, 10, 40, 20, 93, "Edit"),
+    (5, 1, 1, 2, 1, 10, 50, 40, 20, 90, "Save"),
+    (5, 1, 1, 2, 2, 60, 50, 20, 20, 91, "as"),
+]
+
+
+def image_to_data(image, output_type=None):
+    columns = computer_vision.OCR_COLUMNS + ("conf", "text")
+    return {column: [box[i] for box in BOXES] for i, column in enumerate(columns)}
+
+
+class TestOcrTable(unittest.TestCase):
+    def setUp(self):
+        self.pytesseract = mock.Mock()
+        self.pytesseract.image_to_data.side_effect = image_to_data
+        patcher = mock.patch.object(
+            ocr_engine.ocr_worker, "pytesseract", self.pytesseract
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = mock.patch.object(computer_vision, "_ocr_tables", OrderedDict())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.screenshot = Image.new("RGB", (400, 300), "white")
+
+    def test_one_pass_per_screenshot(self):
+        self.assertEqual(
+            find_text_in_image(self.screenshot, "edit"), [(80 / 400, 20 / 300)]
+        )
+        boxes = pytesseract_get_text_bounding_boxes(self.screenshot)
+        text = pytesseract_get_text(self.screenshot)
+
+        self.assertEqual(
+            boxes[1], {"text": "File", "top": 10, "left": 10, "width": 40, "height": 20}
+        )
+        self.assertEqual(text, "File Edit\nSave as")
+        self.assertEqual(self.pytesseract.image_to_data.call_count, 1)
+
+        # The same pixels in a new screenshot are read from the cache too
+        pytesseract_get_text(Image.new("RGB", (400, 300), "white"))
+        self.assertEqual(self.pytesseract.image_to_data.call_count, 1)
+
+        pytesseract_get_text(Image.new("RGB", (400, 300), "black"))
+        self.assertEqual(self.pytesseract.image_to_data.call_count, 2)
+
+    def test_regions_are_read_separately(self):
+        table = pytesseract_get_text_table(self.screenshot, region=(100, 200, 50, 50))
+
+        image = self.pytesseract.image_to_data.call_args[0][0]
+        self.assertEqual(image.shape, (50, 50))
+        # Boxes are placed back in the screenshot
+        self.assertEqual(table["left"][1], 110)
+        self.assertEqual(table["top"][1], 210)
+
+        pytesseract_get_text_table(self.screenshot)
+        self.assertEqual(self.pytesseract.image_to_data.call_count, 2)
+
+    def test_cached_tables_cant_be_changed(self):
+        table = pytesseract_get_text_table(self.screenshot)
+
+        with self.assertRaises(ValueError):
+            table["left"][1] = 0
+
+    def test_finds_part_of_a_box(self):
+        # "av" is the middle half of "Save"
+        self.assertEqual(
+            find_text_in_image(self.screenshot, "av"), [(30 / 400, 60 / 300)]
+        )
+
+    def test_finds_words_near_each_other(self):
+        centers = find_text_in_image(self.screenshot, "File as")
+
+        self.assertEqual(len(centers), 1)
+        self.pytesseract.image_to_data.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,139 @@
+import unittest
+from unittest import mock
+
+import numpy as np
+
+from interpreter.core.computer.utils import ocr_engine
+from interpreter.core.computer.utils.ocr_engine import (
+    TILE_OVERLAP,
+    image_to_data,
+    make_tiles,
+    merge_tiles,
+)
+
+
+def tesseract_data(words):
+    """
+    image_to_data's output for some (text, left, top, width, height) words, all on one line.
+    """
+    d = {column: [] for column in ocr_engine.COLUMNS}
+    for i, (text, left, top, width, height) in enumerate(words):
+        row = (5, 1, 1, 1, 1, i + 1, left, top, width, height, 90, text)
+        for column, value in zip(ocr_engine.COLUMNS, row):
+            d[column].append(value)
+    return d
+
+
+class FakeScreen:
+    """
+    Stands in for Tesseract on a screen with some words on it: a tile reads the words
+    inside it, and the parts of words its edges cut through.
+    """
+
+    def __init__(self, words):
+        self.words = words
+
+    def read(self, tiles):
+        results = []
+        for (left, top, right, bottom), core in tiles:
+            found = []
+            for text, x, y, width, height in self.words:
+                x0, x1 = max(x, left), min(x + width, right)
+                y0, y1 = max(y, top), min(y + height, bottom)
+                if x0 < x1 and y0 < y1:
+                    found.append((text, x0 - left, y0 - top, x1 - x0, y1 - y0))
+            results.append(tesseract_data(found))
+        return results
+
+
+class TestOcrEngine(unittest.TestCase):
+    def test_tiles_cover_the_image(self):
+        tiles = make_tiles(3840, 2160)
+
+        self.assertEqual(len(tiles), 6)
+        coverage = np.zeros((2160, 3840), dtype=int)
+        for tile, (left, top, right, bottom) in tiles:
+            coverage[top:bottom, left:right] += 1
+        self.assertTrue((coverage == 1).all())
+
+        # Tiles reach past their cores, but not past the image
+        (left, top, right, bottom), core = tiles[1]
+        self.assertEqual((left, top), (core[0] - TILE_OVERLAP, 0))
+
+    def test_small_images_arent_tiled(self):
+        self.assertEqual(make_tiles(1280, 800), [((0, 0, 1280, 800),) * 2])
+
+    def test_words_at_seams_are_kept_once(self):
+        tiles = make_tiles(3840, 2160)
+        seam = tiles[0][1][2]
+        screen = FakeScreen(
+            [
+                # Cut by the first tile's edge
+                ("Cut", seam + TILE_OVERLAP - 20, 100, 60, 20),
+                # Read whole by both tiles
+                ("Seam", seam - 30, 120, 60, 20),
+                ("Near", seam - 100, 140, 60, 20),
+                ("Far", 100, 100, 60, 20),
+                ("Below", seam + 500, 1075, 60, 20),
+            ]
+        )
+
+        d = merge_tiles(tiles, screen.read(tiles), 3840, 2160)
+
+        self.assertEqual(d["text"], ["Far", "Cut", "Seam", "Near", "Below"])
+        # Whole, and where they are on the screen
+        self.assertEqual(
+            d["left"][1:4], [seam + TILE_OVERLAP - 20, seam - 30, seam - 100]
+        )
+        self.assertEqual(d["width"][1:4], [60, 60, 60])
+        self.assertEqual(d["top"][4], 1075)
+
+    def test_words_are_put_back_in_lines(self):
+        tiles = make_tiles(3840, 2160)
+        seam = tiles[0][1][2]
+        screen = FakeScreen(
+            [
+                ("Save", seam + 200, 100, 60, 20),
+                ("File", 100, 102, 60, 20),
+                ("Help", 100, 300, 60, 20),
+            ]
+        )
+
+        d = merge_tiles(tiles, screen.read(tiles), 3840, 2160)
+
+        self.assertEqual(d["text"], ["File", "Save", "Help"])
+        self.assertEqual(d["line_num"], [1, 1, 2])
+        self.assertEqual(d["word_num"], [1, 2, 1])
+
+    def test_big_images_are_read_in_tiles(self):
+        pixels = np.zeros((2160, 3840), dtype=np.uint8)
+        screen = FakeScreen([("Hello", 3000, 2000, 80, 20)])
+        tiles = make_tiles(3840, 2160)
+
+        with mock.patch.object(
+            ocr_engine, "_submit", side_effect=lambda images: screen.read(tiles)
+        ) as submit:
+            d = image_to_data(pixels)
+
+        images = submit.call_args[0][0]
+        self.assertEqual(len(images), 6)
+        self.assertEqual(images[5].shape, (1080 + TILE_OVERLAP, 1280 + TILE_OVERLAP))
+        self.assertEqual(d["text"], ["Hello"])
+        self.assertEqual(d["left"], [3000])
+
+    def test_workers_dont_import_the_interpreter(self):
+        with mock.patch.object(ocr_engine, "_pool", None):
+            ocr_engine._submit([])
+            pool = ocr_engine._pool
+        self.addCleanup(pool.shutdown)
+
+        modules = pool.submit(
+            eval,
+            "[name for name in __import__('sys').modules if 'interpreter' in name]",
+        ).result(timeout=60)
+
+        self.assertEqual(modules, [ocr_engine.WORKER_MODULE])
+
+
+if __name__ == "__main__":
+    unittest.main()
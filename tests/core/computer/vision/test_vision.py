@@ -0,0 +1,84 @@
+import base64
+import io
+import shutil
+import tempfile
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+from PIL import Image
+
+from interpreter.core.computer.vision.vision import Vision
+
+
+def screenshot(color="white"):
+    buffered = io.BytesIO()
+    Image.new("RGB", (8, 8), color).save(buffered, format="png")
+    return {
+        "role": "computer",
+        "type": "image",
+        "format": "base64.png",
+        "content": base64.b64encode(buffered.getvalue()).decode(),
+    }
+
+
+class TestVision(unittest.TestCase):
+    def setUp(self):
+        self.descriptions_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.descriptions_path)
+        self.vision = self.loaded_vision()
+
+    def loaded_vision(self):
+        # Stand-ins for Moondream and EasyOCR
+        vision = Vision(mock.Mock())
+        vision.descriptions_path = self.descriptions_path
+        vision.model = mock.Mock()
+        vision.model.answer_question.return_value = "A white square."
+        vision.tokenizer = mock.Mock()
+        vision.easyocr = mock.Mock()
+        vision.easyocr.readtext.return_value = [([], "Hello", 0.9)]
+        return vision
+
+    def test_ocr_reads_images_from_memory(self):
+        self.assertEqual(self.vision.ocr(lmc=screenshot()), "Hello")
+
+        image = self.vision.easyocr.readtext.call_args[0][0]
+        self.assertIsInstance(image, np.ndarray)
+        self.assertEqual(image.shape, (8, 8, 3))
+
+    def test_describe_caption_and_ocr_run_at_once(self):
+        ocr_started = threading.Event()
+
+        def readtext(image):
+            ocr_started.set()
+            return [([], "Hello", 0.9)]
+
+        def answer_question(*args, **kwargs):
+            # Only returns in time if OCR is running alongside
+            self.assertTrue(ocr_started.wait(5))
+            return "A white square."
+
+        self.vision.easyocr.readtext.side_effect = readtext
+        self.vision.model.answer_question.side_effect = answer_question
+
+        self.assertEqual(
+            self.vision.describe(screenshot()), ("A white square.", "Hello")
+        )
+
+    def test_descriptions_are_cached_between_sessions(self):
+        self.vision.describe(screenshot())
+
+        later = self.loaded_vision()
+        self.assertEqual(later.describe(screenshot()), ("A white square.", "Hello"))
+        later.model.answer_question.assert_not_called()
+        later.easyocr.readtext.assert_not_called()
+
+        # A different image, or a different renderer, is described again
+        later.describe(screenshot("black"))
+        later.describe(screenshot(), renderer=lambda lmc: "Custom.")
+        self.assertEqual(later.easyocr.readtext.call_count, 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,187 @@
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+import interpreter
+from interpreter.core.computer.vision import vision_worker
+from interpreter.core.computer.vision.vision_worker import (
+    VisionWorker,
+    image_request,
+)
+
+
+class FakeMoondream:
+    def __init__(self):
+        self.batches = []
+
+    def vision_encoder(self, images):
+        self.batches.append(len(images))
+        return [f"embedding of {image.getpixel((0, 0))}" for image in images]
+
+    def answer_question(self, embedding, question, tokenizer, max_length=None):
+        return f"{question} {embedding[0]}"
+
+
+class TestVisionWorker(unittest.TestCase):
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.address = os.path.join(directory, "worker.sock")
+
+        self.model = FakeMoondream()
+        self.easyocr = mock.Mock()
+        self.easyocr.readtext.return_value = [([], "Hello", 0.9)]
+        self.worker = VisionWorker(
+            self.address,
+            authkey=b"secret",
+            idle_timeout=0.5,
+            load_models=lambda: (self.model, None, self.easyocr),
+        )
+        self.thread = threading.Thread(target=self.worker.serve, daemon=True)
+        self.thread.start()
+        self.addCleanup(self.thread.join, 5)
+        while not os.path.exists(self.address):
+            time.sleep(0.01)
+
+    def request(self, request):
+        with mock.patch.object(vision_worker, "start_worker") as start_worker:
+            result = vision_worker.request(
+                request, address=self.address, authkey=b"secret"
+            )
+        # It was already running
+        start_worker.assert_not_called()
+        return result
+
+    def test_query_and_ocr(self):
+        image = Image.new("RGB", (4, 4), "white")
+
+        self.assertEqual(
+            self.request(image_request("query", image, question="What?")),
+            "What? embedding of (255, 255, 255)",
+        )
+        self.assertEqual(self.request(image_request("ocr", image)), "Hello")
+
+    def test_palette_images_keep_their_colors(self):
+        image = Image.new("RGB", (4, 4), (200, 30, 10)).quantize(colors=2)
+        self.assertEqual(image.mode, "P")
+
+        self.assertEqual(
+            self.request(image_request("query", image, question="What?")),
+            "What? embedding of (200, 30, 10)",
+        )
+
+        image.info["transparency"] = 0
+        self.assertEqual(
+            self.request(image_request("query", image, question="What?")),
+            "What? embedding of (200, 30, 10, 0)",
+        )
+
+    def test_concurrent_requests_are_encoded_together(self):
+        images = [Image.new("RGB", (4, 4), (i, i, i)) for i in range(4)]
+        results = {}
+        barrier = threading.Barrier(len(images))
+
+        def ask(i):
+            barrier.wait()
+            results[i] = self.request(image_request("query", images[i], question="?"))
+
+        threads = [threading.Thread(target=ask, args=(i,)) for i in range(4)]
+        # Long enough for the requests to arrive together on a busy machine
+        with mock.patch.object(vision_worker, "BATCH_INTERVAL", 0.5):
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+
+        self.assertEqual(results[2], "? embedding of (2, 2, 2)")
+        self.assertLess(len(self.model.batches), 4)
+        self.assertEqual(sum(self.model.batches), 4)
+
+    def test_repeated_questions_reuse_the_encoding(self):
+        image = Image.new("RGB", (4, 4), "white")
+
+        self.request(image_request("query", image, question="What?"))
+        self.request(image_request("query", image, question="Where?"))
+
+        self.assertEqual(self.model.batches, [1])
+
+    def test_a_worker_with_another_key_is_answered_here(self):
+        image = Image.new("RGB", (4, 4), "white")
+        local_easyocr = mock.Mock()
+        local_easyocr.readtext.return_value = [([], "Here", 0.9)]
+
+        with mock.patch.object(vision_worker, "_local_worker", None), mock.patch.object(
+            vision_worker, "load_models", return_value=(None, None, local_easyocr)
+        ):
+            result = vision_worker.request(
+                image_request("ocr", image), address=self.address, authkey=b"other"
+            )
+
+        self.assertEqual(result, "Here")
+        self.easyocr.readtext.assert_not_called()
+
+    def test_stops_when_idle(self):
+        self.thread.join(5)
+
+        self.assertFalse(self.thread.is_alive())
+        self.assertTrue(self.worker.stopped)
+
+
+class TestWorkerSetup(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        patcher = mock.patch.object(
+            vision_worker, "get_storage_path", return_value=self.directory
+        )
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_everyone_gets_the_same_whole_key(self):
+        keys = []
+        barrier = threading.Barrier(8)
+
+        def get_key():
+            barrier.wait()
+            keys.append(vision_worker.worker_authkey())
+
+        threads = [threading.Thread(target=get_key) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(len(set(keys)), 1)
+        self.assertEqual(len(keys[0]), 32)
+        self.assertEqual(os.listdir(self.directory), ["vision-worker.key"])
+
+    def test_an_empty_key_is_replaced(self):
+        open(os.path.join(self.directory, "vision-worker.key"), "wb").close()
+
+        self.assertEqual(len(vision_worker.worker_authkey()), 32)
+
+    def test_worker_runs_without_starting_an_interpreter(self):
+        code = vision_worker.bootstrap_code.format(
+            path=os.path.dirname(interpreter.__file__),
+            module="interpreter.core.computer.vision.vision",
+        )
+        code += "\nprint(sorted(m for m in sys.modules if m.startswith('interpreter.core.c')))"
+
+        output = subprocess.run(
+            [sys.executable, "-c", code], capture_output=True, text=True, check=True
+        ).stdout
+
+        self.assertNotIn("interpreter.core.core", output)
+        self.assertIn("interpreter.core.computer.vision", output)
+
+
+if __name__ == "__main__":
+    unittest.main()
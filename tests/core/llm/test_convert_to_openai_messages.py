@@ -0,0 +1,158 @@
+import base64
+import io
+import os
+import random
+import tempfile
+import unittest
+from unittest import mock
+
+from PIL import Image
+
+from interpreter.core.llm.utils import convert_to_openai_messages as module
+from interpreter.core.llm.utils.convert_to_openai_messages import (
+    convert_to_openai_messages,
+)
+from interpreter.core.utils.blob_store import BlobStore
+
+
+class TestConvertToOpenaiMessages(unittest.TestCase):
+    def setUp(self):
+        self.interpreter = mock.Mock()
+        self.interpreter.user_message_template = "<{content}>"
+        self.interpreter.always_apply_user_message_template = False
+        self.interpreter.code_output_template = "Code output: {content}"
+        self.interpreter.empty_code_output_template = "No output"
+        self.interpreter.code_output_sender = "user"
+        self.messages = [
+            {"role": "system", "type": "message", "content": "system"},
+            {"role": "user", "type": "message", "content": "first"},
+            {"role": "assistant", "type": "message", "content": "reply"},
+            {"role": "user", "type": "message", "content": "second"},
+        ]
+
+    def convert(self, cache):
+        return convert_to_openai_messages(
+            self.messages,
+            function_calling=True,
+            interpreter=self.interpreter,
+            cache=cache,
+        )
+
+    def test_template_only_applies_to_last_user_message(self):
+        converted = self.convert(None)
+
+        self.assertEqual(converted[1]["content"], "first")
+        self.assertEqual(converted[3]["content"], "<second>")
+
+    def test_unchanged_messages_are_not_converted_again(self):
+        cache = {}
+        first = self.convert(cache)
+
+        with mock.patch.object(
+            module, "convert_message", wraps=module.convert_message
+        ) as convert_message:
+            second = self.convert(cache)
+            self.assertEqual(convert_message.call_count, 0)
+
+            self.messages[2]["content"] += " edited"
+            self.messages.append(
+                {"role": "assistant", "type": "message", "content": "new"}
+            )
+            third = self.convert(cache)
+            self.assertEqual(convert_message.call_count, 2)
+
+        self.assertEqual(first, second)
+        self.assertEqual(third[2]["content"], "reply edited")
+        self.assertEqual(third[4]["content"], "new")
+
+    def test_new_user_message_moves_the_template(self):
+        cache = {}
+        self.convert(cache)
+
+        self.messages.append({"role": "user", "type": "message", "content": "third"})
+        converted = self.convert(cache)
+
+        self.assertEqual(converted[3]["content"], "second")
+        self.assertEqual(converted[4]["content"], "<third>")
+
+    def test_returned_messages_can_be_edited_safely(self):
+        cache = {}
+        self.convert(cache)[1]["content"] = "changed"
+
+        self.assertEqual(self.convert(cache)[1]["content"], "first")
+
+    def test_blob_images_become_data_urls(self):
+        self.interpreter.blob_store = BlobStore()
+        ref = self.interpreter.blob_store.put(b"image")
+        self.messages.append(
+            {"role": "user", "type": "image", "format": "base64.png", "content": ref}
+        )
+
+        converted = convert_to_openai_messages(
+            self.messages, vision=True, interpreter=self.interpreter
+        )
+
+        self.assertEqual(
+            converted[-1]["content"][0]["image_url"]["url"],
+            "data:image/png;base64,aW1hZ2U=",
+        )
+
+    def test_images_are_encoded_once(self):
+        file, path = tempfile.mkstemp(suffix=".png")
+        os.close(file)
+        self.addCleanup(os.remove, path)
+        Image.new("RGB", (4, 4)).save(path)
+        screenshot = {
+            "role": "computer",
+            "type": "image",
+            "format": "path",
+            "content": path,
+        }
+        self.messages.append(screenshot)
+
+        cache = {}
+        with mock.patch.object(
+            module, "image_data_url", wraps=module.image_data_url
+        ) as image_data_url:
+            first = convert_to_openai_messages(
+                self.messages, vision=True, interpreter=self.interpreter, cache=cache
+            )
+            # The same file again, in a new message
+            self.messages.append(dict(screenshot))
+            second = convert_to_openai_messages(
+                self.messages, vision=True, interpreter=self.interpreter, cache=cache
+            )
+            self.assertEqual(image_data_url.call_count, 1)
+
+            # Until the file changes
+            os.utime(path, (0, 0))
+            convert_to_openai_messages(
+                self.messages, vision=True, interpreter=self.interpreter, cache=cache
+            )
+            self.assertEqual(image_data_url.call_count, 2)
+
+        self.assertEqual(second[-1]["content"][0], first[-1]["content"][0])
+
+    def test_big_images_are_shrunk_to_fit(self):
+        random.seed(0)
+        image = Image.frombytes("RGB", (200, 200), random.randbytes(200 * 200 * 3))
+        buffered = io.BytesIO()
+        image.save(buffered, format="png")
+        encoded = base64.b64encode(buffered.getvalue()).decode()
+        message = {"role": "user", "type": "image", "format": "base64.png"}
+        message["content"] = encoded
+
+        with (
+            mock.patch.object(module, "MAX_IMAGE_SIZE", 50000),
+            mock.patch.object(module, "SHRUNK_IMAGE_SIZE", 49000),
+        ):
+            url = module.image_data_url(message, "png")
+
+        self.assertLessEqual(len(url), 50000)
+        shrunk = Image.open(io.BytesIO(base64.b64decode(url.split(",")[1])))
+        self.assertLess(shrunk.width, 200)
+        self.assertGreater(shrunk.width, 80)
+
+
+if __name__ == "__main__":
+    unittest.main()
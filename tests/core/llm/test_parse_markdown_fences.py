@@ -0,0 +1,72 @@
+import unittest
+
+from interpreter.core.llm.utils.parse_markdown_fences import StreamingFenceParser
+
+reply = """Let's look.
+
+```python
+print("a")
+x = "``"
+```
+Now the shell:
+```bash
+ls -la
+  ```
+Done, ``inline`` isn't a fence.
+```
+foo()
+```"""
+
+
+def parse_in_pieces(text, piece_size, **kwargs):
+    parser = StreamingFenceParser(**kwargs)
+    chunks = []
+    for i in range(0, len(text), piece_size):
+        chunks += parser.feed(text[i : i + piece_size])
+    chunks += parser.flush()
+
+    # Join adjacent chunks of the same message, like _respond_and_store does
+    messages = []
+    for chunk in chunks:
+        if (
+            messages
+            and messages[-1]["type"] == chunk["type"]
+            and messages[-1].get("format") == chunk.get("format")
+        ):
+            messages[-1]["content"] += chunk["content"]
+        else:
+            messages.append(dict(chunk))
+    return messages
+
+
+class TestStreamingFenceParser(unittest.TestCase):
+    def test_every_code_block_is_emitted(self):
+        expected = [
+            {"type": "message", "content": "Let's look.\n\n"},
+            {"type": "code", "format": "python", "content": 'print("a")\nx = "``"'},
+            {"type": "message", "content": "\nNow the shell:\n"},
+            {"type": "code", "format": "bash", "content": "ls -la"},
+            {"type": "message", "content": "\nDone, ``inline`` isn't a fence.\n"},
+            {"type": "code", "format": "python", "content": "foo()"},
+        ]
+
+        for piece_size in range(1, 10):
+            self.assertEqual(parse_in_pieces(reply, piece_size), expected)
+
+    def test_default_language(self):
+        messages = parse_in_pieces("```\nnotes\n```", 2, default_language="text")
+
+        self.assertEqual(
+            messages, [{"type": "code", "format": "text", "content": "notes"}]
+        )
+
+    def test_unclosed_block_is_flushed(self):
+        messages = parse_in_pieces("```shell\nls\n``", 4)
+
+        self.assertEqual(
+            messages, [{"type": "code", "format": "shell", "content": "ls"}]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
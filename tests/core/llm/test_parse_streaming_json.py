@@ -0,0 +1,62 @@
+import json
+import random
+import unittest
+
+from interpreter.core.llm.utils.parse_streaming_json import StreamingJsonParser
+
+
+def feed_in_pieces(text, piece_size):
+    parser = StreamingJsonParser()
+    values = {}
+    for i in range(0, len(text), piece_size):
+        for key, value in parser.feed(text[i : i + piece_size]):
+            values[key] = values.get(key, "") + value
+    return parser, values
+
+
+class TestStreamingJsonParser(unittest.TestCase):
+    def test_matches_json_loads_however_it_is_split(self):
+        code = 'print("hi")\n\tx = "\\\\" + \'é😀\'\n# {"not": "a key"}'
+        arguments = {"language": "python", "code": code}
+
+        for ensure_ascii in [True, False]:
+            text = json.dumps(arguments, ensure_ascii=ensure_ascii)
+            for piece_size in range(1, 8):
+                parser, values = feed_in_pieces(text, piece_size)
+                self.assertEqual(values, arguments)
+                self.assertEqual(parser.finished_keys, {"language", "code"})
+
+    def test_random_strings(self):
+        random.seed(0)
+        characters = 'ab"\\\n\t/é😀 {}[],:'
+        for _ in range(200):
+            code = "".join(random.choice(characters) for _ in range(40))
+            text = json.dumps({"code": code, "language": "shell"})
+            _, values = feed_in_pieces(text, random.randint(1, 6))
+            self.assertEqual(values["code"], code)
+
+    def test_skips_values_that_are_not_strings(self):
+        text = '{"n": 12, "nested": {"a": ["}", "\\""]}, "code": "x"}'
+
+        parser, values = feed_in_pieces(text, 3)
+
+        self.assertEqual(values, {"code": "x"})
+        self.assertEqual(parser.state, "done")
+
+    def test_only_new_characters_are_returned(self):
+        parser = StreamingJsonParser()
+
+        self.assertEqual(parser.feed('{"code": "ab'), [("code", "ab")])
+        self.assertEqual(parser.feed("c\\"), [("code", "c")])
+        self.assertEqual(parser.feed('n"'), [("code", "\n")])
+        self.assertIn("code", parser.finished_keys)
+
+    def test_plain_code_is_not_json(self):
+        parser = StreamingJsonParser()
+
+        self.assertEqual(parser.feed("print('hello')"), [])
+        self.assertTrue(parser.failed)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,147 @@
+import json
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+from interpreter.core.llm.run_tool_calling_llm import (
+    process_messages,
+    run_tool_calling_llm,
+)
+
+
+def tool_call_chunk(name=None, arguments=None, index=0, id=None):
+    function = SimpleNamespace(name=name, arguments=arguments)
+    tool_call = SimpleNamespace(index=index, id=id, function=function)
+    return {"choices": [{"delta": {"tool_calls": [tool_call]}}]}
+
+
+def fake_llm(chunks):
+    llm = mock.Mock()
+    llm.interpreter.verbose = False
+    llm.interpreter.computer.terminal.languages = []
+    llm.completions.return_value = iter(chunks)
+    return llm
+
+
+class TestRunToolCallingLlm(unittest.TestCase):
+    def run_llm(self, chunks):
+        params = {"messages": [{"role": "system", "content": ""}]}
+        return list(run_tool_calling_llm(fake_llm(chunks), params))
+
+    def test_streams_code_deltas(self):
+        arguments = json.dumps({"language": "python", "code": "a = 1\nprint(a)"})
+        chunks = [tool_call_chunk(name="execute", arguments="")]
+        chunks += [
+            tool_call_chunk(arguments=arguments[i : i + 3])
+            for i in range(0, len(arguments), 3)
+        ]
+
+        output = self.run_llm(chunks)
+
+        self.assertTrue(
+            all(c["type"] == "code" and c["format"] == "python" for c in output)
+        )
+        self.assertEqual("".join(c["content"] for c in output), "a = 1\nprint(a)")
+        self.assertGreater(len(output), 1)
+
+    def test_code_before_language_is_held_back(self):
+        arguments = json.dumps({"code": "ls", "language": "shell"})
+        chunks = [tool_call_chunk(name="execute", arguments=arguments[:12])]
+        chunks += [tool_call_chunk(arguments=arguments[12:])]
+
+        output = self.run_llm(chunks)
+
+        self.assertEqual(
+            output,
+            [
+                {
+                    "type": "code",
+                    "format": "shell",
+                    "content": "ls",
+                    "tool_call_id": "call_0",
+                }
+            ],
+        )
+
+    def test_python_function_arguments_are_raw_code(self):
+        chunks = [
+            tool_call_chunk(name="python", arguments="print("),
+            tool_call_chunk(arguments="1)"),
+        ]
+
+        output = self.run_llm(chunks)
+
+        self.assertEqual("".join(c["content"] for c in output), "print(1)")
+
+    def test_several_tool_calls_are_tagged_by_id(self):
+        first = json.dumps({"language": "python", "code": "a()"})
+        second = json.dumps({"language": "shell", "code": "ls"})
+        chunks = [
+            tool_call_chunk(name="execute", arguments=first[:10], id="call_a"),
+            tool_call_chunk(
+                name="execute", arguments=second[:10], index=1, id="call_b"
+            ),
+            tool_call_chunk(arguments=first[10:]),
+            tool_call_chunk(arguments=second[10:], index=1),
+        ]
+
+        output = self.run_llm(chunks)
+
+        self.assertEqual(
+            [(c["tool_call_id"], c["format"], c["content"]) for c in output],
+            [("call_a", "python", "a()"), ("call_b", "shell", "ls")],
+        )
+
+
+class TestProcessMessages(unittest.TestCase):
+    def function_call(self, code, tool_call_id):
+        return {
+            "role": "assistant",
+            "content": "",
+            "function_call": {"name": "execute", "arguments": code},
+            "tool_call_id": tool_call_id,
+        }
+
+    def function_output(self, content, tool_call_id):
+        return {
+            "role": "function",
+            "name": "execute",
+            "content": content,
+            "tool_call_id": tool_call_id,
+        }
+
+    def test_parallel_calls_are_paired_by_id(self):
+        messages = [
+            {"role": "user", "content": "Go"},
+            self.function_call("a()", "call_a"),
+            self.function_call("b()", "call_b"),
+            self.function_output("b out", "call_b"),
+            self.function_output("a out", "call_a"),
+        ]
+
+        processed = process_messages(messages)
+
+        self.assertEqual(
+            [c["function"]["arguments"] for c in processed[1]["tool_calls"]],
+            ["a()", "b()"],
+        )
+        ids = [c["id"] for c in processed[1]["tool_calls"]]
+        self.assertEqual(
+            [(m["tool_call_id"], m["content"]) for m in processed[2:]],
+            [(ids[0], "a out"), (ids[1], "b out")],
+        )
+
+    def test_call_without_output_gets_an_empty_one(self):
+        messages = [
+            self.function_call("a()", "call_a"),
+            self.function_call("b()", "call_b"),
+            self.function_output("b out", "call_b"),
+        ]
+
+        processed = process_messages(messages)
+
+        self.assertEqual([m["content"] for m in processed[1:]], ["", "b out"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import copy
+import unittest
+from unittest import mock
+
+from tokentrim import tokentrim as tt
+
+from interpreter.core.llm.utils import trim_messages as trim_module
+from interpreter.core.llm.utils.trim_messages import trim_messages
+
+
+class WordEncoding:
+    """
+    Stands in for tiktoken, which downloads its encodings.
+    """
+
+    def encode(self, text):
+        return text.split(" ")
+
+    def decode(self, tokens):
+        return " ".join(tokens)
+
+
+class TestTrimMessages(unittest.TestCase):
+    def setUp(self):
+        patcher = mock.patch.object(tt, "get_encoding", return_value=WordEncoding())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.messages = []
+        for i in range(40):
+            role = "user" if i % 2 == 0 else "assistant"
+            self.messages.append(
+                {"role": role, "content": f"Message number {i}. " + "word " * (i * 3)}
+            )
+
+    def test_matches_tokentrim(self):
+        for max_tokens in [50, 200, 1000, 5000]:
+            expected = tt.trim(
+                copy.deepcopy(self.messages),
+                system_message="You are a helpful assistant.",
+                max_tokens=max_tokens,
+            )
+            trimmed = trim_messages(
+                self.messages,
+                system_message="You are a helpful assistant.",
+                max_tokens=max_tokens,
+                token_counts={},
+            )
+            self.assertEqual(trimmed, expected)
+
+    def test_does_not_edit_messages(self):
+        original = copy.deepcopy(self.messages)
+
+        trim_messages(self.messages, max_tokens=300, token_counts={})
+
+        self.assertEqual(self.messages, original)
+
+    def test_messages_are_only_tokenized_once(self):
+        token_counts = {}
+        trim_messages(self.messages, max_tokens=100000, token_counts=token_counts)
+
+        self.messages.append({"role": "user", "content": "One more"})
+        with mock.patch(
+            "tokentrim.tokentrim.num_tokens_from_messages",
+            wraps=tt.num_tokens_from_messages,
+        ) as num_tokens:
+            trim_messages(self.messages, max_tokens=100000, token_counts=token_counts)
+
+        # Only the new message
+        self.assertEqual(num_tokens.call_count, 1)
+        self.assertEqual(len(token_counts["messages"]), len(self.messages))
+
+    def counted_when_trimming(self, messages, token_counts):
+        with mock.patch.object(
+            trim_module,
+            "count_message_tokens",
+            wraps=trim_module.count_message_tokens,
+        ) as count:
+            trimmed = trim_messages(messages, max_tokens=300, token_counts=token_counts)
+        # Same as without the cache
+        self.assertEqual(trimmed, trim_messages(messages, max_tokens=300))
+        return count.call_count
+
+    def test_only_edited_messages_are_counted_again(self):
+        token_counts = {}
+        trim_messages(self.messages, max_tokens=300, token_counts=token_counts)
+
+        # Fresh copies, like every conversion hands us
+        copies = [message.copy() for message in self.messages]
+        self.assertEqual(self.counted_when_trimming(copies, token_counts), 0)
+
+        copies[5] = {**copies[5], "content": "Edited"}
+        self.assertEqual(self.counted_when_trimming(copies, token_counts), 1)
+
+        # The messages after a dropped one only moved
+        del copies[10]
+        self.assertEqual(self.counted_when_trimming(copies, token_counts), 0)
+
+    def test_unknown_model_without_max_tokens(self):
+        with self.assertRaises(ValueError):
+            trim_messages(self.messages, model="not-a-real-model")
+
+
+if __name__ == "__main__":
+    unittest.main()
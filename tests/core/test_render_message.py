@@ -0,0 +1,104 @@
+import unittest
+from unittest import mock
+
+from interpreter.core.render_message import (
+    compile_message,
+    cwd_probe_code,
+    render_message,
+)
+
+
+class TestRenderMessage(unittest.TestCase):
+    def setUp(self):
+        self.interpreter = mock.Mock()
+        self.interpreter.verbose = False
+        self.interpreter.debug = False
+        self.interpreter._turn = 1
+        self.interpreter._render_cache = {}
+        self.interpreter.computer.run.return_value = [
+            {"type": "console", "format": "output", "content": "rendered"}
+        ]
+
+    def test_compile_message_splits_blocks_once(self):
+        message = "Hello {{\n# cache: turn, 30s\nprint(1)\n}} world {{print(2)}}"
+
+        parts = compile_message(message)
+
+        self.assertEqual(
+            parts,
+            (
+                "Hello ",
+                ("# cache: turn, 30s\nprint(1)", ("turn", "30s")),
+                " world ",
+                ("print(2)", None),
+                "",
+            ),
+        )
+        self.assertIs(compile_message(message), parts)
+
+    def test_blocks_without_directive_always_run(self):
+        message = "A {{print(1)}}"
+
+        self.assertEqual(render_message(self.interpreter, message), "A rendered")
+        render_message(self.interpreter, message)
+
+        self.assertEqual(self.interpreter.computer.run.call_count, 2)
+
+    def test_turn_blocks_run_once_per_turn(self):
+        message = "A {{\n# cache: turn\nprint(1)\n}}"
+
+        render_message(self.interpreter, message)
+        render_message(self.interpreter, message)
+        self.assertEqual(self.interpreter.computer.run.call_count, 1)
+
+        self.interpreter._turn = 2
+        render_message(self.interpreter, message)
+        self.assertEqual(self.interpreter.computer.run.call_count, 2)
+
+    @mock.patch("interpreter.core.render_message.time.time")
+    def test_ttl_blocks_expire(self, mock_time):
+        message = "A {{\n# cache: 10s\nprint(1)\n}}"
+
+        mock_time.return_value = 100
+        render_message(self.interpreter, message)
+        mock_time.return_value = 105
+        render_message(self.interpreter, message)
+        self.assertEqual(self.interpreter.computer.run.call_count, 1)
+
+        mock_time.return_value = 111
+        render_message(self.interpreter, message)
+        self.assertEqual(self.interpreter.computer.run.call_count, 2)
+
+    def test_cwd_blocks_rerun_when_the_kernels_cwd_changes(self):
+        message = "A {{\n# cache: cwd\nprint(1)\n}}"
+        kernel = {"cwd": "/a"}
+        blocks_run = []
+
+        def run(language, code, **kwargs):
+            if code == cwd_probe_code:
+                return [
+                    {"type": "console", "format": "output", "content": kernel["cwd"]}
+                ]
+            blocks_run.append(code)
+            return [{"type": "console", "format": "output", "content": "rendered"}]
+
+        self.interpreter.computer.run.side_effect = run
+
+        with mock.patch("os.getcwd", return_value="/host"):
+            render_message(self.interpreter, message)
+            render_message(self.interpreter, message)
+            self.assertEqual(len(blocks_run), 1)
+
+            kernel["cwd"] = "/b"
+            render_message(self.interpreter, message)
+            self.assertEqual(len(blocks_run), 2)
+
+    def test_cwd_is_only_probed_when_needed(self):
+        render_message(self.interpreter, "A {{\n# cache: turn\nprint(1)\n}}")
+        render_message(self.interpreter, "A {{\n# cache: turn\nprint(1)\n}}")
+
+        self.interpreter.computer.run.assert_called_once()
+
+
+if __name__ == "__main__":
+    unittest.main()
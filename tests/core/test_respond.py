@@ -0,0 +1,278 @@
+import threading
+import unittest
+from unittest import mock
+
+from interpreter.core.core import OpenInterpreter
+
+
+class TestRespond(unittest.TestCase):
+    def setUp(self):
+        self.interpreter = OpenInterpreter(auto_run=True, conversation_history=False)
+        self.replies = []
+        self.interpreter.llm.run = mock.Mock(
+            side_effect=lambda messages: iter(self.replies.pop(0))
+        )
+        self.interpreter.computer.run = mock.Mock(
+            side_effect=lambda language, code, **kwargs: iter(
+                [{"type": "console", "format": "output", "content": f"ran {code}"}]
+            )
+        )
+
+    def test_runs_every_code_block_in_a_reply(self):
+        self.replies = [
+            [
+                {"type": "message", "content": "First"},
+                {"type": "code", "format": "python", "content": "a()"},
+                {"type": "message", "content": "Then"},
+                {"type": "code", "format": "python", "content": "b()"},
+            ],
+            [{"type": "message", "content": "Done."}],
+        ]
+        self.interpreter.messages = [
+            {"role": "user", "type": "message", "content": "Go"}
+        ]
+
+        list(self.interpreter._respond_and_store())
+
+        self.assertEqual(
+            [(m["type"], m["content"]) for m in self.interpreter.messages],
+            [
+                ("message", "Go"),
+                ("message", "First"),
+                ("code", "a()"),
+                ("console", "ran a()"),
+                ("message", "Then"),
+                ("code", "b()"),
+                ("console", "ran b()"),
+                ("message", "Done."),
+            ],
+        )
+        # Both blocks ran off one completion, then one more to read their output
+        self.assertEqual(self.interpreter.llm.run.call_count, 2)
+
+    def test_queued_code_blocks_survive_an_interrupt(self):
+        self.interpreter.computer.run = mock.Mock(side_effect=KeyboardInterrupt)
+        self.replies = [
+            [
+                {"type": "code", "format": "python", "content": "a()"},
+                {"type": "message", "content": "Then"},
+                {"type": "code", "format": "python", "content": "b()"},
+            ]
+        ]
+        self.interpreter.messages = [
+            {"role": "user", "type": "message", "content": "Go"}
+        ]
+
+        list(self.interpreter._respond_and_store())
+
+        self.assertEqual(
+            [m["content"] for m in self.interpreter.messages],
+            ["Go", "a()", "Then", "b()"],
+        )
+
+    def test_queued_code_blocks_survive_stopping_at_a_confirmation(self):
+        self.interpreter.auto_run = False
+        self.replies = [
+            [
+                {"type": "code", "format": "python", "content": "a()"},
+                {"type": "message", "content": "Then"},
+                {"type": "code", "format": "python", "content": "b()"},
+            ]
+        ]
+        self.interpreter.messages = [
+            {"role": "user", "type": "message", "content": "Go"}
+        ]
+
+        chunks = self.interpreter._respond_and_store()
+        for chunk in chunks:
+            if chunk["type"] == "confirmation":
+                break
+        chunks.close()
+
+        self.assertEqual(
+            [m["content"] for m in self.interpreter.messages],
+            ["Go", "a()", "Then", "b()"],
+        )
+        self.interpreter.computer.run.assert_not_called()
+
+    def test_code_runs_when_chunks_are_coalesced(self):
+        self.interpreter.chunk_flush_interval = 10
+        self.replies = [
+            [
+                {"type": "message", "content": "Run"},
+                {"type": "message", "content": "ning"},
+                {"type": "code", "format": "python", "content": "a("},
+                {"type": "code", "format": "python", "content": ")"},
+            ],
+            [{"type": "message", "content": "Done."}],
+        ]
+        self.interpreter.messages = [
+            {"role": "user", "type": "message", "content": "Go"}
+        ]
+
+        chunks = list(self.interpreter._respond_and_store())
+
+        self.interpreter.computer.run.assert_called_once()
+        self.assertEqual(
+            [(m["type"], m["content"]) for m in self.interpreter.messages],
+            [
+                ("message", "Go"),
+                ("message", "Running"),
+                ("code", "a()"),
+                ("console", "ran a()"),
+                ("message", "Done."),
+            ],
+        )
+        # The tokens were passed on merged
+        self.assertEqual(
+            [
+                c["content"]
+                for c in chunks
+                if c.get("type") == "code" and "content" in c
+            ],
+            ["a()"],
+        )
+
+    def test_long_output_is_truncated(self):
+        self.interpreter.max_output = 100
+        self.interpreter.computer.run = mock.Mock(
+            side_effect=lambda language, code, **kwargs: (
+                {"type": "console", "format": "output", "content": f"line {i}\n"}
+                for i in range(10000)
+            )
+        )
+        self.replies = [
+            [{"type": "code", "format": "python", "content": "spam()"}],
+            [{"type": "message", "content": "Done."}],
+        ]
+        self.interpreter.messages = [
+            {"role": "user", "type": "message", "content": "Go"}
+        ]
+
+        chunks = list(self.interpreter._respond_and_store())
+
+        output = self.interpreter.messages[2]["content"]
+        self.assertTrue(output.startswith("Output truncated."))
+        self.assertTrue(output.endswith("line 9999\n"))
+        # The LLM saw the truncated output too
+        self.assertEqual(self.interpreter.llm.run.call_args[0][0][3]["content"], output)
+        # The full output can still be paged through
+        terminal = self.interpreter.computer.terminal
+        output_id = self.interpreter.messages[2]["output_id"]
+        self.assertEqual(terminal.output(output_id, 0, 2), "line 0\nline 1\n")
+        self.assertEqual(terminal.get_last_output(5000, 5001), "line 5000\n")
+        self.assertEqual(
+            terminal.grep("^line 1234$", output_id), f"{output_id}:1234: line 1234"
+        )
+        # Every chunk was still streamed out in full
+        self.assertEqual(
+            sum(1 for c in chunks if c.get("format") == "output" and "content" in c),
+            10000,
+        )
+
+    def test_runs_tool_calls_concurrently(self):
+        started = []
+        both_started = threading.Event()
+
+        def run(language, code, **kwargs):
+            # Each call waits for the other, so this only finishes if they run at once
+            started.append(code)
+            if len(started) == 2:
+                both_started.set()
+            self.assertTrue(both_started.wait(5))
+            yield {"type": "console", "format": "output", "content": f"ran {code}"}
+
+        self.interpreter.computer.terminal.run = mock.Mock(side_effect=run)
+        self.replies = [
+            [
+                {
+                    "type": "code",
+                    "format": "python",
+                    "content": "a()",
+                    "tool_call_id": "1",
+                },
+                {
+                    "type": "code",
+                    "format": "shell",
+                    "content": "b",
+                    "tool_call_id": "2",
+                },
+            ],
+            [{"type": "message", "content": "Done."}],
+        ]
+        self.interpreter.messages = [
+            {"role": "user", "type": "message", "content": "Go"}
+        ]
+
+        list(self.interpreter._respond_and_store())
+
+        self.assertEqual(
+            sorted(
+                (m["tool_call_id"], m["content"])
+                for m in self.interpreter.messages
+                if m["type"] == "console"
+            ),
+            [("1", "ran a()"), ("2", "ran b")],
+        )
+        self.assertEqual(self.interpreter.messages[-1]["content"], "Done.")
+        self.assertEqual(self.interpreter.llm.run.call_count, 2)
+
+    def test_streamed_chunks_dont_change_afterwards(self):
+        self.replies = [
+            [
+                {"type": "message", "content": "Hel"},
+                {"type": "message", "content": "lo"},
+            ]
+        ]
+        self.interpreter.messages = [
+            {"role": "user", "type": "message", "content": "Go"}
+        ]
+
+        chunks = list(self.interpreter._respond_and_store())
+
+        self.assertEqual(
+            [c["content"] for c in chunks if "content" in c], ["Hel", "lo"]
+        )
+        self.assertEqual(self.interpreter.messages[-1]["content"], "Hello")
+
+    def test_images_are_stored_as_blobs(self):
+        self.interpreter.blob_images = True
+        screenshots = ["aW1hZ2Ux", "aW1hZ2Uy"]
+        self.interpreter.computer.run = mock.Mock(
+            side_effect=lambda language, code, **kwargs: iter(
+                [
+                    {"type": "image", "format": "base64.png", "content": screenshot}
+                    for screenshot in screenshots
+                ]
+            )
+        )
+        self.replies = [
+            [{"type": "code", "format": "python", "content": "screenshot()"}],
+            [{"type": "message", "content": "Done."}],
+        ]
+        self.interpreter.messages = [
+            {"role": "user", "type": "message", "content": "Go"}
+        ]
+
+        chunks = list(self.interpreter._respond_and_store())
+
+        # Streamed as base64, stored as references, one message per image
+        self.assertEqual(
+            [
+                c["content"]
+                for c in chunks
+                if c.get("type") == "image" and "content" in c
+            ],
+            screenshots,
+        )
+        images = [m for m in self.interpreter.messages if m["type"] == "image"]
+        self.assertEqual(len(images), 2)
+        self.assertTrue(all(m["content"].startswith("blob:") for m in images))
+        self.assertEqual(
+            [m["content"] for m in self.interpreter.blob_store.expand_all(images)],
+            screenshots,
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
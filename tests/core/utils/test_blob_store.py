@@ -0,0 +1,56 @@
+import base64
+import os
+import unittest
+
+from interpreter.core.utils.blob_store import BlobStore, is_blob
+
+
+class TestBlobStore(unittest.TestCase):
+    def setUp(self):
+        self.store = BlobStore(memory_limit=10)
+        self.addCleanup(self.store.cleanup)
+
+    def test_same_bytes_same_reference(self):
+        ref = self.store.put(b"image")
+
+        self.assertTrue(is_blob(ref))
+        self.assertEqual(ref, self.store.put(b"image"))
+        self.assertNotEqual(ref, self.store.put(b"other"))
+        self.assertEqual(self.store.get(ref), b"image")
+
+    def test_base64_round_trip(self):
+        encoded = base64.b64encode(b"\x89PNG...").decode()
+        ref = self.store.put_base64(encoded)
+
+        self.assertTrue(is_blob(ref))
+        self.assertEqual(self.store.base64(ref), encoded)
+        # Already base64, or not base64 at all, passes through
+        self.assertEqual(self.store.base64(encoded), encoded)
+        self.assertEqual(self.store.put_base64("not base64!"), "not base64!")
+
+    def test_spills_to_disk_past_the_memory_limit(self):
+        first = self.store.put(b"0123456789")
+        second = self.store.put(b"abcdefghij")
+
+        self.assertEqual(len(os.listdir(self.store.directory)), 1)
+        self.assertEqual(self.store.get(first), b"0123456789")
+        self.assertEqual(self.store.get(second), b"abcdefghij")
+
+    def test_expand(self):
+        message = {"role": "computer", "type": "image", "format": "base64.png"}
+        message["content"] = self.store.put(b"image")
+
+        expanded = self.store.expand(message)
+
+        self.assertEqual(base64.b64decode(expanded["content"]), b"image")
+        self.assertTrue(is_blob(message["content"]))
+        text = {"role": "user", "type": "message", "content": "hi"}
+        self.assertIs(self.store.expand(text), text)
+
+    def test_unknown_reference(self):
+        with self.assertRaises(ValueError):
+            self.store.get("blob:../../etc/passwd")
+
+
+if __name__ == "__main__":
+    unittest.main()
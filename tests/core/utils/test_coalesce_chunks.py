@@ -0,0 +1,69 @@
+import unittest
+
+from interpreter.core.utils.coalesce_chunks import coalesce_chunks
+
+
+def message(content):
+    return {"role": "assistant", "type": "message", "content": content}
+
+
+def code(content):
+    return {"role": "assistant", "type": "code", "format": "python", "content": content}
+
+
+active_line = {
+    "role": "computer",
+    "type": "console",
+    "format": "active_line",
+    "content": 1,
+}
+output = {"role": "computer", "type": "console", "format": "output", "content": "hi\n"}
+
+
+class TestCoalesceChunks(unittest.TestCase):
+    def test_merges_adjacent_tokens(self):
+        chunks = [message("Hel"), message("lo"), code("print("), code("1)")]
+
+        self.assertEqual(
+            list(coalesce_chunks(chunks, 10, 1000)),
+            [message("Hello"), code("print(1)")],
+        )
+
+    def test_keeps_everything_else_in_order(self):
+        chunks = [code("a"), active_line, output, output, code("b"), code("c")]
+
+        self.assertEqual(
+            list(coalesce_chunks(chunks, 10, 1000)),
+            [code("a"), active_line, output, output, code("bc")],
+        )
+
+    def test_doesnt_merge_different_tool_calls(self):
+        first = {**code("a"), "tool_call_id": "1"}
+        second = {**code("b"), "tool_call_id": "2"}
+
+        self.assertEqual(
+            list(coalesce_chunks([first, second], 10, 1000)), [first, second]
+        )
+
+    def test_flushes_at_max_chunk_size(self):
+        chunks = [message("ab")] * 5
+
+        self.assertEqual(
+            [c["content"] for c in coalesce_chunks(chunks, 10, 4)],
+            ["abab", "abab", "ab"],
+        )
+
+    def test_flushes_after_interval(self):
+        chunks = [message("a"), message("b")]
+
+        self.assertEqual(len(list(coalesce_chunks(chunks, 0, 1000))), 2)
+
+    def test_doesnt_change_the_chunks_it_merges(self):
+        first = message("a")
+        list(coalesce_chunks([first, message("b")], 10, 1000))
+
+        self.assertEqual(first, message("a"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,66 @@
+import json
+import unittest
+
+from interpreter.core.utils.message_store import MessageStore
+
+
+def message(role, type, content=""):
+    return {"role": role, "type": type, "content": content}
+
+
+class TestMessageStore(unittest.TestCase):
+    def test_is_a_list(self):
+        messages = MessageStore([message("user", "message", "hi")])
+        messages.append(message("assistant", "message", "hello"))
+
+        self.assertIsInstance(messages, list)
+        self.assertEqual(len(messages), 2)
+        self.assertEqual(json.loads(json.dumps(messages)), list(messages))
+
+    def test_last(self):
+        messages = MessageStore(
+            [
+                message("assistant", "code", "a"),
+                message("computer", "console"),
+                message("assistant", "code", "b"),
+                message("user", "message"),
+            ]
+        )
+
+        self.assertEqual(messages.last("code")["content"], "b")
+        self.assertEqual(messages.last("console", role="computer"), messages[1])
+        self.assertIsNone(messages.last("image"))
+
+        messages.append(message("assistant", "code", "c"))
+        self.assertEqual(messages.last("code")["content"], "c")
+
+    def test_last_after_removing_and_editing(self):
+        messages = MessageStore(
+            [message("assistant", "code", "a"), message("assistant", "code", "b")]
+        )
+        self.assertEqual(messages.last("code")["content"], "b")
+
+        del messages[1]
+        self.assertEqual(messages.last("code")["content"], "a")
+
+        messages.insert(0, message("assistant", "code", "first"))
+        messages[1]["type"] = "message"
+        self.assertEqual(messages.last("code")["content"], "first")
+
+    def test_content_is_joined_on_flush(self):
+        messages = MessageStore([message("assistant", "message", "He")])
+        for part in ["l", "l", "o"]:
+            messages.add_content(messages[-1], part)
+
+        self.assertEqual(messages[-1]["content"], "He")
+        messages.flush_content()
+        self.assertEqual(messages[-1]["content"], "Hello")
+
+        # Adding more after a flush carries on from there
+        messages.add_content(messages[-1], "!")
+        messages.flush_content()
+        self.assertEqual(messages[-1]["content"], "Hello!")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,46 @@
+import unittest
+
+from interpreter.core.utils.output_buffer import OutputBuffer
+
+
+class TestOutputBuffer(unittest.TestCase):
+    def test_short_output_is_kept_whole(self):
+        buffer = OutputBuffer(tail_chars=100)
+        buffer.append("a\n")
+        buffer.append("b\n")
+
+        self.assertFalse(buffer.truncated)
+        self.assertEqual(str(buffer), "a\nb\n")
+
+    def test_keeps_the_tail_and_counts_everything(self):
+        buffer = OutputBuffer(tail_chars=10)
+        for i in range(1000):
+            buffer.append(f"line {i}\n")
+
+        text = str(buffer)
+        self.assertTrue(buffer.truncated)
+        self.assertTrue(text.endswith("\nline 999\n"))
+        self.assertEqual(len(text.split("\n\n", 1)[1]), 10)
+        self.assertEqual(buffer.lines, 1000)
+        self.assertEqual(buffer.chars, sum(len(f"line {i}\n") for i in range(1000)))
+        self.assertIn(f"of {buffer.chars} (1000 lines", text)
+
+    def test_keeps_the_head_too(self):
+        buffer = OutputBuffer(tail_chars=5, head_chars=5)
+        buffer.append("0123")
+        buffer.append("456789")
+        buffer.append("abcdefghij")
+
+        text = str(buffer)
+        self.assertIn("01234\n\n[... 10 characters omitted ...]\n\nfghij", text)
+        self.assertEqual(buffer.dropped_chars, 10)
+
+    def test_bytes_count_encoded_length(self):
+        buffer = OutputBuffer()
+        buffer.append("é")
+
+        self.assertEqual((buffer.chars, buffer.bytes), (1, 2))
+
+
+if __name__ == "__main__":
+    unittest.main()